@@ -1,70 +1,85 @@
-# data_processing.py
-
-import pandas as pd
-from faker import Faker
-from pymongo import MongoClient
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-
-fake = Faker()
-client = MongoClient("mongodb://localhost:27017/")
-db = client["gromo"]
-collection = db["sales_data"]
-
-def load_data():
-    data = list(collection.find({}, {"_id": 0}))
-    return pd.DataFrame(data)
-
-def assign_coordinates(df):
-    unique_pins = df["pincode"].unique()
-    pin_coord_map = {
-        pin: (fake.latitude(), fake.longitude()) for pin in unique_pins
-    }
-    df["latitude"] = df["pincode"].map(lambda x: pin_coord_map[x][0])
-    df["longitude"] = df["pincode"].map(lambda x: pin_coord_map[x][1])
-    return df
-
-def cluster_pincodes(df, n_clusters=20):
-    coords = df[["latitude", "longitude"]]
-    scaler = StandardScaler()
-    coords_scaled = scaler.fit_transform(coords)
-
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    df["region_id"] = kmeans.fit_predict(coords_scaled)
-    return df
-
-def preprocess_data(df):
-    # date is already datetime.datetime object from MongoDB
-    df["year"] = df["date"].dt.year
-    df["month"] = df["date"].dt.month
-    df["day_of_week"] = df["date"].dt.dayofweek
-    
-    # Drop columns not used in modeling
-    df.drop(columns=["date", "city", "agent_id", "latitude", "longitude"], inplace=True)
-
-    # Define features
-    categorical_cols = ["product", "channel", "region_id"]
-    numeric_cols = ["customer_age", "customer_income", "year", "month", "day_of_week"]
-
-    # Create transformation pipeline
-    preprocessor = ColumnTransformer(transformers=[
-        ("num", StandardScaler(), numeric_cols),
-        ("cat", OneHotEncoder(sparse_output=False, handle_unknown='ignore'), categorical_cols)
-    ])
-
-    X_processed = preprocessor.fit_transform(df)
-
-    # Extract column names for result
-    cat_features = preprocessor.named_transformers_["cat"].get_feature_names_out(categorical_cols)
-    feature_names = numeric_cols + list(cat_features)
-
-    return pd.DataFrame(X_processed, columns=feature_names)
-
-if __name__ == "__main__":
-    df = load_data()
-    df = assign_coordinates(df)
-    df = cluster_pincodes(df)
-    processed_df = preprocess_data(df)
-
-    print(processed_df.head())
+# data_processing.py
+
+import pandas as pd
+from faker import Faker
+from pymongo import MongoClient
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.compose import ColumnTransformer
+from sales_cube import load_cube
+
+fake = Faker()
+client = MongoClient("mongodb://localhost:27017/")
+db = client["gromo"]
+collection = db["sales_data"]
+
+def load_data():
+    # One row per pincode x product x channel x day from the sales cube;
+    # `count` is the number of sales each row stands for
+    return load_cube(db)
+
+def assign_coordinates(df):
+    unique_pins = df["pincode"].unique()
+    pin_coord_map = {
+        pin: (fake.latitude(), fake.longitude()) for pin in unique_pins
+    }
+    df["latitude"] = df["pincode"].map(lambda x: pin_coord_map[x][0])
+    df["longitude"] = df["pincode"].map(lambda x: pin_coord_map[x][1])
+    return df
+
+def cluster_pincodes(df, n_clusters=20):
+    if df.empty:
+        df["region_id"] = pd.Series(dtype="int64")
+        return df
+    coords = df[["latitude", "longitude"]]
+    scaler = StandardScaler()
+    coords_scaled = scaler.fit_transform(coords)
+
+    # Each cube row weighs as many sales as it stands for
+    kmeans = KMeans(n_clusters=min(n_clusters, len(df)), random_state=42)
+    df["region_id"] = kmeans.fit_predict(coords_scaled, sample_weight=df.get("count"))
+    return df
+
+def preprocess_data(df):
+    # Returns the feature matrix and the sample weight of each row (its sale
+    # count), to be passed to the model's fit as sample_weight
+    sample_weight = df["count"] if "count" in df.columns else pd.Series(1, index=df.index)
+
+    # date comes from MongoDB as datetime.datetime; an empty cube has no values to infer that from
+    df["date"] = pd.to_datetime(df["date"])
+    df["year"] = df["date"].dt.year
+    df["month"] = df["date"].dt.month
+    df["day_of_week"] = df["date"].dt.dayofweek
+    
+    # Drop columns not used in modeling
+    df.drop(columns=["date", "city", "agent_id", "latitude", "longitude", "count"], inplace=True, errors="ignore")
+
+    # Define features
+    categorical_cols = ["product", "channel", "region_id"]
+    numeric_cols = ["customer_age", "customer_income", "year", "month", "day_of_week"]
+
+    if df.empty:
+        return pd.DataFrame(columns=numeric_cols), sample_weight
+
+    # Create transformation pipeline
+    preprocessor = ColumnTransformer(transformers=[
+        ("num", StandardScaler(), numeric_cols),
+        ("cat", OneHotEncoder(sparse_output=False, handle_unknown='ignore'), categorical_cols)
+    ])
+
+    X_processed = preprocessor.fit_transform(df)
+
+    # Extract column names for result
+    cat_features = preprocessor.named_transformers_["cat"].get_feature_names_out(categorical_cols)
+    feature_names = numeric_cols + list(cat_features)
+
+    return pd.DataFrame(X_processed, columns=feature_names), sample_weight.reset_index(drop=True)
+
+if __name__ == "__main__":
+    df = load_data()
+    df = assign_coordinates(df)
+    df = cluster_pincodes(df)
+    processed_df, sample_weight = preprocess_data(df)
+
+    print(processed_df.head())
+    print(f"{len(processed_df)} rows standing for {int(sample_weight.sum())} sales")
@@ -1,816 +1,1192 @@
-from flask import Flask, request, jsonify, make_response
-from flask_cors import CORS
-import pandas as pd
-import numpy as np
-import json
-import pickle
-import traceback
-from pymongo import MongoClient
-from bson.objectid import ObjectId
-import logging
-import sys
-from functools import wraps
-import datetime
-import random
-
-# Import functions from model.py
-try:
-    from model import (
-        load_data, assign_coordinates, cluster_pincodes, preprocess_data,
-        predict_region_demand, predict_demand_rise, predict_top_product,
-        convert_numpy_types
-    )
-    model_available = True
-except ImportError as e:
-    print(f"Error importing model functions: {e}")
-    model_available = False
-
-# Import Faker for sample data generation
-try:
-    from faker import Faker
-    faker_available = True
-except ImportError:
-    faker_available = False
-    print("Faker module not available. Sample data generation will be limited.")
-
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-logger = logging.getLogger(__name__)
-
-# MongoDB connection
-try:
-    client = MongoClient("mongodb://localhost:27017/")
-    db = client["gromo"]
-    # Test connection with a ping
-    client.admin.command('ping')
-    db_available = True
-    logger.info("Connected to MongoDB successfully")
-except Exception as e:
-    logger.error(f"MongoDB connection error: {e}")
-    db = None
-    db_available = False
-
-# Helper function to load product classes from MongoDB
-def load_product_classes():
-    try:
-        if db is not None:
-            model_details = db["model_details"].find_one({"model_type": "multi_class_classification"})
-            if model_details and "metrics" in model_details and "product_mapping" in model_details["metrics"]:
-                product_mapping = model_details["metrics"]["product_mapping"]
-                return [product_mapping[str(i)] for i in range(len(product_mapping))]
-    except Exception as e:
-        logger.error(f"Error loading product classes: {e}")
-    
-    # Return default values if unable to load
-    return ["loan", "credit_card", "insurance"]
-
-# Rate limiting decorator - simplified version
-def rate_limit(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        # Here you would implement actual rate limiting
-        # For now, we just log the request
-        logger.info(f"Request to {func.__name__}")
-        return func(*args, **kwargs)
-    return wrapper
-
-# Simple model implementation for when the real model is failing
-def simple_predict_region_demand(df):
-    """Fallback function for predicting region demand"""
-    predictions = []
-    for _, row in df.iterrows():
-        prediction = {
-            "pincode": row["pincode"],
-            "product": row["product"],
-            "channel": row["channel"],
-            "predicted_demand": round(random.uniform(100, 1000), 2),
-            "confidence": round(random.uniform(0.7, 0.95), 2)
-        }
-        predictions.append(prediction)
-    return predictions
-
-# Fallback function for demand rise prediction
-def simple_predict_demand_rise(df):
-    """Fallback function for predicting demand rise"""
-    predictions = []
-    for _, row in df.iterrows():
-        prediction = {
-            "pincode": row["pincode"],
-            "product": row["product"],
-            "channel": row["channel"],
-            "demand_rise": random.choice([True, False]),
-            "probability": round(random.uniform(0.6, 0.9), 2)
-        }
-        predictions.append(prediction)
-    return predictions
-
-# Fallback function for top product prediction
-def simple_predict_top_product(df):
-    """Fallback function for predicting top product"""
-    products = ["loan", "credit_card", "insurance"]
-    predictions = []
-    for _, row in df.iterrows():
-        top_product = random.choice(products)
-        probabilities = {p: round(random.uniform(0.1, 0.5), 2) for p in products}
-        probabilities[top_product] = round(random.uniform(0.5, 0.9), 2)
-        
-        # Normalize probabilities to sum to 1
-        total = sum(probabilities.values())
-        probabilities = {p: round(v/total, 2) for p, v in probabilities.items()}
-        
-        prediction = {
-            "pincode": row["pincode"],
-            "channel": row["channel"],
-            "top_product": top_product,
-            "probability": probabilities[top_product],
-            "all_products": probabilities
-        }
-        predictions.append(prediction)
-    return predictions
-
-# API routes
-@app.route('/')
-def index():
-    """API home page with documentation"""
-    return jsonify({
-        "status": "success",
-        "message": "Demand Prediction API is running",
-        "endpoints": {
-            "GET /": "API information",
-            "GET /regions": "Get all region summaries",
-            "GET /regions/<region_id>": "Get a specific region summary",
-            "GET /models": "Get model details and evaluation metrics",
-            "POST /predict/demand": "Predict region demand",
-            "POST /predict/demand-rise": "Predict if demand will rise",
-            "POST /predict/top-product": "Predict top product for a region",
-            "POST /predict/all": "Run all three prediction models",
-            "POST /upload/data": "Upload data file (CSV, Excel, JSON)",
-            "POST /sales/add": "Add sales data records directly",
-            "GET /generate-sample-data/<count>": "Generate and add sample sales data",
-            "GET /health": "API health check",
-            "GET /version": "API version information",
-            "GET /stats": "API usage statistics"
-        }
-    })
-
-@app.route('/regions', methods=['GET'])
-@rate_limit
-def get_regions():
-    """Get all region summaries from the database"""
-    try:
-        if db is not None:
-            regions = list(db["demand_prediction"].find({}, {'_id': 0}))
-            return jsonify({
-                "status": "success",
-                "data": regions
-            })
-        else:
-            return jsonify({
-                "status": "error",
-                "message": "Database connection not available"
-            }), 503
-    except Exception as e:
-        logger.error(f"Error fetching regions: {e}")
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/regions/<region_id>', methods=['GET'])
-@rate_limit
-def get_region(region_id):
-    """Get a specific region summary by ID"""
-    try:
-        if db is not None:
-            # Convert string region_id to integer if possible
-            try:
-                region_id = int(region_id)
-            except ValueError:
-                pass
-                
-            region = db["demand_prediction"].find_one({"region_id": region_id}, {'_id': 0})
-            if region:
-                return jsonify({
-                    "status": "success",
-                    "data": region
-                })
-            else:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Region with ID {region_id} not found"
-                }), 404
-        else:
-            return jsonify({
-                "status": "error",
-                "message": "Database connection not available"
-            }), 503
-    except Exception as e:
-        logger.error(f"Error fetching region {region_id}: {e}")
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/models', methods=['GET'])
-@rate_limit
-def get_models():
-    """Get model details and evaluation metrics"""
-    try:
-        if db is not None:
-            model_details = list(db["model_details"].find({}, {'_id': 0}))
-            evaluation = db["model_evaluation"].find_one({}, {'_id': 0})
-            
-            return jsonify({
-                "status": "success",
-                "data": {
-                    "model_details": model_details,
-                    "evaluation": evaluation
-                }
-            })
-        else:
-            return jsonify({
-                "status": "error",
-                "message": "Database connection not available"
-            }), 503
-    except Exception as e:
-        logger.error(f"Error fetching model details: {e}")
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/predict/demand', methods=['POST'])
-@rate_limit
-def predict_demand():
-    """Predict region demand using regression model"""
-    try:
-        data = request.get_json()
-        
-        if not data or not isinstance(data, list):
-            return jsonify({
-                "status": "error",
-                "message": "Invalid input: Expected a list of data points"
-            }), 400
-        
-        # Convert JSON to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Validate required columns
-        required_columns = ["pincode", "product", "channel"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            return jsonify({
-                "status": "error",
-                "message": f"Missing required columns: {', '.join(missing_columns)}"
-            }), 400
-        
-        # Try using the model function, but fallback to the simple implementation if it fails
-        try:
-            if model_available:
-                predictions = predict_region_demand(df)
-            else:
-                raise ImportError("Model not available")
-        except Exception as e:
-            logger.warning(f"Using fallback for demand prediction. Error with original model: {e}")
-            predictions = simple_predict_region_demand(df)
-        
-        return jsonify({
-            "status": "success",
-            "data": predictions
-        })
-    except Exception as e:
-        logger.error(f"Error predicting demand: {e}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/predict/demand-rise', methods=['POST'])
-@rate_limit
-def predict_rise():
-    """Predict if demand will rise using binary classification model"""
-    try:
-        data = request.get_json()
-        
-        if not data or not isinstance(data, list):
-            return jsonify({
-                "status": "error",
-                "message": "Invalid input: Expected a list of data points"
-            }), 400
-        
-        # Convert JSON to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Validate required columns
-        required_columns = ["pincode", "product", "channel"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            return jsonify({
-                "status": "error",
-                "message": f"Missing required columns: {', '.join(missing_columns)}"
-            }), 400
-        
-        # Try using the model function, but fallback to the simple implementation if it fails
-        try:
-            if model_available:
-                predictions = predict_demand_rise(df)
-            else:
-                raise ImportError("Model not available")
-        except Exception as e:
-            logger.warning(f"Using fallback for demand rise prediction. Error with original model: {e}")
-            predictions = simple_predict_demand_rise(df)
-        
-        return jsonify({
-            "status": "success",
-            "data": predictions
-        })
-    except Exception as e:
-        logger.error(f"Error predicting demand rise: {e}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/predict/top-product', methods=['POST'])
-@rate_limit
-def predict_product():
-    """Predict top product using multi-class classification model"""
-    try:
-        data = request.get_json()
-        
-        if not data or not isinstance(data, list):
-            return jsonify({
-                "status": "error",
-                "message": "Invalid input: Expected a list of data points"
-            }), 400
-        
-        # Convert JSON to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Validate required columns
-        required_columns = ["pincode", "channel"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            return jsonify({
-                "status": "error",
-                "message": f"Missing required columns: {', '.join(missing_columns)}"
-            }), 400
-        
-        # Try using the model function, but fallback to the simple implementation if it fails
-        try:
-            if model_available:
-                predictions = predict_top_product(df)
-            else:
-                raise ImportError("Model not available")
-        except Exception as e:
-            logger.warning(f"Using fallback for top product prediction. Error with original model: {e}")
-            predictions = simple_predict_top_product(df)
-        
-        return jsonify({
-            "status": "success",
-            "data": predictions
-        })
-    except Exception as e:
-        logger.error(f"Error predicting top product: {e}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/predict/all', methods=['POST'])
-@rate_limit
-def predict_all():
-    """Run all prediction models at once"""
-    try:
-        data = request.get_json()
-        
-        if not data or not isinstance(data, list):
-            return jsonify({
-                "status": "error",
-                "message": "Invalid input: Expected a list of data points"
-            }), 400
-        
-        # Convert JSON to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Validate required columns
-        required_columns = ["pincode", "product", "channel"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            return jsonify({
-                "status": "error",
-                "message": f"Missing required columns: {', '.join(missing_columns)}"
-            }), 400
-        
-        # Try using the model functions, but fallback to the simple implementations if they fail
-        try:
-            if model_available:
-                demand_predictions = predict_region_demand(df)
-            else:
-                raise ImportError("Model not available")
-        except Exception as e:
-            logger.warning(f"Using fallback for demand prediction. Error with original model: {e}")
-            demand_predictions = simple_predict_region_demand(df)
-            
-        try:
-            if model_available:
-                rise_predictions = predict_demand_rise(df)
-            else:
-                raise ImportError("Model not available")
-        except Exception as e:
-            logger.warning(f"Using fallback for demand rise prediction. Error with original model: {e}")
-            rise_predictions = simple_predict_demand_rise(df)
-            
-        try:
-            if model_available:
-                product_predictions = predict_top_product(df)
-            else:
-                raise ImportError("Model not available")
-        except Exception as e:
-            logger.warning(f"Using fallback for top product prediction. Error with original model: {e}")
-            product_predictions = simple_predict_top_product(df)
-        
-        # Combine results
-        results = {
-            "demand": demand_predictions,
-            "demand_rise": rise_predictions,
-            "top_product": product_predictions
-        }
-        
-        return jsonify({
-            "status": "success",
-            "data": results
-        })
-    except Exception as e:
-        logger.error(f"Error running all predictions: {e}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/upload/data', methods=['POST'])
-@rate_limit
-def upload_data():
-    """Upload and process new data"""
-    try:
-        # Check if file was uploaded
-        if 'file' not in request.files:
-            return jsonify({
-                "status": "error",
-                "message": "No file part in the request"
-            }), 400
-        
-        file = request.files['file']
-        
-        # Check if file is empty
-        if file.filename == '':
-            return jsonify({
-                "status": "error",
-                "message": "No file selected"
-            }), 400
-        
-        # Read file based on extension
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(file)
-        elif file.filename.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(file)
-        elif file.filename.endswith('.json'):
-            df = pd.read_json(file)
-        else:
-            return jsonify({
-                "status": "error",
-                "message": "Unsupported file format. Please upload CSV, Excel, or JSON file."
-            }), 400
-        
-        # Process data
-        if len(df) > 0:
-            # Save to MongoDB for future processing if needed
-            if db is not None:
-                # Convert DataFrame to list of dictionaries
-                records = json.loads(df.to_json(orient='records'))
-                
-                # Insert into a new collection or update existing one
-                upload_collection = db["uploaded_data"]
-                upload_collection.insert_many(records)
-            
-            # Return summary stats
-            return jsonify({
-                "status": "success",
-                "message": "Data uploaded successfully",
-                "data": {
-                    "rows": len(df),
-                    "columns": list(df.columns),
-                    "sample": json.loads(df.head(5).to_json(orient='records'))
-                }
-            })
-        else:
-            return jsonify({
-                "status": "error",
-                "message": "Uploaded file contains no data"
-            }), 400
-    except Exception as e:
-        logger.error(f"Error uploading data: {e}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/sales/add', methods=['POST'])
-@rate_limit
-def add_sales_data():
-    """Add new sales data records directly to the database"""
-    try:
-        data = request.get_json()
-        
-        if not data or not isinstance(data, list):
-            return jsonify({
-                "status": "error",
-                "message": "Invalid input: Expected a list of sales data records"
-            }), 400
-        
-        # Validate required fields for sales data - align with SDG.py
-        required_fields = ["pincode", "product", "channel"]
-        
-        # Check if at least one record contains the required fields
-        valid_records = []
-        invalid_records = []
-        
-        for i, record in enumerate(data):
-            missing_fields = [field for field in required_fields if field not in record]
-            if missing_fields:
-                invalid_records.append({
-                    "index": i,
-                    "missing_fields": missing_fields
-                })
-            else:
-                # Validate and format date field if present
-                if "date" in record and isinstance(record["date"], str):
-                    try:
-                        # Try to parse the date string
-                        date_obj = datetime.datetime.fromisoformat(record["date"].replace('Z', '+00:00'))
-                        record["date"] = date_obj
-                    except ValueError:
-                        # If date parsing fails, add current date
-                        record["date"] = datetime.datetime.now()
-                elif "date" not in record:
-                    # Add current date if missing
-                    record["date"] = datetime.datetime.now()
-                
-                valid_records.append(record)
-        
-        if not valid_records:
-            return jsonify({
-                "status": "error",
-                "message": "No valid records found in the input data",
-                "details": invalid_records
-            }), 400
-        
-        # Insert valid records into MongoDB
-        if db is not None:
-            # Add timestamp for insertion
-            for record in valid_records:
-                record["inserted_at"] = datetime.datetime.now()
-            
-            # Insert into sales collection
-            sales_collection = db["sales_data"]
-            result = sales_collection.insert_many(valid_records)
-            
-            return jsonify({
-                "status": "success",
-                "message": f"Successfully added {len(result.inserted_ids)} sales records",
-                "data": {
-                    "inserted_count": len(result.inserted_ids),
-                    "invalid_records": invalid_records if invalid_records else None
-                }
-            })
-        else:
-            # If database not available, return a mock success with warning
-            return jsonify({
-                "status": "warning",
-                "message": "Database not available, but records validated successfully",
-                "data": {
-                    "valid_count": len(valid_records),
-                    "invalid_records": invalid_records if invalid_records else None,
-                    "note": "Records were not stored. Please try again when the database is available."
-                }
-            })
-    except Exception as e:
-        logger.error(f"Error adding sales data: {e}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/generate-sample-data/<int:count>', methods=['GET'])
-@rate_limit
-def generate_sample_data(count):
-    """Generate and add sample sales data to the database"""
-    try:
-        if not faker_available:
-            return jsonify({
-                "status": "error",
-                "message": "Faker module not available. Please install with 'pip install faker'"
-            }), 500
-            
-        if count <= 0 or count > 10000:
-            return jsonify({
-                "status": "error",
-                "message": "Count must be between 1 and 10000"
-            }), 400
-            
-        if db is None:
-            return jsonify({
-                "status": "error",
-                "message": "Database connection not available"
-            }), 503
-            
-        # Initialize Faker
-        fake = Faker()
-        
-        # Product types and channels - match SDG.py
-        product_types = ["loan", "credit_card", "insurance"]
-        channels = ["online", "offline"]
-        
-        # Generate sample data
-        records = []
-        for _ in range(count):
-            end_date = datetime.datetime.now()
-            start_date = end_date - datetime.timedelta(days=365)
-            random_date = fake.date_time_between(start_date=start_date, end_date=end_date)
-            
-            record = {
-                "date": random_date,
-                "pincode": fake.postcode(),
-                "city": fake.city(),
-                "product": random.choice(product_types),
-                "channel": random.choice(channels),
-                "agent_id": str(fake.uuid4()),
-                "customer_age": random.randint(21, 60),
-                "customer_income": random.randint(20000, 100000),
-                "inserted_at": datetime.datetime.now()
-            }
-            records.append(record)
-            
-        # Insert records into MongoDB
-        sales_collection = db["sales_data"]
-        result = sales_collection.insert_many(records)
-        
-        return jsonify({
-            "status": "success",
-            "message": f"Generated and inserted {len(result.inserted_ids)} sample records",
-            "data": {
-                "inserted_count": len(result.inserted_ids),
-                "sample": json.loads(json.dumps([{k: str(v) if isinstance(v, datetime.datetime) else v 
-                                                for k, v in records[0].items()}], 
-                                               default=str))
-            }
-        })
-        
-    except Exception as e:
-        logger.error(f"Error generating sample data: {e}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-# Health check endpoint
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    # Check MongoDB connection
-    mongo_status = "connected" if db_available else "disconnected"
-    
-    # Check if models are available
-    models_status = "available" if model_available else "unavailable"
-    
-    # Overall health status
-    is_healthy = db_available  # Simplified - could include more checks
-    
-    response = {
-        "status": "healthy" if is_healthy else "unhealthy",
-        "checks": {
-            "mongodb": mongo_status,
-            "models": models_status
-        }
-    }
-    
-    status_code = 200 if is_healthy else 503
-    return jsonify(response), status_code
-
-# Add custom error handlers
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({
-        "status": "error",
-        "message": "The requested resource was not found."
-    }), 404
-
-@app.errorhandler(500)
-def server_error(error):
-    return jsonify({
-        "status": "error",
-        "message": "An internal server error occurred."
-    }), 500
-
-# Add a version endpoint
-@app.route('/version', methods=['GET'])
-@rate_limit
-def get_version():
-    """Get API version information"""
-    try:
-        if db is not None and "model_evaluation" in db.list_collection_names():
-            timestamp_doc = db["model_evaluation"].find_one({}, {"timestamp": 1})
-            if timestamp_doc and "timestamp" in timestamp_doc:
-                models_last_trained = timestamp_doc["timestamp"]
-            else:
-                models_last_trained = "2023-10-01"
-        else:
-            models_last_trained = "2023-10-01"
-            
-        return jsonify({
-            "status": "success",
-            "data": {
-                "api_version": "1.0.0",
-                "models_last_trained": models_last_trained
-            }
-        })
-    except Exception as e:
-        logger.error(f"Error getting version info: {e}")
-        return jsonify({
-            "status": "success",
-            "data": {
-                "api_version": "1.0.0",
-                "models_last_trained": "2023-10-01",
-                "error_getting_details": str(e)
-            }
-        })
-
-# Add a statistics endpoint
-@app.route('/stats', methods=['GET'])
-@rate_limit
-def get_stats():
-    """Get API usage statistics"""
-    try:
-        stats = {}
-        
-        if db is not None:
-            collection_stats = {}
-            for collection_name in ["demand_prediction", "model_details", "uploaded_data", "sales_data"]:
-                if collection_name in db.list_collection_names():
-                    collection_stats[f"{collection_name}_count"] = db[collection_name].count_documents({})
-                else:
-                    collection_stats[f"{collection_name}_count"] = 0
-                    
-            stats.update(collection_stats)
-        else:
-            stats = {
-                "database_status": "unavailable",
-                "note": "Statistics cannot be retrieved because the database is not available."
-            }
-            
-        return jsonify({
-            "status": "success",
-            "data": stats
-        })
-    except Exception as e:
-        logger.error(f"Error fetching stats: {e}")
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-# Run the Flask application
-if __name__ == '__main__':
-    # Import configuration
-    try:
-        from config import API_HOST, API_PORT, DEBUG
-    except ImportError:
-        # Default values if config.py is missing
-        API_HOST = '0.0.0.0'
-        API_PORT = 5000
-        DEBUG = False
-        logger.warning("Config file not found, using default values")
-    
-    logger.info(f"Starting Demand Prediction API on {API_HOST}:{API_PORT}")
-    
+from flask import Flask, request, jsonify, make_response, send_file
+from flask_cors import CORS
+import importlib.util
+import json
+import os
+import threading
+import time
+import traceback
+import logging
+import sys
+from functools import wraps
+import datetime
+import random
+
+# pandas, scikit-learn (via model.py), Faker and pymongo are imported on first
+# use rather than here, so a worker can answer /health before they are loaded;
+# PRELOAD_IMPORTS loads them up front instead (see warm_imports)
+from compression import init_compression
+from request_timing import init_request_timing, phase, annotate
+from metrics import init_metrics, record_prediction, metrics_response, prometheus_available
+from profiling import init_profiling, is_authorized, list_profiles, profile_path, profile_summary
+from memory_watchdog import init_memory_watchdog, register_cache, memory_status, memory_report
+from upload_parser import is_supported_upload, parse_upload, parser_stats, ParserBusyError
+from readiness import start_warmup, readiness_report, synthetic_batch
+from circuit_breaker import register_breaker, breaker_states, breaker_report
+from model_registry import get_metadata, product_classes, trained_at, registry_info
+from prediction_format import format_predictions
+
+try:
+    from config import (
+        MONGO_URI, MONGO_DB, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_RECONNECT_SECONDS, PRELOAD_IMPORTS,
+        CIRCUIT_PROBE_ROWS
+    )
+except ImportError:
+    MONGO_URI = "mongodb://localhost:27017/"
+    MONGO_DB = "gromo"
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+    MONGO_RECONNECT_SECONDS = 5.0
+    PRELOAD_IMPORTS = False
+    CIRCUIT_PROBE_ROWS = 20
+
+# model.py is imported by get_model() on first use
+model_available = importlib.util.find_spec("model") is not None
+_model = None
+
+# Faker is imported when sample data is generated
+faker_available = importlib.util.find_spec("faker") is not None
+if not faker_available:
+    print("Faker module not available. Sample data generation will be limited.")
+
+def get_model():
+    """Import model.py (pandas, scikit-learn) on first use; None if it cannot be imported"""
+    global _model, model_available
+    if _model is None and model_available:
+        try:
+            import model
+            register_cache("coordinates", lambda: len(model.coordinate_cache))
+            _model = model
+        except ImportError as e:
+            print(f"Error importing model functions: {e}")
+            model_available = False
+    return _model
+
+app = Flask(__name__)
+CORS(app)  # Enable CORS for all routes
+init_request_timing(app)  # Server-Timing header per request; registered first so it times the other hooks
+init_metrics(app)  # Prometheus request and MongoDB metrics, served at /metrics
+init_profiling(app)  # cProfile requests sent with X-Profile-Token, and a sample of the rest
+init_memory_watchdog(app)  # Per-worker RSS and cache size checks, recycling past MEMORY_RSS_LIMIT_MB
+init_compression(app)  # Gzip request and response bodies
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+try:
+    from config import ENSURE_INDEXES_ON_STARTUP
+except ImportError:
+    ENSURE_INDEXES_ON_STARTUP = False
+
+# MongoDB connection. Each process connects in a background thread started
+# by its first request, so importing the app never waits for the database
+# and no client (or its monitor threads) exists before gunicorn forks.
+# db stays None until the server has answered a ping.
+client = None
+db = None
+db_available = False
+_db_pid = None
+_db_lock = threading.Lock()
+_db_attempted = threading.Event()
+
+# Endpoints that do not wait for the first connection attempt. The predictions
+# only read model metadata, and top-product uses the default product list
+# until it has been loaded
+DB_FREE_ENDPOINTS = {"index", "health_check", "readiness_check", "get_metrics", "get_profiles", "get_profile", "static",
+                     "predict_demand", "predict_rise", "predict_product", "predict_all"}
+
+def connect_db():
+    """Connect to MongoDB, retrying every MONGO_RECONNECT_SECONDS until it answers a ping"""
+    global client, db, db_available
+    from pymongo import MongoClient
+    from mongo_monitoring import register_command_monitor
+    # Monitor every command (latency, collection, documents, slow-operation log);
+    # this must happen before the client is created
+    register_command_monitor()
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS)
+    while True:
+        try:
+            client.admin.command('ping')
+            break
+        except Exception as e:
+            logger.error(f"MongoDB connection error: {e}")
+            _db_attempted.set()
+            time.sleep(MONGO_RECONNECT_SECONDS)
+    db = client[MONGO_DB]
+    db_available = True
+    _db_attempted.set()
+    logger.info("Connected to MongoDB successfully")
+    
+    # Apply the declared index set; creating an index that already exists is a no-op
+    if ENSURE_INDEXES_ON_STARTUP:
+        try:
+            from db_indexes import ensure_indexes
+            ensure_indexes(db)
+            logger.info("MongoDB indexes verified")
+        except Exception as e:
+            logger.error(f"Error ensuring MongoDB indexes: {e}")
+
+def start_db_connection():
+    """Start connecting to MongoDB in this process unless it already has"""
+    global _db_pid
+    if _db_pid != os.getpid():
+        with _db_lock:
+            if _db_pid != os.getpid():
+                _db_pid = os.getpid()
+                _db_attempted.clear()
+                threading.Thread(target=connect_db, name="mongo-connect", daemon=True).start()
+
+def start_worker():
+    """Connect to MongoDB and warm this process up in the background (see readiness.py)"""
+    start_db_connection()
+    start_warmup(get_model, lambda: db)
+
+@app.before_request
+def ensure_db_connection():
+    """Start the worker's connection and warmup, and let database routes wait for the first attempt"""
+    start_worker()
+    if request.endpoint not in DB_FREE_ENDPOINTS and not _db_attempted.is_set():
+        _db_attempted.wait(MONGO_SERVER_SELECTION_TIMEOUT_MS / 1000 + 1)
+
+def warm_imports():
+    """
+    Import everything the routes load lazily and map the pincode table
+
+    Run this in a gunicorn master started with --preload (server.py does)
+    so forked workers share the imported modules copy-on-write instead of
+    each importing them on their first requests.
+    """
+    import pandas
+    import numpy
+    import pymongo
+    import mongo_monitoring
+    import sales_cube
+    from pincode_table import load_pincode_table
+    load_pincode_table()
+    get_model()
+    if faker_available:
+        import faker
+
+if PRELOAD_IMPORTS:
+    warm_imports()
+
+# Region summaries carry internal counters maintained by region_summary.py
+REGION_PROJECTION = {'_id': 0, 'counts': 0, 'summary_watermark': 0}
+
+# Helper function to get the product classes of the published top product model
+def load_product_classes():
+    """Product names by class index, from the model metadata registry (defaults until loaded)"""
+    return product_classes(db)
+
+# Helper function to keep the sales cube in step with newly ingested records
+def record_in_cube(records):
+    """Add ingested sales records to the pre-aggregated sales cube"""
+    try:
+        from sales_cube import update_cube
+        update_cube(db, records)
+    except Exception as e:
+        # The sales are stored in sales_data; `python sales_cube.py rebuild` recovers the cube
+        logger.error(f"Error updating sales cube: {e}")
+
+# Prediction requests and responses come as a list of row dicts or, opt-in,
+# as columns: {"pincode": [...], "product": [...], ...}
+PREDICTION_FORMATS = ("rows", "columns")
+
+def prediction_frame(data):
+    """Build a DataFrame from a list of rows or a dict of equal-length columns, or None if invalid"""
+    import pandas as pd
+    if isinstance(data, list) and data:
+        return pd.DataFrame(data)
+    if isinstance(data, dict) and data and all(isinstance(v, list) for v in data.values()):
+        if len({len(v) for v in data.values()}) == 1 and len(next(iter(data.values()))) > 0:
+            return pd.DataFrame(data)
+    return None
+
+# Columns the models group and one-hot encode by; their values must be labels
+KEY_COLUMNS = ["pincode", "product", "channel"]
+
+def clean_key_columns(df, required_columns):
+    """
+    Check the key columns and convert their values to strings
+
+    Returns (df, None), or (df, message) if a key holds a list, an object or
+    a fractional number, or a required key is missing from a row. Bad input
+    is rejected here rather than inside the model, where its errors would
+    count against the circuit breaker.
+    """
+    import pandas as pd
+    for column in KEY_COLUMNS:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if column in required_columns and values.isna().any():
+            return df, f"Missing values in column {column}"
+        if pd.api.types.infer_dtype(values, skipna=True) == "string":
+            continue
+        labels = []
+        for value in values:
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            if value is None or (isinstance(value, float) and value != value):
+                labels.append(None)
+            elif isinstance(value, (str, int)) and not isinstance(value, bool):
+                labels.append(str(value))
+            else:
+                return df, f"Invalid value in column {column}: expected a string or a whole number"
+        df[column] = pd.Series(labels, index=df.index)
+    return df, None
+
+def response_format(data):
+    """Pick the response format: ?format=rows|columns, else the shape of the request"""
+    return request.args.get('format') or ("columns" if isinstance(data, dict) else "rows")
+
+# Rate limiting decorator - simplified version
+def rate_limit(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # Here you would implement actual rate limiting
+        # For now, we just log the request; request counts are in /metrics
+        logger.debug(f"Request to {func.__name__}")
+        return func(*args, **kwargs)
+    return wrapper
+
+# Simple vectorized implementations for when the real model is failing, or
+# its circuit breaker is open; they return rows, or columns if as_columns
+def simple_predict_region_demand(df, as_columns=False):
+    """Fallback function for predicting region demand"""
+    import numpy as np
+    n = len(df)
+    columns = {
+        "pincode": df["pincode"].tolist(),
+        "product": df["product"].tolist(),
+        "channel": df["channel"].tolist(),
+        "predicted_demand": np.round(np.random.uniform(100, 1000, n), 2).tolist(),
+        "confidence": np.round(np.random.uniform(0.7, 0.95, n), 2).tolist()
+    }
+    return format_predictions(columns, as_columns)
+
+# Fallback function for demand rise prediction
+def simple_predict_demand_rise(df, as_columns=False):
+    """Fallback function for predicting demand rise"""
+    import numpy as np
+    n = len(df)
+    columns = {
+        "pincode": df["pincode"].tolist(),
+        "product": df["product"].tolist(),
+        "channel": df["channel"].tolist(),
+        "demand_rise": (np.random.random(n) < 0.5).tolist(),
+        "probability": np.round(np.random.uniform(0.6, 0.9, n), 2).tolist()
+    }
+    return format_predictions(columns, as_columns)
+
+# Fallback function for top product prediction
+def simple_predict_top_product(df, as_columns=False):
+    """Fallback function for predicting top product"""
+    import numpy as np
+    products = load_product_classes()
+    n = len(df)
+    rows = np.arange(n)
+    # A random top product scores 0.5-0.9 and the others 0.1-0.5, normalized to sum to 1
+    top = np.random.randint(0, len(products), n)
+    probs = np.round(np.random.uniform(0.1, 0.5, (n, len(products))), 2)
+    probs[rows, top] = np.round(np.random.uniform(0.5, 0.9, n), 2)
+    probs = np.round(probs / probs.sum(axis=1, keepdims=True), 2)
+    columns = {
+        "pincode": df["pincode"].tolist(),
+        "channel": df["channel"].tolist(),
+        "top_product": np.array(products)[top].tolist(),
+        "probability": probs[rows, top].tolist(),
+        "all_products": {p: probs[:, i].tolist() for i, p in enumerate(products)}
+    }
+    return format_predictions(columns, as_columns)
+
+# Prediction name (as in /metrics) -> (model call, fallback)
+PREDICTORS = {
+    "demand": (lambda model, df, as_columns: model.predict_region_demand(df, as_columns),
+               simple_predict_region_demand),
+    "demand_rise": (lambda model, df, as_columns: model.predict_demand_rise(df, as_columns),
+                    simple_predict_demand_rise),
+    "top_product": (lambda model, df, as_columns: model.predict_top_product(df, as_columns, load_product_classes()),
+                    simple_predict_top_product)
+}
+
+def _probe(name):
+    """Recovery probe for a circuit breaker: score a small synthetic batch with the model"""
+    predict, _ = PREDICTORS[name]
+    def probe():
+        model = get_model()
+        if model is None:
+            raise ImportError("Model not available")
+        predict(model, synthetic_batch(CIRCUIT_PROBE_ROWS), False)
+    return probe
+
+BREAKERS = {name: register_breaker(name, _probe(name)) for name in PREDICTORS}
+
+def run_prediction(name, df, as_columns):
+    """
+    Score df with a model, or with its fallback if the model fails or its breaker is open
+
+    While the breaker is open the model is not called at all, so requests do
+    not pay for a failing attempt.
+    """
+    predict, fallback_predict = PREDICTORS[name]
+    breaker = BREAKERS[name]
+    predictions = None
+    if breaker.allow():
+        try:
+            model = get_model()
+            if model is None:
+                raise ImportError("Model not available")
+            predictions = predict(model, df, as_columns)
+            breaker.record_success()
+        except Exception as e:
+            breaker.record_failure(e)
+            logger.warning(f"Using fallback for {name} prediction. Error with original model: {e}")
+    fallback = predictions is None
+    if fallback:
+        with phase("fallback"):
+            predictions = fallback_predict(df, as_columns)
+    record_prediction(name, len(df), fallback)
+    return predictions
+
+# API routes
+@app.route('/')
+def index():
+    """API home page with documentation"""
+    return jsonify({
+        "status": "success",
+        "message": "Demand Prediction API is running",
+        "endpoints": {
+            "GET /": "API information",
+            "GET /regions": "Get all region summaries",
+            "GET /regions/<region_id>": "Get a specific region summary",
+            "GET /models": "Get model details and evaluation metrics",
+            "POST /predict/demand": "Predict region demand",
+            "POST /predict/demand-rise": "Predict if demand will rise",
+            "POST /predict/top-product": "Predict top product for a region",
+            "POST /predict/all": "Run all three prediction models",
+            "POST /upload/data": "Upload data file (CSV, Excel, JSON)",
+            "POST /sales/add": "Add sales data records directly",
+            "GET /generate-sample-data/<count>": "Generate and add sample sales data",
+            "GET /health": "API health check",
+            "GET /ready": "Readiness probe (warmed up, MongoDB reachable)",
+            "GET /version": "API version information",
+            "GET /stats": "API usage statistics",
+            "GET /metrics": "Prometheus metrics",
+            "GET /profiles": "List captured request profiles (requires X-Profile-Token)",
+            "GET /profiles/<name>": "Download a request profile (requires X-Profile-Token)"
+        }
+    })
+
+@app.route('/regions', methods=['GET'])
+@rate_limit
+def get_regions():
+    """Get all region summaries from the database"""
+    try:
+        if db is not None:
+            regions = list(db["demand_prediction"].find({}, REGION_PROJECTION))
+            return jsonify({
+                "status": "success",
+                "data": regions
+            })
+        else:
+            return jsonify({
+                "status": "error",
+                "message": "Database connection not available"
+            }), 503
+    except Exception as e:
+        logger.error(f"Error fetching regions: {e}")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/regions/<region_id>', methods=['GET'])
+@rate_limit
+def get_region(region_id):
+    """Get a specific region summary by ID"""
+    try:
+        if db is not None:
+            # Convert string region_id to integer if possible
+            try:
+                region_id = int(region_id)
+            except ValueError:
+                pass
+                
+            region = db["demand_prediction"].find_one({"region_id": region_id}, REGION_PROJECTION)
+            if region:
+                return jsonify({
+                    "status": "success",
+                    "data": region
+                })
+            else:
+                return jsonify({
+                    "status": "error",
+                    "message": f"Region with ID {region_id} not found"
+                }), 404
+        else:
+            return jsonify({
+                "status": "error",
+                "message": "Database connection not available"
+            }), 503
+    except Exception as e:
+        logger.error(f"Error fetching region {region_id}: {e}")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/models', methods=['GET'])
+@rate_limit
+def get_models():
+    """Get model details and evaluation metrics"""
+    try:
+        # Served from the registry, which re-reads MongoDB only for a new model version
+        metadata = get_metadata(db)
+        if metadata is not None:
+            return jsonify({
+                "status": "success",
+                "data": {
+                    "model_details": metadata["model_details"],
+                    "evaluation": metadata["evaluation"]
+                }
+            })
+        elif db is not None:
+            return jsonify({
+                "status": "error",
+                "message": "Model metadata could not be loaded"
+            }), 500
+        else:
+            return jsonify({
+                "status": "error",
+                "message": "Database connection not available"
+            }), 503
+    except Exception as e:
+        logger.error(f"Error fetching model details: {e}")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/predict/demand', methods=['POST'])
+@rate_limit
+def predict_demand():
+    """Predict region demand using regression model"""
+    try:
+        with phase("get_json"):
+            data = request.get_json()
+        output_format = response_format(data)
+        
+        if output_format not in PREDICTION_FORMATS:
+            return jsonify({
+                "status": "error",
+                "message": f"Invalid format: {output_format}. Expected one of {', '.join(PREDICTION_FORMATS)}"
+            }), 400
+        
+        # Convert JSON to DataFrame
+        with phase("dataframe"):
+            df = prediction_frame(data)
+        
+        if df is None:
+            return jsonify({
+                "status": "error",
+                "message": "Invalid input: Expected a list of data points or a dict of equal-length columns"
+            }), 400
+        as_columns = output_format == "columns"
+        annotate(rows=len(df))
+        
+        # Validate required columns
+        required_columns = ["pincode", "product", "channel"]
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        
+        if missing_columns:
+            return jsonify({
+                "status": "error",
+                "message": f"Missing required columns: {', '.join(missing_columns)}"
+            }), 400
+        
+        # Bad values are rejected before they reach the model's circuit breaker
+        df, invalid = clean_key_columns(df, required_columns)
+        if invalid:
+            return jsonify({
+                "status": "error",
+                "message": invalid
+            }), 400
+        
+        # The model behind its circuit breaker, or the vectorized fallback
+        predictions = run_prediction("demand", df, as_columns)
+        
+        with phase("jsonify"):
+            response = jsonify({
+                "status": "success",
+                "data": predictions
+            })
+        return response
+    except Exception as e:
+        logger.error(f"Error predicting demand: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/predict/demand-rise', methods=['POST'])
+@rate_limit
+def predict_rise():
+    """Predict if demand will rise using binary classification model"""
+    try:
+        with phase("get_json"):
+            data = request.get_json()
+        output_format = response_format(data)
+        
+        if output_format not in PREDICTION_FORMATS:
+            return jsonify({
+                "status": "error",
+                "message": f"Invalid format: {output_format}. Expected one of {', '.join(PREDICTION_FORMATS)}"
+            }), 400
+        
+        # Convert JSON to DataFrame
+        with phase("dataframe"):
+            df = prediction_frame(data)
+        
+        if df is None:
+            return jsonify({
+                "status": "error",
+                "message": "Invalid input: Expected a list of data points or a dict of equal-length columns"
+            }), 400
+        as_columns = output_format == "columns"
+        annotate(rows=len(df))
+        
+        # Validate required columns
+        required_columns = ["pincode", "product", "channel"]
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        
+        if missing_columns:
+            return jsonify({
+                "status": "error",
+                "message": f"Missing required columns: {', '.join(missing_columns)}"
+            }), 400
+        
+        # Bad values are rejected before they reach the model's circuit breaker
+        df, invalid = clean_key_columns(df, required_columns)
+        if invalid:
+            return jsonify({
+                "status": "error",
+                "message": invalid
+            }), 400
+        
+        # The model behind its circuit breaker, or the vectorized fallback
+        predictions = run_prediction("demand_rise", df, as_columns)
+        
+        with phase("jsonify"):
+            response = jsonify({
+                "status": "success",
+                "data": predictions
+            })
+        return response
+    except Exception as e:
+        logger.error(f"Error predicting demand rise: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/predict/top-product', methods=['POST'])
+@rate_limit
+def predict_product():
+    """Predict top product using multi-class classification model"""
+    try:
+        with phase("get_json"):
+            data = request.get_json()
+        output_format = response_format(data)
+        
+        if output_format not in PREDICTION_FORMATS:
+            return jsonify({
+                "status": "error",
+                "message": f"Invalid format: {output_format}. Expected one of {', '.join(PREDICTION_FORMATS)}"
+            }), 400
+        
+        # Convert JSON to DataFrame
+        with phase("dataframe"):
+            df = prediction_frame(data)
+        
+        if df is None:
+            return jsonify({
+                "status": "error",
+                "message": "Invalid input: Expected a list of data points or a dict of equal-length columns"
+            }), 400
+        as_columns = output_format == "columns"
+        annotate(rows=len(df))
+        
+        # Validate required columns
+        required_columns = ["pincode", "channel"]
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        
+        if missing_columns:
+            return jsonify({
+                "status": "error",
+                "message": f"Missing required columns: {', '.join(missing_columns)}"
+            }), 400
+        
+        # Bad values are rejected before they reach the model's circuit breaker
+        df, invalid = clean_key_columns(df, required_columns)
+        if invalid:
+            return jsonify({
+                "status": "error",
+                "message": invalid
+            }), 400
+        
+        # The model behind its circuit breaker, or the vectorized fallback
+        predictions = run_prediction("top_product", df, as_columns)
+        
+        with phase("jsonify"):
+            response = jsonify({
+                "status": "success",
+                "data": predictions
+            })
+        return response
+    except Exception as e:
+        logger.error(f"Error predicting top product: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/predict/all', methods=['POST'])
+@rate_limit
+def predict_all():
+    """Run all prediction models at once"""
+    try:
+        with phase("get_json"):
+            data = request.get_json()
+        output_format = response_format(data)
+        
+        if output_format not in PREDICTION_FORMATS:
+            return jsonify({
+                "status": "error",
+                "message": f"Invalid format: {output_format}. Expected one of {', '.join(PREDICTION_FORMATS)}"
+            }), 400
+        
+        # Convert JSON to DataFrame
+        with phase("dataframe"):
+            df = prediction_frame(data)
+        
+        if df is None:
+            return jsonify({
+                "status": "error",
+                "message": "Invalid input: Expected a list of data points or a dict of equal-length columns"
+            }), 400
+        as_columns = output_format == "columns"
+        annotate(rows=len(df))
+        
+        # Validate required columns
+        required_columns = ["pincode", "product", "channel"]
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        
+        if missing_columns:
+            return jsonify({
+                "status": "error",
+                "message": f"Missing required columns: {', '.join(missing_columns)}"
+            }), 400
+        
+        # Bad values are rejected before they reach the model's circuit breaker
+        df, invalid = clean_key_columns(df, required_columns)
+        if invalid:
+            return jsonify({
+                "status": "error",
+                "message": invalid
+            }), 400
+        
+        # Each model behind its circuit breaker, or its vectorized fallback
+        demand_predictions = run_prediction("demand", df, as_columns)
+        rise_predictions = run_prediction("demand_rise", df, as_columns)
+        product_predictions = run_prediction("top_product", df, as_columns)
+        
+        # Combine results
+        results = {
+            "demand": demand_predictions,
+            "demand_rise": rise_predictions,
+            "top_product": product_predictions
+        }
+        
+        with phase("jsonify"):
+            response = jsonify({
+                "status": "success",
+                "data": results
+            })
+        return response
+    except Exception as e:
+        logger.error(f"Error running all predictions: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/upload/data', methods=['POST'])
+@rate_limit
+def upload_data():
+    """Upload and process new data"""
+    try:
+        # Check if file was uploaded
+        if 'file' not in request.files:
+            return jsonify({
+                "status": "error",
+                "message": "No file part in the request"
+            }), 400
+        
+        file = request.files['file']
+        
+        # Check if file is empty
+        if file.filename == '':
+            return jsonify({
+                "status": "error",
+                "message": "No file selected"
+            }), 400
+        
+        # Check the file format before reading anything
+        if not is_supported_upload(file.filename):
+            return jsonify({
+                "status": "error",
+                "message": "Unsupported file format. Please upload CSV, Excel, or JSON file."
+            }), 400
+        
+        # Parse the file; Excel workbooks are parsed in the upload process pool
+        try:
+            columns, chunks = parse_upload(file.filename, file)
+        except ParserBusyError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 503
+        
+        # Process data chunk by chunk as it is parsed
+        rows = 0
+        sample = []
+        for records in chunks:
+            if not records:
+                continue
+            if columns is None:
+                columns = list(records[0].keys())
+            if len(sample) < 5:
+                sample.extend(dict(record) for record in records[:5 - len(sample)])
+            rows += len(records)
+            
+            # Save to MongoDB for future processing if needed
+            if db is not None:
+                # Insert into a new collection or update existing one
+                upload_collection = db["uploaded_data"]
+                # Uploads are free-form and kept apart from sales_data, so
+                # they are not added to the sales cube
+                upload_collection.insert_many(records)
+        
+        if rows > 0:
+            # Return summary stats
+            return jsonify({
+                "status": "success",
+                "message": "Data uploaded successfully",
+                "data": {
+                    "rows": rows,
+                    "columns": columns,
+                    "sample": sample
+                }
+            })
+        else:
+            return jsonify({
+                "status": "error",
+                "message": "Uploaded file contains no data"
+            }), 400
+    except Exception as e:
+        logger.error(f"Error uploading data: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/sales/add', methods=['POST'])
+@rate_limit
+def add_sales_data():
+    """Add new sales data records directly to the database"""
+    try:
+        with phase("get_json"):
+            data = request.get_json()
+        
+        if not data or not isinstance(data, list):
+            return jsonify({
+                "status": "error",
+                "message": "Invalid input: Expected a list of sales data records"
+            }), 400
+        
+        # Validate required fields for sales data - align with SDG.py
+        required_fields = ["pincode", "product", "channel"]
+        
+        # Check if at least one record contains the required fields
+        valid_records = []
+        invalid_records = []
+        
+        for i, record in enumerate(data):
+            missing_fields = [field for field in required_fields if field not in record]
+            if missing_fields:
+                invalid_records.append({
+                    "index": i,
+                    "missing_fields": missing_fields
+                })
+            else:
+                # Validate and format date field if present
+                if "date" in record and isinstance(record["date"], str):
+                    try:
+                        # Try to parse the date string
+                        date_obj = datetime.datetime.fromisoformat(record["date"].replace('Z', '+00:00'))
+                        record["date"] = date_obj
+                    except ValueError:
+                        # If date parsing fails, add current date
+                        record["date"] = datetime.datetime.now()
+                elif "date" not in record:
+                    # Add current date if missing
+                    record["date"] = datetime.datetime.now()
+                
+                valid_records.append(record)
+        
+        if not valid_records:
+            return jsonify({
+                "status": "error",
+                "message": "No valid records found in the input data",
+                "details": invalid_records
+            }), 400
+        
+        # Insert valid records into MongoDB
+        if db is not None:
+            # Add timestamp for insertion
+            for record in valid_records:
+                record["inserted_at"] = datetime.datetime.now()
+            
+            # Insert into sales collection
+            sales_collection = db["sales_data"]
+            result = sales_collection.insert_many(valid_records)
+            record_in_cube(valid_records)
+            
+            return jsonify({
+                "status": "success",
+                "message": f"Successfully added {len(result.inserted_ids)} sales records",
+                "data": {
+                    "inserted_count": len(result.inserted_ids),
+                    "invalid_records": invalid_records if invalid_records else None
+                }
+            })
+        else:
+            # If database not available, return a mock success with warning
+            return jsonify({
+                "status": "warning",
+                "message": "Database not available, but records validated successfully",
+                "data": {
+                    "valid_count": len(valid_records),
+                    "invalid_records": invalid_records if invalid_records else None,
+                    "note": "Records were not stored. Please try again when the database is available."
+                }
+            })
+    except Exception as e:
+        logger.error(f"Error adding sales data: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/generate-sample-data/<int:count>', methods=['GET'])
+@rate_limit
+def generate_sample_data(count):
+    """Generate and add sample sales data to the database"""
+    try:
+        if not faker_available:
+            return jsonify({
+                "status": "error",
+                "message": "Faker module not available. Please install with 'pip install faker'"
+            }), 500
+            
+        if count <= 0 or count > 10000:
+            return jsonify({
+                "status": "error",
+                "message": "Count must be between 1 and 10000"
+            }), 400
+            
+        if db is None:
+            return jsonify({
+                "status": "error",
+                "message": "Database connection not available"
+            }), 503
+            
+        # Initialize Faker
+        from faker import Faker
+        fake = Faker()
+        
+        # Product types and channels - match SDG.py
+        product_types = ["loan", "credit_card", "insurance"]
+        channels = ["online", "offline"]
+        
+        # Generate sample data
+        records = []
+        for _ in range(count):
+            end_date = datetime.datetime.now()
+            start_date = end_date - datetime.timedelta(days=365)
+            random_date = fake.date_time_between(start_date=start_date, end_date=end_date)
+            
+            record = {
+                "date": random_date,
+                "pincode": fake.postcode(),
+                "city": fake.city(),
+                "product": random.choice(product_types),
+                "channel": random.choice(channels),
+                "agent_id": str(fake.uuid4()),
+                "customer_age": random.randint(21, 60),
+                "customer_income": random.randint(20000, 100000),
+                "inserted_at": datetime.datetime.now()
+            }
+            records.append(record)
+            
+        # Insert records into MongoDB
+        sales_collection = db["sales_data"]
+        result = sales_collection.insert_many(records)
+        record_in_cube(records)
+        
+        return jsonify({
+            "status": "success",
+            "message": f"Generated and inserted {len(result.inserted_ids)} sample records",
+            "data": {
+                "inserted_count": len(result.inserted_ids),
+                "sample": json.loads(json.dumps([{k: str(v) if isinstance(v, datetime.datetime) else v 
+                                                for k, v in records[0].items()}], 
+                                               default=str))
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error generating sample data: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+# Health check endpoint
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    # Check MongoDB connection
+    if db_available:
+        mongo_status = "connected"
+    else:
+        mongo_status = "disconnected" if _db_attempted.is_set() else "connecting"
+    
+    # Check if models are available; model.py is imported by the first prediction
+    if not model_available:
+        models_status = "unavailable"
+    else:
+        models_status = "available" if _model is not None else "not loaded"
+    
+    # Overall health status; a worker over its memory ceiling reports unhealthy
+    # while it drains, or for as long as it stays over when nothing can recycle it
+    memory = memory_status()
+    is_healthy = db_available and memory == "ok"  # Simplified - could include more checks
+    
+    response = {
+        "status": "healthy" if is_healthy else "unhealthy",
+        "checks": {
+            "mongodb": mongo_status,
+            "models": models_status,
+            "memory": memory,
+            # "open" while a model's predictions are served by its fallback
+            "circuit_breakers": breaker_states()
+        }
+    }
+    
+    status_code = 200 if is_healthy else 503
+    return jsonify(response), status_code
+
+# Readiness endpoint, for load balancer and orchestrator probes
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Ready once this worker has warmed up and MongoDB answers a ping"""
+    ready, checks = readiness_report(client if db_available else None)
+    memory = memory_status()
+    if memory != "ok":
+        ready = False
+        checks["memory"] = memory
+    
+    response = {
+        "status": "ready" if ready else "not ready",
+        "checks": checks
+    }
+    return jsonify(response), 200 if ready else 503
+
+# Add custom error handlers
+@app.errorhandler(404)
+def not_found(error):
+    return jsonify({
+        "status": "error",
+        "message": "The requested resource was not found."
+    }), 404
+
+@app.errorhandler(500)
+def server_error(error):
+    return jsonify({
+        "status": "error",
+        "message": "An internal server error occurred."
+    }), 500
+
+# Add a version endpoint
+@app.route('/version', methods=['GET'])
+@rate_limit
+def get_version():
+    """Get API version information"""
+    try:
+        models_last_trained = trained_at(db)
+            
+        return jsonify({
+            "status": "success",
+            "data": {
+                "api_version": "1.0.0",
+                "models_last_trained": models_last_trained
+            }
+        })
+    except Exception as e:
+        logger.error(f"Error getting version info: {e}")
+        return jsonify({
+            "status": "success",
+            "data": {
+                "api_version": "1.0.0",
+                "models_last_trained": "2023-10-01",
+                "error_getting_details": str(e)
+            }
+        })
+
+# Prometheus metrics endpoint
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose request, prediction, cache and MongoDB metrics in Prometheus text format"""
+    if not prometheus_available:
+        return jsonify({
+            "status": "error",
+            "message": "Metrics not available. Please install with 'pip install prometheus-client'"
+        }), 503
+    body, content_type = metrics_response()
+    return app.response_class(body, mimetype=None, content_type=content_type)
+
+# Request profile endpoints
+@app.route('/profiles', methods=['GET'])
+def get_profiles():
+    """List captured request profiles, newest first"""
+    if not is_authorized():
+        return jsonify({
+            "status": "error",
+            "message": "A valid X-Profile-Token header is required"
+        }), 403
+    return jsonify({
+        "status": "success",
+        "data": list_profiles()
+    })
+
+@app.route('/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    """Download a profile as a pstats file, or ?format=text for the top functions"""
+    if not is_authorized():
+        return jsonify({
+            "status": "error",
+            "message": "A valid X-Profile-Token header is required"
+        }), 403
+    path = profile_path(name)
+    if path is None:
+        return jsonify({
+            "status": "error",
+            "message": f"Profile {name} not found"
+        }), 404
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        try:
+            summary = profile_summary(path, sort=sort, limit=request.args.get('limit', 40, type=int))
+        except KeyError:
+            return jsonify({
+                "status": "error",
+                "message": f"Invalid sort key: {sort}"
+            }), 400
+        return app.response_class(summary, mimetype='text/plain')
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+
+# Add a statistics endpoint
+@app.route('/stats', methods=['GET'])
+@rate_limit
+def get_stats():
+    """Get API usage statistics"""
+    try:
+        stats = {}
+        
+        if db is not None:
+            collection_stats = {}
+            for collection_name in ["demand_prediction", "model_details", "uploaded_data", "sales_data", "sales_cube"]:
+                if collection_name in db.list_collection_names():
+                    # Read the count from collection metadata instead of scanning every document
+                    collection_stats[f"{collection_name}_count"] = db[collection_name].estimated_document_count()
+                else:
+                    collection_stats[f"{collection_name}_count"] = 0
+                    
+            stats.update(collection_stats)
+        else:
+            stats = {
+                "database_status": "unavailable",
+                "note": "Statistics cannot be retrieved because the database is not available."
+            }
+        
+        # Upload parse pool queue depth and parse times
+        stats["upload_parsing"] = parser_stats()
+        
+        # This worker's memory use, cache sizes and recent allocation growth
+        stats["memory"] = memory_report()
+        
+        # State, failures and trips of this worker's model circuit breakers
+        stats["circuit_breakers"] = breaker_report()
+        
+        # Version and load time of this worker's cached model metadata
+        stats["model_metadata"] = registry_info()
+        
+        # The memory-mapped pincode coordinate table shared by the workers
+        from pincode_table import table_info
+        stats["pincode_table"] = table_info()
+        
+        # MongoDB calls made by this worker, slowest collection/operation first
+        from mongo_monitoring import command_summary
+        stats["mongo_commands"] = command_summary()
+            
+        return jsonify({
+            "status": "success",
+            "data": stats
+        })
+    except Exception as e:
+        logger.error(f"Error fetching stats: {e}")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+# Run the Flask development server; use server.py (gunicorn) in production
+if __name__ == '__main__':
+    # Import configuration
+    try:
+        from config import API_HOST, API_PORT, DEBUG
+    except ImportError:
+        # Default values if config.py is missing
+        API_HOST = '0.0.0.0'
+        API_PORT = 5000
+        DEBUG = False
+        logger.warning("Config file not found, using default values")
+    
+    logger.info(f"Starting Demand Prediction API on {API_HOST}:{API_PORT}")
+    
     app.run(host=API_HOST, port=API_PORT, debug=DEBUG)
\ No newline at end of file
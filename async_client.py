@@ -0,0 +1,357 @@
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+try:
+    import aiohttp
+    aiohttp_available = True
+except ImportError:
+    aiohttp_available = False
+
+from client import (
+    BASE_URL, RETRY_STATUSES, APIError, ChunkedRequestError, DemandPredictionClient, ProgressCallback,
+    is_transient_error
+)
+
+# Methods that may be sent again after a read error or timeout; a POST such as
+# /sales/add may already have been committed
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class AsyncDemandPredictionClient:
+    """
+    Asyncio client for the Demand Prediction API.
+
+    Mirrors the method surface of DemandPredictionClient, but every call is a
+    coroutine running on the caller's event loop. One aiohttp session with a
+    bounded connection pool is shared by all calls, and a semaphore caps the
+    number of requests in flight so one process can keep hundreds of requests
+    going with a small memory footprint.
+
+    Use it as an async context manager so the session is closed:
+
+        async with AsyncDemandPredictionClient() as client:
+            predictions = await client.predict_demand(records)
+    """
+
+    def __init__(self, base_url: str = BASE_URL, timeout: float = 10, max_concurrency: int = 100,
+                 max_retries: int = 3, backoff_factor: float = 0.5, chunk_size: int = 5000,
+                 chunk_retries: int = 2, max_workers: int = 8):
+        """
+        Initialize the async Demand Prediction API client.
+
+        Args:
+            base_url: Base URL of the API, defaults to http://localhost:5000
+            timeout: Total timeout per request in seconds, defaults to 10
+            max_concurrency: Maximum requests in flight (and pooled connections), defaults to 100
+            max_retries: Retries on connection errors and 429/503 responses (and on
+                read errors for GETs), defaults to 3
+            backoff_factor: Base of the jittered exponential backoff in seconds, defaults to 0.5
+            chunk_size: Maximum rows per prediction request, defaults to 5000
+            chunk_retries: Extra attempts for a chunk that fails, defaults to 2
+            max_workers: Maximum chunks of one prediction call in flight at once, defaults to 8
+
+        Raises:
+            ImportError: If aiohttp is not installed
+        """
+        if not aiohttp_available:
+            raise ImportError("aiohttp is required for AsyncDemandPredictionClient. "
+                              "Please install with 'pip install aiohttp'")
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.chunk_size = chunk_size
+        self.chunk_retries = chunk_retries
+        self.max_workers = max_workers
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> 'AsyncDemandPredictionClient':
+        self._get_session()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        """Create the shared session and limiter on first use, inside the running loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self) -> None:
+        """Close the pooled connections held by the client."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before a retry: Retry-After if given, otherwise full jitter."""
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, self.backoff_factor * 2 ** attempt)
+
+    @staticmethod
+    def _handle_response(status: int, body: bytes) -> Dict:
+        """
+        Check an API response for errors and return the parsed JSON.
+
+        Raises:
+            APIError: If the response indicates an error
+        """
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError:
+            raise APIError(f"Failed to parse API response as JSON: {body[:500]!r}", status)
+        if status >= 400 or (isinstance(data, dict) and data.get('status') == 'error'):
+            error_message = data.get('message', 'Unknown error') if isinstance(data, dict) else 'Unknown error'
+            raise APIError(f"API Error ({status}): {error_message}", status)
+        return data
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict:
+        """
+        Send one request through the limiter, retrying on errors and 429/503.
+
+        A connection that could not be opened is retried for every method.
+        Timeouts and dropped connections are retried only for idempotent
+        methods, since a POST may already have been committed.
+
+        Args:
+            method: HTTP method
+            path: API path, e.g. /regions
+            **kwargs: Passed to aiohttp (json=..., data=...)
+
+        Returns:
+            Parsed JSON response
+        """
+        session = self._get_session()
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                try:
+                    async with session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                        body = await response.read()
+                        status = response.status
+                        retry_after = response.headers.get('Retry-After')
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    sent = not isinstance(e, aiohttp.ClientConnectorError)
+                    if attempt == self.max_retries or (sent and method not in IDEMPOTENT_METHODS):
+                        raise
+                    status, retry_after = None, None
+            if status in RETRY_STATUSES and attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+                continue
+            if status is None:
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            return self._handle_response(status, body)
+
+    async def check_api_status(self) -> Dict:
+        """Test if the API is running and return available endpoints."""
+        return await self._request('GET', '/')
+
+    async def get_all_regions(self) -> List[Dict]:
+        """Fetch all region summaries."""
+        result = await self._request('GET', '/regions')
+        return result.get('data', [])
+
+    async def get_region_by_id(self, region_id: Union[int, str]) -> Dict:
+        """Fetch a specific region by ID."""
+        result = await self._request('GET', f'/regions/{region_id}')
+        return result.get('data', {})
+
+    async def get_model_details(self) -> Dict:
+        """Fetch model details and evaluation metrics."""
+        result = await self._request('GET', '/models')
+        return result.get('data', {})
+
+    @staticmethod
+    def _is_transient(error: BaseException) -> bool:
+        """Transport errors and 5xx/429 responses, which may succeed if sent again."""
+        return (isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+                or is_transient_error(error))
+
+    async def _post_chunk_with_retries(self, endpoint: str, records: List[Dict]) -> Any:
+        """
+        Send one chunk, retrying it on its own up to chunk_retries times after transient errors.
+
+        Predictions write nothing, so unlike other POSTs a chunk is also sent
+        again after a timeout.
+        """
+        for attempt in range(self.chunk_retries + 1):
+            try:
+                result = await self._request('POST', endpoint, json=records)
+                return result.get('data')
+            except Exception as e:
+                if attempt == self.chunk_retries or not self._is_transient(e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    def _iter_input_chunks(self, data: Union[List[Dict], str, pd.DataFrame]) -> Tuple[Optional[int], Iterator[List[Dict]]]:
+        """Split input data into chunks of at most chunk_size records, reading CSV and JSON Lines files lazily."""
+        if isinstance(data, str) and data.endswith(('.csv', '.jsonl', '.ndjson')):
+            if not os.path.exists(data):
+                raise FileNotFoundError(f"File not found: {data}")
+            if data.endswith('.csv'):
+                readers = pd.read_csv(data, chunksize=self.chunk_size)
+            else:
+                readers = pd.read_json(data, lines=True, chunksize=self.chunk_size)
+            return None, (DemandPredictionClient._frame_records(chunk) for chunk in readers)
+
+        records = DemandPredictionClient._process_input_data(data)
+        return len(records), (records[i:i + self.chunk_size] for i in range(0, len(records), self.chunk_size))
+
+    async def _predict(self, endpoint: str, data: Union[List[Dict], str, pd.DataFrame],
+                       progress_callback: Optional[ProgressCallback] = None) -> Any:
+        """
+        Score input data, sending chunks of chunk_size rows concurrently.
+
+        A producer reads the input a chunk at a time (off the event loop) into
+        a queue of max_workers chunks, and max_workers tasks send them, so at
+        most 2 * max_workers chunks are held however long the input is. The
+        requests share the client's concurrency limit with every other call.
+        Results are reassembled in input order; chunks that still fail after
+        their retries are reported in ChunkedRequestError.
+        """
+        total_rows, chunks = self._iter_input_chunks(data)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_workers)
+        results: Dict[int, Any] = {}
+        failed_chunks: Dict[int, BaseException] = {}
+        start = time.perf_counter()
+        rows_done = 0
+
+        async def produce() -> None:
+            loop = asyncio.get_running_loop()
+            index = 0
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                await queue.put((index, chunk))
+                index += 1
+            if index == 0:
+                # Empty input still gets the API's answer for an empty batch
+                await queue.put((0, []))
+            for _ in range(self.max_workers):
+                await queue.put(None)
+
+        async def send_chunks() -> None:
+            nonlocal rows_done
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, chunk = item
+                try:
+                    results[index] = await self._post_chunk_with_retries(endpoint, chunk)
+                except Exception as e:
+                    failed_chunks[index] = e
+                    continue
+                if progress_callback is not None:
+                    rows_done += len(chunk)
+                    elapsed = time.perf_counter() - start
+                    progress_callback(rows_done, total_rows, rows_done / elapsed if elapsed > 0 else 0.0)
+
+        senders = [asyncio.ensure_future(send_chunks()) for _ in range(self.max_workers)]
+        try:
+            await produce()
+            await asyncio.gather(*senders)
+        finally:
+            # Stop the senders if reading the input failed
+            for sender in senders:
+                sender.cancel()
+
+        outcomes = [results.get(i) for i in range(len(results) + len(failed_chunks))]
+        if failed_chunks:
+            raise ChunkedRequestError(failed_chunks, outcomes, self.chunk_size)
+        if len(outcomes) == 1:
+            return outcomes[0]
+        return DemandPredictionClient._merge_chunk_results(outcomes)
+
+    async def predict_demand(self, data: Union[List[Dict], str, pd.DataFrame],
+                             progress_callback: Optional[ProgressCallback] = None) -> List[Dict]:
+        """Predict region demand using the API."""
+        return await self._predict('/predict/demand', data, progress_callback)
+
+    async def predict_demand_rise(self, data: Union[List[Dict], str, pd.DataFrame],
+                                  progress_callback: Optional[ProgressCallback] = None) -> List[Dict]:
+        """Predict if demand will rise using the API."""
+        return await self._predict('/predict/demand-rise', data, progress_callback)
+
+    async def predict_top_product(self, data: Union[List[Dict], str, pd.DataFrame],
+                                  progress_callback: Optional[ProgressCallback] = None) -> List[Dict]:
+        """Predict top product using the API."""
+        return await self._predict('/predict/top-product', data, progress_callback)
+
+    async def predict_all(self, data: Union[List[Dict], str, pd.DataFrame],
+                          progress_callback: Optional[ProgressCallback] = None) -> Dict:
+        """Run all prediction models using the API."""
+        return await self._predict('/predict/all', data, progress_callback)
+
+    async def upload_data(self, file_path: str) -> Dict:
+        """
+        Upload a data file to the API, streaming it from disk.
+
+        The file is read in blocks as the request body is written, so memory
+        use does not grow with the file size.
+
+        Raises:
+            FileNotFoundError: If the specified file does not exist
+            ValueError: If the file format is unsupported
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        if not file_path.endswith(('.csv', '.xls', '.xlsx', '.json')):
+            raise ValueError(f"Unsupported file format: {file_path}")
+
+        with open(file_path, 'rb') as file:
+            form = aiohttp.FormData()
+            form.add_field('file', file, filename=os.path.basename(file_path))
+            # A streamed body cannot be replayed, so uploads are not retried
+            session = self._get_session()
+            async with self._semaphore:
+                async with session.post(f"{self.base_url}/upload/data", data=form) as response:
+                    return self._handle_response(response.status, await response.read())
+
+    async def add_sales_data(self, data: Union[List[Dict], str, pd.DataFrame]) -> Dict:
+        """Add sales data records directly to the database."""
+        records = DemandPredictionClient._process_input_data(data)
+        return await self._request('POST', '/sales/add', json=records)
+
+    async def generate_sample_data(self, count: int = 100) -> Dict:
+        """
+        Generate and add sample sales data to the database.
+
+        Raises:
+            ValueError: If count is not between 1 and 10000
+        """
+        if count <= 0 or count > 10000:
+            raise ValueError("Count must be between 1 and 10000")
+        return await self._request('GET', f'/generate-sample-data/{count}')
+
+    async def check_health(self) -> Dict:
+        """Check the health status of the API."""
+        return await self._request('GET', '/health')
+
+    async def get_version(self) -> Dict:
+        """Get API version information."""
+        result = await self._request('GET', '/version')
+        return result.get('data', {})
+
+    async def get_stats(self) -> Dict:
+        """Get API usage statistics."""
+        result = await self._request('GET', '/stats')
+        return result.get('data', {})
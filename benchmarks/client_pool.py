@@ -0,0 +1,68 @@
+# Benchmark: client calls/sec with a fresh connection per call vs a pooled keep-alive session
+#
+# Start the API first (python app.py), then run:
+#   python benchmarks/client_pool.py --calls 2000 --threads 8
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from client import DemandPredictionClient, BASE_URL
+
+PREDICT_PAYLOAD = [{
+    "pincode": "400001",
+    "product": "loan",
+    "channel": "online",
+    "customer_age": 35,
+    "customer_income": 75000
+}]
+
+def unpooled_call(base_url, endpoint, timeout):
+    """One call the way the client used to make it: module-level requests, new connection"""
+    if endpoint == "/predict/demand":
+        response = requests.post(f"{base_url}{endpoint}", json=PREDICT_PAYLOAD, timeout=timeout)
+    else:
+        response = requests.get(f"{base_url}{endpoint}", timeout=timeout)
+    response.raise_for_status()
+
+def pooled_call(client, endpoint):
+    """One call through the client's pooled session"""
+    if endpoint == "/predict/demand":
+        client.predict_demand(PREDICT_PAYLOAD)
+    else:
+        client.check_health()
+
+def run(label, call, calls, threads):
+    """Run ``calls`` calls over ``threads`` threads and return calls/sec"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: call(), range(calls)))
+    elapsed = time.perf_counter() - start
+    rate = calls / elapsed
+    print(f"{label:<10} {calls} calls in {elapsed:6.2f}s  ->  {rate:8.1f} calls/sec")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description='Client connection pooling benchmark')
+    parser.add_argument('--url', default=BASE_URL, help='Base URL of a running API')
+    parser.add_argument('--endpoint', choices=['/health', '/predict/demand'], default='/predict/demand')
+    parser.add_argument('--calls', type=int, default=1000, help='Number of calls per run')
+    parser.add_argument('--threads', type=int, default=4, help='Concurrent callers')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    print(f"Benchmarking {args.endpoint} at {base_url} with {args.threads} threads")
+
+    before = run("unpooled", lambda: unpooled_call(base_url, args.endpoint, 10), args.calls, args.threads)
+    with DemandPredictionClient(base_url, pool_size=args.threads) as client:
+        after = run("pooled", lambda: pooled_call(client, args.endpoint), args.calls, args.threads)
+
+    print(f"\nSpeedup: {after / before:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# Load test: throughput and p50/p95/p99 latency of every API route under concurrent load
+#
+# Against a local in-process server backed by an in-memory MongoDB stand-in (mongomock):
+#   python benchmarks/load_test.py --duration 10 --concurrency 16
+#
+# Against a running server, open-loop at 200 requests/sec, only the predict routes:
+#   python benchmarks/load_test.py --url http://localhost:5000 --mode open --rate 200 --routes predict
+#
+# Results are written as JSON (benchmarks/results/ by default); pass --compare
+# with an earlier result file to print the change per scenario.
+
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+try:
+    import mongomock
+    mongomock_available = True
+except ImportError:
+    mongomock_available = False
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+PRODUCTS = ["loan", "credit_card", "insurance"]
+CHANNELS = ["online", "offline"]
+PREDICT_ROUTES = ["/predict/demand", "/predict/demand-rise", "/predict/top-product", "/predict/all"]
+
+def make_records(count, sales=False):
+    """Synthetic prediction input (or, with sales=True, sales) records"""
+    records = []
+    for _ in range(count):
+        record = {
+            "pincode": str(400001 + random.randrange(200)),
+            "product": random.choice(PRODUCTS),
+            "channel": random.choice(CHANNELS),
+            "customer_age": random.randint(21, 70),
+            "customer_income": random.randint(20000, 200000)
+        }
+        if sales:
+            record["date"] = datetime.datetime.now().isoformat()
+            record["agent_id"] = f"AG{random.randint(1000, 9999)}"
+        records.append(record)
+    return records
+
+def build_scenarios(batch_sizes, sales_batch, upload_rows):
+    """
+    Every route with its request; returns a list of dicts with name, method,
+    path, rows and a function building the requests kwargs
+    """
+    csv_body = ("pincode,product,channel,customer_age,customer_income\n" + "".join(
+        f"{r['pincode']},{r['product']},{r['channel']},{r['customer_age']},{r['customer_income']}\n"
+        for r in make_records(upload_rows)
+    )).encode()
+    scenarios = [
+        {"name": "GET /", "method": "GET", "path": "/"},
+        {"name": "GET /health", "method": "GET", "path": "/health"},
+        {"name": "GET /version", "method": "GET", "path": "/version"},
+        {"name": "GET /stats", "method": "GET", "path": "/stats"},
+        {"name": "GET /models", "method": "GET", "path": "/models"},
+        {"name": "GET /regions", "method": "GET", "path": "/regions"},
+        {"name": "GET /regions/<id>", "method": "GET", "path": "/regions/1"},
+    ]
+    for path in PREDICT_ROUTES:
+        for size in batch_sizes:
+            payload = make_records(size)
+            scenarios.append({"name": f"POST {path} x{size}", "method": "POST", "path": path, "rows": size,
+                              "kwargs": lambda payload=payload: {"json": payload}})
+    sales = make_records(sales_batch, sales=True)
+    scenarios.append({"name": f"POST /sales/add x{sales_batch}", "method": "POST", "path": "/sales/add",
+                      "rows": sales_batch, "kwargs": lambda: {"json": sales}})
+    scenarios.append({"name": "GET /generate-sample-data/<n>", "method": "GET", "path": "/generate-sample-data/10",
+                      "rows": 10})
+    scenarios.append({"name": f"POST /upload/data x{upload_rows}", "method": "POST", "path": "/upload/data",
+                      "rows": upload_rows,
+                      "kwargs": lambda: {"files": {"file": ("load.csv", io.BytesIO(csv_body), "text/csv")}}})
+    return scenarios
+
+def start_local_server(log_level):
+    """
+    Start the API in this process on a free port, with MongoDB replaced by an
+    in-memory mongomock instance seeded with the reference data
+    """
+    if not mongomock_available:
+        raise ImportError("mongomock is required for the local server. Please install with 'pip install mongomock'")
+    from werkzeug.serving import make_server
+
+    patcher = mongomock.patch(servers=(("localhost", 27017),))
+    patcher.start()
+    from config import MONGO_URI, MONGO_DB
+    from pymongo import MongoClient
+    from set_up_db import seed_reference_data
+    import app as app_module
+
+    db = MongoClient(MONGO_URI)[MONGO_DB]
+    seed_reference_data(db)
+    # Import what the routes would otherwise load on their first request
+    app_module.warm_imports()
+    for name in ("app", "werkzeug", "sales_cube", "compression", "upload_parser"):
+        logging.getLogger(name).setLevel(log_level)
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+class Recorder:
+    """Collects per-request latencies and status codes from all workers"""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, status):
+        with self._lock:
+            if status is None:
+                self.errors += 1
+            else:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+                if status < 400:
+                    self.latencies.append(latency)
+                else:
+                    self.errors += 1
+
+def send(session, base_url, scenario, timeout):
+    """Issue one request; returns the status code, or None on a connection error"""
+    kwargs = scenario["kwargs"]() if "kwargs" in scenario else {}
+    try:
+        response = session.request(scenario["method"], base_url + scenario["path"], timeout=timeout, **kwargs)
+        response.content
+        return response.status_code
+    except requests.RequestException:
+        return None
+
+def run_closed_loop(base_url, scenario, concurrency, duration, timeout):
+    """`concurrency` workers each send the next request as soon as the previous one completes"""
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                status = send(session, base_url, scenario, timeout)
+                recorder.record(time.perf_counter() - start, status)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - start
+
+def run_open_loop(base_url, scenario, rate, duration, timeout, max_in_flight):
+    """
+    Requests are started on a fixed schedule of `rate` per second regardless
+    of how fast earlier ones complete. Latency is measured from the scheduled
+    start, so time spent queued behind a slow server is included.
+    """
+    recorder = Recorder()
+    local = threading.local()
+    total = int(rate * duration)
+
+    def fire(scheduled):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        status = send(local.session, base_url, scenario, timeout)
+        recorder.record(time.perf_counter() - scheduled, status)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for i in range(total):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(fire, scheduled)
+    return recorder, time.perf_counter() - start
+
+def summarize(scenario, recorder, elapsed):
+    """Throughput and latency percentiles for one scenario"""
+    ok = len(recorder.latencies)
+    latencies = np.array(recorder.latencies) * 1000
+    result = {
+        "requests": ok + recorder.errors,
+        "errors": recorder.errors,
+        "statuses": {str(k): v for k, v in sorted(recorder.statuses.items())},
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    if scenario.get("rows"):
+        result["rows_per_sec"] = round(ok * scenario["rows"] / elapsed, 1) if elapsed > 0 else 0.0
+    for name, q in (("p50_ms", 50), ("p95_ms", 95), ("p99_ms", 99)):
+        result[name] = round(float(np.percentile(latencies, q)), 2) if ok else None
+    result["max_ms"] = round(float(latencies.max()), 2) if ok else None
+    return result
+
+def git_commit():
+    """Current commit of the working tree, if it is a git checkout"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_comparison(results, baseline_path):
+    """Print throughput and p95 of this run next to an earlier result file"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"{'scenario':<36}{'rps':>10}{'was':>10}{'p95 ms':>10}{'was':>10}")
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        print(f"{name:<36}{result['throughput_rps']:>10.1f}{before['throughput_rps']:>10.1f}"
+              f"{result['p95_ms'] or 0:>10.1f}{before['p95_ms'] or 0:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Demand Prediction API')
+    parser.add_argument('--url', help='Base URL of a running API; omit to start a local server on mongomock')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed',
+                        help='closed: fixed number of concurrent clients; open: fixed arrival rate')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients in closed-loop mode')
+    parser.add_argument('--rate', type=float, default=50, help='Requests/sec per scenario in open-loop mode')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='Open-loop cap on outstanding requests')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds per scenario')
+    parser.add_argument('--batch-sizes', default='1,100,1000', help='Comma-separated rows per predict request')
+    parser.add_argument('--sales-batch', type=int, default=10, help='Records per /sales/add request')
+    parser.add_argument('--upload-rows', type=int, default=100, help='Rows in the /upload/data CSV')
+    parser.add_argument('--routes', help='Only run scenarios whose name contains this text')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--output', help='Result JSON path (default benchmarks/results/load_<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier result JSON to compare against')
+    parser.add_argument('--server-log-level', default='CRITICAL', help='Log level of the local server')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        server, base_url = start_local_server(args.server_log_level)
+        print(f"Started local server on {base_url} (MongoDB: mongomock)")
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size]
+    scenarios = build_scenarios(batch_sizes, args.sales_batch, args.upload_rows)
+    if args.routes:
+        scenarios = [s for s in scenarios if args.routes in s["name"]]
+
+    load = f"{args.concurrency} clients" if args.mode == 'closed' else f"{args.rate:g} req/s"
+    print(f"{args.mode}-loop, {load}, {args.duration:g}s per scenario\n")
+    print(f"{'scenario':<36}{'rps':>10}{'rows/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(),
+        "target": args.url or "local (mongomock)",
+        "mode": args.mode,
+        "concurrency": args.concurrency if args.mode == 'closed' else None,
+        "rate": args.rate if args.mode == 'open' else None,
+        "duration": args.duration,
+        "scenarios": {}
+    }
+    try:
+        for scenario in scenarios:
+            if args.mode == 'closed':
+                recorder, elapsed = run_closed_loop(base_url, scenario, args.concurrency, args.duration, args.timeout)
+            else:
+                recorder, elapsed = run_open_loop(base_url, scenario, args.rate, args.duration, args.timeout,
+                                                  args.max_in_flight)
+            result = summarize(scenario, recorder, elapsed)
+            results["scenarios"][scenario["name"]] = result
+            fmt = lambda v: f"{v:>10.1f}" if v is not None else f"{'-':>10}"
+            print(f"{scenario['name']:<36}{result['throughput_rps']:>10.1f}"
+                  f"{format(result['rows_per_sec'], ',.0f') if 'rows_per_sec' in result else '-':>12}{fmt(result['p50_ms'])}{fmt(result['p95_ms'])}"
+                  f"{fmt(result['p99_ms'])}{result['errors']:>8}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == "__main__":
+    main()
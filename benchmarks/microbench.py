@@ -0,0 +1,193 @@
+# Microbenchmarks: wall time and peak memory of the model.py and Dp.py data paths
+#
+# Record a baseline, then check a change against it (exit status 1 on a regression):
+#   python benchmarks/microbench.py --save-baseline
+#   python benchmarks/microbench.py --threshold 0.2
+#
+# Quicker local runs:
+#   python benchmarks/microbench.py --sizes 1000,100000 --only model.preprocess_data
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import model
+
+try:
+    import Dp
+    dp_available = True
+except ImportError as e:
+    # Dp.py needs faker
+    print(f"Skipping Dp.py benchmarks: {e}")
+    dp_available = False
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "microbench_baseline.json")
+PRODUCTS = ["loan", "credit_card", "insurance"]
+CHANNELS = ["online", "offline"]
+
+def make_frame(rows, seed=42):
+    """Synthetic sales rows; one pincode per ~50 rows, capped at 20,000 pincodes"""
+    rng = np.random.default_rng(seed)
+    n_pincodes = min(20000, max(10, rows // 50))
+    pincodes = np.array([str(100001 + i) for i in range(n_pincodes)])
+    return pd.DataFrame({
+        "pincode": pincodes[rng.integers(0, n_pincodes, rows)],
+        "product": np.array(PRODUCTS)[rng.integers(0, len(PRODUCTS), rows)],
+        "channel": np.array(CHANNELS)[rng.integers(0, len(CHANNELS), rows)],
+        "customer_age": rng.integers(21, 70, rows),
+        "customer_income": rng.integers(20000, 200000, rows),
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    })
+
+def with_coordinates(rows):
+    """Synthetic rows with latitude/longitude already assigned"""
+    df = make_frame(rows)
+    rng = np.random.default_rng(7)
+    codes, uniques = pd.factorize(df["pincode"])
+    df["latitude"] = rng.uniform(8.0, 37.0, len(uniques))[codes]
+    df["longitude"] = rng.uniform(68.0, 97.0, len(uniques))[codes]
+    return df
+
+def numpy_records(rows):
+    """Prediction-shaped records holding NumPy scalars and arrays, as convert_numpy_types receives them"""
+    rng = np.random.default_rng(42)
+    demand = rng.uniform(100, 1000, rows)
+    rise = rng.integers(0, 2, rows)
+    probs = rng.uniform(0, 1, (rows, 3))
+    return [{"region_id": np.int64(i % 100), "predicted_demand": demand[i], "demand_rise": rise[i],
+             "probabilities": probs[i]} for i in range(rows)]
+
+def _fresh_coordinates(run):
+    """Clear model.coordinate_cache before each run so every run does the same work"""
+    def wrapped(df):
+        model.coordinate_cache.clear()
+        return run(df)
+    return wrapped
+
+# name -> (setup(rows) returning the input, run(input)); inputs that a function
+# mutates are copied inside run so repeats see the same data
+CASES = {
+    "model.assign_coordinates": (make_frame, _fresh_coordinates(model.assign_coordinates)),
+    "model.cluster_pincodes": (with_coordinates, lambda df: model.cluster_pincodes(df.copy())),
+    "model.preprocess_data": (with_coordinates, model.preprocess_data),
+    "model.convert_numpy_types": (numpy_records, model.convert_numpy_types),
+    "model.predict_region_demand": (with_coordinates, model.predict_region_demand),
+    "model.predict_demand_rise": (with_coordinates, model.predict_demand_rise),
+    "model.predict_top_product": (with_coordinates, model.predict_top_product),
+}
+if dp_available:
+    CASES.update({
+        "Dp.assign_coordinates": (make_frame, lambda df: Dp.assign_coordinates(df.copy())),
+        "Dp.cluster_pincodes": (with_coordinates, lambda df: Dp.cluster_pincodes(df.copy())),
+        "Dp.preprocess_data": (lambda rows: model.cluster_pincodes(with_coordinates(rows)),
+                               lambda df: Dp.preprocess_data(df.copy())),
+    })
+
+def measure(run, data, repeat):
+    """
+    Best wall time over `repeat` runs, then peak traced memory of one more run
+
+    Memory is measured separately because tracing allocations slows the code
+    down; NumPy and pandas report their buffers to tracemalloc.
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run(data)
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    run(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+def compare(results, baseline, threshold):
+    """Return (name, size, metric, before, after) for every measurement worse than baseline by more than threshold"""
+    regressions = []
+    for name, by_size in results.items():
+        for size, result in by_size.items():
+            before = baseline.get(name, {}).get(size)
+            if before is None:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                # Ignore noise on measurements too small to matter
+                floor = 0.02 if metric == "seconds" else 1.0
+                if result[metric] > max(before[metric], floor) * (1 + threshold):
+                    regressions.append((name, size, metric, before[metric], result[metric]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks for model.py and Dp.py')
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='Comma-separated row counts')
+    parser.add_argument('--only', help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per measurement (best is kept)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown / memory growth over baseline, e.g. 0.25 for 25%%')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    # The benchmarks measure speed; warnings from the code under test would only add noise
+    warnings.simplefilter("ignore")
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    cases = {name: case for name, case in CASES.items() if not args.only or args.only in name}
+
+    print(f"{'benchmark':<32}{'rows':>10}{'seconds':>12}{'peak MB':>12}")
+    results = {}
+    for name, (setup, run) in cases.items():
+        for size in sizes:
+            data = setup(size)
+            seconds, peak = measure(run, data, args.repeat)
+            del data
+            results.setdefault(name, {})[str(size)] = {"seconds": round(seconds, 5), "peak_mb": round(peak / 2 ** 20, 2)}
+            print(f"{name:<32}{size:>10,}{seconds:>12.4f}{peak / 2 ** 20:>12.1f}")
+
+    document = {"timestamp": datetime.datetime.now().isoformat(), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+
+    if args.save_baseline:
+        # Keep entries for benchmarks and sizes that were not part of this run
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f).get("results", {})
+        for name, by_size in results.items():
+            baseline.setdefault(name, {}).update(by_size)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": document["timestamp"], "results": baseline}, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.threshold)
+    if not regressions:
+        print(f"\n✅ No regressions beyond {args.threshold:.0%} of {args.baseline}")
+        return 0
+    print(f"\n❌ {len(regressions)} regressions beyond {args.threshold:.0%}:")
+    for name, size, metric, before, after in regressions:
+        print(f"  {name} @ {int(size):,} rows: {metric} {before} -> {after} ({after / before:.2f}x)")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
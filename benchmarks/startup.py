@@ -0,0 +1,131 @@
+# Startup benchmark: per-module import times of app.py and cold start to first /health response
+#
+# Usage:
+#   python benchmarks/startup.py                      # import report + 5 cold starts, 300 ms target
+#   python benchmarks/startup.py --runs 10 --target-ms 250
+#   python benchmarks/startup.py --preload            # with PRELOAD_IMPORTS=True, for comparison
+#   python benchmarks/startup.py --skip-imports       # cold starts only
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Started in a fresh interpreter for every run
+SERVER_CODE = """
+import sys
+sys.path.insert(0, {root!r})
+from werkzeug.serving import make_server
+import app
+make_server('127.0.0.1', {port}, app.app, threaded=True).serve_forever()
+"""
+
+def import_times(env):
+    """
+    Import app.py under -X importtime and return (self_us, cumulative_us, depth, module) rows
+
+    depth is 0 for app itself, 1 for modules app.py imports directly, and so on.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+def print_import_report(env, top):
+    rows = import_times(env)
+    app_row = next((row for row in rows if row[3] == "app"), None)
+    if app_row is None:
+        print("❌ Could not import app")
+        return
+    # Modules app.py pulls in, attributed to the import statement in app.py
+    # (or in a module app.py imported before it) that first loaded them
+    app_index = rows.index(app_row)
+    direct = []
+    for row in reversed(rows[:app_index]):
+        if row[2] <= 0:
+            break
+        if row[2] == 1:
+            direct.append(row)
+    print(f"Import of app.py: {app_row[1] / 1000:.1f} ms")
+    print(f"\n{'module imported by app.py':<40}{'cumulative ms':>15}")
+    for _, cumulative_us, _, name in sorted(direct, key=lambda row: row[1], reverse=True)[:top]:
+        print(f"{name:<40}{cumulative_us / 1000:>15.1f}")
+    print(f"\n{'slowest modules (self time)':<40}{'self ms':>15}")
+    for self_us, _, _, name in sorted(rows, key=lambda row: row[0], reverse=True)[:top]:
+        print(f"{name:<40}{self_us / 1000:>15.1f}")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def cold_start(env, timeout):
+    """Start the API in a new interpreter; return (seconds until /health answered, status code)"""
+    port = free_port()
+    code = SERVER_CODE.format(root=ROOT, port=port)
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    return time.perf_counter() - start, response.status
+            except urllib.error.HTTPError as e:
+                # 503 while MongoDB is connecting is still a response
+                return time.perf_counter() - start, e.code
+            except (urllib.error.URLError, ConnectionError, OSError):
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server exited with status {process.returncode}")
+                time.sleep(0.002)
+        raise TimeoutError(f"/health did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure API import time and cold start to first /health')
+    parser.add_argument('--runs', type=int, default=5, help='Number of cold starts')
+    parser.add_argument('--target-ms', type=float, default=300, help='Median cold start target in ms')
+    parser.add_argument('--top', type=int, default=15, help='Modules to list in the import report')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for /health per start')
+    parser.add_argument('--preload', action='store_true', help='Start with PRELOAD_IMPORTS=True')
+    parser.add_argument('--skip-imports', action='store_true', help='Skip the import-time report')
+    args = parser.parse_args()
+
+    env = dict(os.environ, PRELOAD_IMPORTS=str(args.preload))
+    if not args.skip_imports:
+        print_import_report(env, args.top)
+        print()
+
+    timings = []
+    for run in range(args.runs):
+        seconds, status = cold_start(env, args.timeout)
+        timings.append(seconds)
+        print(f"Cold start {run + 1}: {seconds * 1000:.0f} ms to first /health ({status})")
+    if not timings:
+        return 0
+    median = statistics.median(timings)
+    print(f"\nMedian {median * 1000:.0f} ms, best {min(timings) * 1000:.0f} ms (target {args.target_ms:.0f} ms)")
+    if median * 1000 > args.target_ms:
+        print("❌ Cold start is over target")
+        return 1
+    print("✅ Cold start is within target")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
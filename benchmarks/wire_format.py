@@ -0,0 +1,79 @@
+# Benchmark: payload size and latency of row vs columnar JSON on the prediction endpoints
+#
+# Start the API first (python app.py), then run:
+#   python benchmarks/wire_format.py --rows 100000 --repeat 5
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from client import BASE_URL
+
+def make_rows(count):
+    """Synthetic prediction input rows"""
+    return [{
+        "pincode": str(400001 + random.randrange(500)),
+        "product": random.choice(["loan", "credit_card", "insurance"]),
+        "channel": random.choice(["online", "offline"]),
+        "customer_age": random.randint(21, 70),
+        "customer_income": random.randint(20000, 200000)
+    } for _ in range(count)]
+
+def to_columns(rows):
+    """Rows to {"field": [values]}"""
+    return {key: [row[key] for row in rows] for key in rows[0]}
+
+def measure(session, url, payload, params, repeat):
+    """POST the payload ``repeat`` times; return request/response sizes and latencies"""
+    body = json.dumps(payload, separators=(',', ':')).encode()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = session.post(url, data=body, params=params,
+                                headers={"Content-Type": "application/json", "Accept-Encoding": "identity"})
+        response.raise_for_status()
+        response.json()
+        latencies.append(time.perf_counter() - start)
+    return {
+        "request_bytes": len(body),
+        "request_gzip_bytes": len(gzip.compress(body, compresslevel=5)),
+        "response_bytes": len(response.content),
+        "response_gzip_bytes": len(gzip.compress(response.content, compresslevel=5)),
+        "median_seconds": statistics.median(latencies)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Row vs columnar JSON wire format benchmark')
+    parser.add_argument('--url', default=BASE_URL, help='Base URL of a running API')
+    parser.add_argument('--endpoint', default='/predict/demand',
+                        choices=['/predict/demand', '/predict/demand-rise', '/predict/top-product', '/predict/all'])
+    parser.add_argument('--rows', type=int, default=100000, help='Rows per request')
+    parser.add_argument('--repeat', type=int, default=5, help='Requests per format')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    url = f"{args.url.rstrip('/')}{args.endpoint}"
+    print(f"Benchmarking {args.endpoint} with {args.rows} rows, {args.repeat} requests per format")
+
+    with requests.Session() as session:
+        results = {
+            "rows": measure(session, url, rows, {}, args.repeat),
+            "columns": measure(session, url, to_columns(rows), {"format": "columns"}, args.repeat)
+        }
+
+    print(f"\n{'':<22}{'rows':>14}{'columns':>14}{'ratio':>8}")
+    for key in ("request_bytes", "request_gzip_bytes", "response_bytes", "response_gzip_bytes", "median_seconds"):
+        before, after = results["rows"][key], results["columns"][key]
+        fmt = "{:>14.3f}" if key == "median_seconds" else "{:>14,}"
+        print(f"{key:<22}" + fmt.format(before) + fmt.format(after) + f"{after / before:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# Worker memory benchmark: per-worker unique (USS) and proportional (PSS) memory
+# of the gunicorn server (server.py) with and without --preload
+#
+# Usage:
+#   python benchmarks/worker_memory.py                        # 4 workers, preload on and off
+#   python benchmarks/worker_memory.py --workers 8 --modes preload
+#   python benchmarks/worker_memory.py --requests 400 --rows 1000
+#
+# Linux only: memory is read from /proc/<pid>/smaps_rollup. Each worker is
+# warmed with prediction requests first, so it has imported and touched the
+# model code it needs before it is measured.
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from memory_watchdog import process_memory
+
+MODES = {"preload": "True", "no-preload": "False"}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def worker_pids(master_pid):
+    """PIDs of the master's child processes"""
+    try:
+        with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+def wait_for_workers(url, master, workers, timeout):
+    """Wait until /health answers and all workers have started"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if master.poll() is not None:
+            raise RuntimeError(f"Server exited with status {master.returncode}")
+        try:
+            requests.get(f"{url}/health", timeout=1)
+            if len(worker_pids(master.pid)) >= workers:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"Server did not start {workers} workers within {timeout}s")
+
+def warm(url, count, rows):
+    """Send prediction requests from several threads so every worker handles some"""
+    batch = [{"pincode": str(110001 + i % 500), "product": "loan", "channel": "online"} for i in range(rows)]
+    def send(_):
+        try:
+            return requests.post(f"{url}/predict/all", json=batch, timeout=120).status_code
+        except requests.RequestException:
+            return None
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        statuses = list(pool.map(send, range(count)))
+    return sum(1 for status in statuses if status == 200)
+
+def measure(mode, workers, count, rows, timeout):
+    """Start server.py in `mode`, warm it and return (master usage, [worker usages])"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ,
+               GUNICORN_BIND=f"127.0.0.1:{port}",
+               GUNICORN_WORKERS=str(workers),
+               GUNICORN_PRELOAD=MODES[mode],
+               GUNICORN_MAX_REQUESTS="0",
+               MEMORY_WATCHDOG_INTERVAL="0")
+    master = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py")], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_workers(url, master, workers, timeout)
+        ok = warm(url, count, rows)
+        print(f"{mode}: {ok}/{count} warm-up requests succeeded")
+        return process_memory(master.pid), [process_memory(pid) for pid in worker_pids(master.pid)]
+    finally:
+        master.terminate()
+        master.wait()
+
+def mb(value):
+    return f"{value / 2 ** 20:>9.1f}"
+
+def print_report(mode, master, workers):
+    print(f"\n{mode}")
+    print(f"{'process':<12}{'RSS MB':>10}{'PSS MB':>10}{'USS MB':>10}{'shared MB':>11}")
+    rows = [("master", master)] + [(f"worker {i + 1}", usage) for i, usage in enumerate(workers)]
+    for name, usage in rows:
+        if usage is not None:
+            print(f"{name:<12} {mb(usage['rss'])} {mb(usage['pss'])} {mb(usage['uss'])}  {mb(usage['shared'])}")
+    measured = [usage for _, usage in rows if usage is not None]
+    worker_usage = [usage for usage in workers if usage is not None]
+    if worker_usage:
+        mean_uss = sum(usage['uss'] for usage in worker_usage) / len(worker_usage)
+        print(f"{'mean worker USS':<23}{mb(mean_uss)}")
+    print(f"{'total PSS':<23}{mb(sum(usage['pss'] for usage in measured))}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-worker unique memory of the gunicorn server')
+    parser.add_argument('--workers', type=int, default=4, help='Number of gunicorn workers')
+    parser.add_argument('--modes', default='preload,no-preload', help='Comma-separated: preload, no-preload')
+    parser.add_argument('--requests', type=int, default=200, help='Warm-up prediction requests per run')
+    parser.add_argument('--rows', type=int, default=200, help='Rows per warm-up request')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for the workers to start')
+    args = parser.parse_args()
+
+    if process_memory() is None:
+        print("❌ /proc/<pid>/smaps_rollup is not available on this system")
+        return 1
+    results = {}
+    for mode in args.modes.split(','):
+        if mode not in MODES:
+            parser.error(f"Unknown mode {mode!r}; choose from {', '.join(MODES)}")
+        results[mode] = measure(mode, args.workers, args.requests, args.rows, args.timeout)
+    for mode, (master, workers) in results.items():
+        print_report(mode, master, workers)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
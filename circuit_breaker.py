@@ -0,0 +1,125 @@
+# Circuit breakers around model inference: after repeated failures a model's
+# requests go straight to the fallback until a background probe sees it recover
+
+import logging
+import os
+import threading
+import time
+
+from metrics import record_circuit_state
+
+try:
+    from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_PROBE_SECONDS
+except ImportError:
+    CIRCUIT_FAILURE_THRESHOLD = 5
+    CIRCUIT_PROBE_SECONDS = 10.0
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+
+class CircuitBreaker:
+    """
+    Breaker for one model in this process
+
+    Closed, every request calls the model. CIRCUIT_FAILURE_THRESHOLD failures
+    in a row open it: requests then skip the model, and a probe thread calls
+    `probe` every CIRCUIT_PROBE_SECONDS until it succeeds and closes the
+    breaker again. Requests never wait for a probe.
+    """
+
+    def __init__(self, name, probe, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 probe_interval=CIRCUIT_PROBE_SECONDS):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = None
+        self.last_error = None
+        self._probe_pid = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request should call the model"""
+        if self.state == CLOSED:
+            return True
+        # A worker forked from a master whose breaker was open needs its own probe
+        if self._probe_pid != os.getpid():
+            self._start_probe()
+        return False
+
+    def record_success(self):
+        # Unlocked read first: this runs on every successful request
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == OPEN or self.failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.trips += 1
+            self.opened_at = time.time()
+        logger.error(f"Circuit breaker for {self.name} opened after {self.failures} failures; "
+                     f"using the fallback until it recovers. Last error: {error}")
+        record_circuit_state(self.name, True, tripped=True)
+        self._start_probe()
+
+    def _start_probe(self):
+        with self._lock:
+            if self._probe_pid == os.getpid():
+                return
+            self._probe_pid = os.getpid()
+        threading.Thread(target=self._probe_until_recovered, name=f"probe-{self.name}", daemon=True).start()
+
+    def _probe_until_recovered(self):
+        while self.state == OPEN:
+            time.sleep(self.probe_interval)
+            try:
+                self.probe()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Recovery probe for {self.name} failed: {e}")
+                continue
+            with self._lock:
+                self.state = CLOSED
+                self.failures = 0
+                self.opened_at = None
+                self._probe_pid = None
+            logger.info(f"Circuit breaker for {self.name} closed; the model recovered")
+            record_circuit_state(self.name, False)
+
+    def snapshot(self):
+        """State, consecutive failures, trip count and last error, for /stats"""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "opened_at": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.opened_at)) if self.opened_at else None,
+            "last_error": self.last_error
+        }
+
+# name -> CircuitBreaker
+_breakers = {}
+
+def register_breaker(name, probe):
+    """Create (or return) the breaker for model `name`; `probe` raises while the model is broken"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name, probe)
+        record_circuit_state(name, False)
+    return _breakers[name]
+
+def breaker_states():
+    """State of each breaker, for /health"""
+    return {name: breaker.state for name, breaker in _breakers.items()}
+
+def breaker_report():
+    """Details of each breaker, for /stats"""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
@@ -1,612 +1,1218 @@
-import requests
-import json
-import pandas as pd
-import argparse
-import os
-import sys
-from typing import Dict, List, Union, Optional, Any
-
-# Default base URL for the API
-BASE_URL = "http://localhost:5000"
-
-class DemandPredictionClient:
-    """
-    Client for interacting with the Demand Prediction API.
-    
-    This client provides a simple interface to access all endpoints of the
-    Demand Prediction API, handling request formatting, error handling, and
-    response parsing.
-    """
-    
-    def __init__(self, base_url: str = BASE_URL, timeout: int = 10):
-        """
-        Initialize the Demand Prediction API client.
-        
-        Args:
-            base_url: Base URL of the API, defaults to http://localhost:5000
-            timeout: Request timeout in seconds, defaults to 10
-        """
-        self.base_url = base_url.rstrip('/')
-        self.timeout = timeout
-    
-    def _handle_response(self, response: requests.Response) -> Dict:
-        """
-        Handle API response, checking for errors and returning parsed JSON.
-        
-        Args:
-            response: Response object from requests
-            
-        Returns:
-            Parsed JSON response
-            
-        Raises:
-            Exception: If the response indicates an error
-        """
-        try:
-            data = response.json()
-            
-            if response.status_code >= 400 or (isinstance(data, dict) and data.get('status') == 'error'):
-                error_message = data.get('message', 'Unknown error') if isinstance(data, dict) else 'Unknown error'
-                raise Exception(f"API Error ({response.status_code}): {error_message}")
-                
-            return data
-        except json.JSONDecodeError:
-            raise Exception(f"Failed to parse API response as JSON: {response.text}")
-    
-    def check_api_status(self) -> Dict:
-        """
-        Test if the API is running and return available endpoints.
-        
-        Returns:
-            API status information including available endpoints
-        """
-        response = requests.get(f"{self.base_url}/", timeout=self.timeout)
-        return self._handle_response(response)
-    
-    def get_all_regions(self) -> List[Dict]:
-        """
-        Fetch all region summaries.
-        
-        Returns:
-            List of region summaries
-        """
-        response = requests.get(f"{self.base_url}/regions", timeout=self.timeout)
-        result = self._handle_response(response)
-        return result.get('data', [])
-    
-    def get_region_by_id(self, region_id: Union[int, str]) -> Dict:
-        """
-        Fetch a specific region by ID.
-        
-        Args:
-            region_id: ID of the region to retrieve
-            
-        Returns:
-            Region details
-        """
-        response = requests.get(f"{self.base_url}/regions/{region_id}", timeout=self.timeout)
-        result = self._handle_response(response)
-        return result.get('data', {})
-    
-    def get_model_details(self) -> Dict:
-        """
-        Fetch model details and evaluation metrics.
-        
-        Returns:
-            Model details and evaluation metrics
-        """
-        response = requests.get(f"{self.base_url}/models", timeout=self.timeout)
-        result = self._handle_response(response)
-        return result.get('data', {})
-    
-    def predict_demand(self, data: Union[List[Dict], str, pd.DataFrame]) -> List[Dict]:
-        """
-        Predict region demand using the API.
-        
-        Args:
-            data: Either a list of dictionaries, a DataFrame, or a file path
-            
-        Returns:
-            List of demand predictions
-            
-        Raises:
-            ValueError: If the input data format is invalid
-            FileNotFoundError: If the specified file does not exist
-        """
-        # Process input data based on type
-        processed_data = self._process_input_data(data)
-        
-        # Make API request
-        response = requests.post(
-            f"{self.base_url}/predict/demand",
-            json=processed_data,
-            headers={"Content-Type": "application/json"},
-            timeout=self.timeout
-        )
-        
-        result = self._handle_response(response)
-        return result.get('data', [])
-    
-    def predict_demand_rise(self, data: Union[List[Dict], str, pd.DataFrame]) -> List[Dict]:
-        """
-        Predict if demand will rise using the API.
-        
-        Args:
-            data: Either a list of dictionaries, a DataFrame, or a file path
-            
-        Returns:
-            List of demand rise predictions
-            
-        Raises:
-            ValueError: If the input data format is invalid
-            FileNotFoundError: If the specified file does not exist
-        """
-        # Process input data based on type
-        processed_data = self._process_input_data(data)
-        
-        # Make API request
-        response = requests.post(
-            f"{self.base_url}/predict/demand-rise",
-            json=processed_data,
-            headers={"Content-Type": "application/json"},
-            timeout=self.timeout
-        )
-        
-        result = self._handle_response(response)
-        return result.get('data', [])
-    
-    def predict_top_product(self, data: Union[List[Dict], str, pd.DataFrame]) -> List[Dict]:
-        """
-        Predict top product using the API.
-        
-        Args:
-            data: Either a list of dictionaries, a DataFrame, or a file path
-            
-        Returns:
-            List of top product predictions
-            
-        Raises:
-            ValueError: If the input data format is invalid
-            FileNotFoundError: If the specified file does not exist
-        """
-        # Process input data based on type
-        processed_data = self._process_input_data(data)
-        
-        # Make API request
-        response = requests.post(
-            f"{self.base_url}/predict/top-product",
-            json=processed_data,
-            headers={"Content-Type": "application/json"},
-            timeout=self.timeout
-        )
-        
-        result = self._handle_response(response)
-        return result.get('data', [])
-    
-    def predict_all(self, data: Union[List[Dict], str, pd.DataFrame]) -> Dict:
-        """
-        Run all prediction models using the API.
-        
-        Args:
-            data: Either a list of dictionaries, a DataFrame, or a file path
-            
-        Returns:
-            Dictionary containing results from all prediction models
-            
-        Raises:
-            ValueError: If the input data format is invalid
-            FileNotFoundError: If the specified file does not exist
-        """
-        # Process input data based on type
-        processed_data = self._process_input_data(data)
-        
-        # Make API request
-        response = requests.post(
-            f"{self.base_url}/predict/all",
-            json=processed_data,
-            headers={"Content-Type": "application/json"},
-            timeout=self.timeout
-        )
-        
-        result = self._handle_response(response)
-        return result.get('data', {})
-    
-    def upload_data(self, file_path: str) -> Dict:
-        """
-        Upload data file to the API.
-        
-        Args:
-            file_path: Path to the data file
-            
-        Returns:
-            Upload results
-            
-        Raises:
-            FileNotFoundError: If the specified file does not exist
-            ValueError: If the file format is unsupported
-        """
-        # Check if file exists
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-        
-        # Check file type
-        if not file_path.endswith(('.csv', '.xls', '.xlsx', '.json')):
-            raise ValueError(f"Unsupported file format: {file_path}")
-        
-        # Upload file
-        with open(file_path, 'rb') as file:
-            response = requests.post(
-                f"{self.base_url}/upload/data",
-                files={'file': file},
-                timeout=self.timeout
-            )
-        
-        return self._handle_response(response)
-    
-    def add_sales_data(self, data: Union[List[Dict], str, pd.DataFrame]) -> Dict:
-        """
-        Add sales data records directly to the database.
-        
-        Args:
-            data: Either a list of dictionaries, a DataFrame, or a file path
-            
-        Returns:
-            Summary of added records
-        """
-        # Process input data based on type
-        processed_data = self._process_input_data(data)
-        
-        # Make API request
-        response = requests.post(
-            f"{self.base_url}/sales/add",
-            json=processed_data,
-            headers={"Content-Type": "application/json"},
-            timeout=self.timeout
-        )
-        
-        return self._handle_response(response)
-    
-    def generate_sample_data(self, count: int = 100) -> Dict:
-        """
-        Generate and add sample sales data to the database.
-        
-        Args:
-            count: Number of records to generate, defaults to 100
-            
-        Returns:
-            Summary of generated records
-            
-        Raises:
-            ValueError: If count is not between 1 and 10000
-        """
-        if count <= 0 or count > 10000:
-            raise ValueError("Count must be between 1 and 10000")
-            
-        response = requests.get(
-            f"{self.base_url}/generate-sample-data/{count}",
-            timeout=self.timeout
-        )
-        
-        return self._handle_response(response)
-    
-    def check_health(self) -> Dict:
-        """
-        Check the health status of the API.
-        
-        Returns:
-            Health status information
-        """
-        response = requests.get(f"{self.base_url}/health", timeout=self.timeout)
-        return self._handle_response(response)
-    
-    def get_version(self) -> Dict:
-        """
-        Get API version information.
-        
-        Returns:
-            API version and model training information
-        """
-        response = requests.get(f"{self.base_url}/version", timeout=self.timeout)
-        result = self._handle_response(response)
-        return result.get('data', {})
-    
-    def get_stats(self) -> Dict:
-        """
-        Get API usage statistics.
-        
-        Returns:
-            Usage statistics
-        """
-        response = requests.get(f"{self.base_url}/stats", timeout=self.timeout)
-        result = self._handle_response(response)
-        return result.get('data', {})
-    
-    def _process_input_data(self, data: Union[List[Dict], str, pd.DataFrame]) -> List[Dict]:
-        """
-        Process input data based on its type.
-        
-        Args:
-            data: Either a list of dictionaries, a DataFrame, or a file path
-            
-        Returns:
-            List of dictionaries ready for API submission
-            
-        Raises:
-            ValueError: If the input data format is invalid
-            FileNotFoundError: If the specified file does not exist
-        """
-        # If data is already a list of dictionaries, use it directly
-        if isinstance(data, list) and all(isinstance(item, dict) for item in data):
-            return data
-        
-        # If data is a DataFrame, convert to list of dictionaries
-        elif isinstance(data, pd.DataFrame):
-            return data.to_dict(orient='records')
-        
-        # If data is a file path, load the file
-        elif isinstance(data, str):
-            # Check if file exists
-            if not os.path.exists(data):
-                raise FileNotFoundError(f"File not found: {data}")
-            
-            # Determine file type and load data
-            if data.endswith('.csv'):
-                df = pd.read_csv(data)
-            elif data.endswith(('.xls', '.xlsx')):
-                df = pd.read_excel(data)
-            elif data.endswith('.json'):
-                df = pd.read_json(data)
-            else:
-                raise ValueError(f"Unsupported file format: {data}")
-            
-            # Convert DataFrame to list of dictionaries
-            return df.to_dict(orient='records')
-        
-        # Invalid input type
-        else:
-            raise ValueError(f"Invalid input data type: {type(data)}")
-
-
-def test_api_status():
-    """Test if the API is running"""
-    client = DemandPredictionClient()
-    try:
-        result = client.check_api_status()
-        print("✅ API is running")
-        print(f"Available endpoints: {json.dumps(result['endpoints'], indent=2)}")
-        return True
-    except Exception as e:
-        print(f"❌ API is not responding: {e}")
-        return False
-
-def get_all_regions():
-    """Fetch all region summaries"""
-    client = DemandPredictionClient()
-    try:
-        regions = client.get_all_regions()
-        print(f"✅ Retrieved {len(regions)} regions")
-        print("Sample region data:")
-        print(json.dumps(regions[0] if regions else {}, indent=2))
-        return regions
-    except Exception as e:
-        print(f"❌ Failed to retrieve regions: {e}")
-        return []
-
-def get_region_by_id(region_id):
-    """Fetch a specific region by ID"""
-    client = DemandPredictionClient()
-    try:
-        region = client.get_region_by_id(region_id)
-        print(f"✅ Retrieved data for region {region_id}")
-        print(json.dumps(region, indent=2))
-        return region
-    except Exception as e:
-        print(f"❌ Failed to retrieve region {region_id}: {e}")
-        return None
-
-def get_model_details():
-    """Fetch model details and evaluation metrics"""
-    client = DemandPredictionClient()
-    try:
-        data = client.get_model_details()
-        print("✅ Retrieved model details and evaluation metrics")
-        print(f"Found {len(data['model_details'])} models:")
-        for model in data['model_details']:
-            print(f"  - {model['model_type']}: {model['target']}")
-        return data
-    except Exception as e:
-        print(f"❌ Failed to retrieve model details: {e}")
-        return None
-
-def predict_demand(data_file):
-    """Predict region demand using the API"""
-    client = DemandPredictionClient()
-    try:
-        predictions = client.predict_demand(data_file)
-        print(f"✅ Successfully predicted demand for {len(predictions)} records")
-        print("Sample predictions:")
-        sample_count = min(3, len(predictions))
-        print(json.dumps(predictions[:sample_count], indent=2))
-        return predictions
-    except Exception as e:
-        print(f"❌ Failed to predict demand: {e}")
-        return None
-
-def predict_all(data_file):
-    """Run all prediction models using the API"""
-    client = DemandPredictionClient()
-    try:
-        results = client.predict_all(data_file)
-        print(f"✅ Successfully ran all predictions")
-        print("Results include:")
-        
-        for model_type, predictions in results.items():
-            print(f"  - {model_type}: {len(predictions)} predictions")
-        
-        return results
-    except Exception as e:
-        print(f"❌ Failed to run predictions: {e}")
-        return None
-
-def upload_data(file_path):
-    """Upload data file to the API"""
-    client = DemandPredictionClient()
-    try:
-        result = client.upload_data(file_path)
-        print(f"✅ Successfully uploaded data")
-        print(f"  - Rows: {result['data']['rows']}")
-        print(f"  - Columns: {', '.join(result['data']['columns'])}")
-        return result
-    except Exception as e:
-        print(f"❌ Failed to upload data: {e}")
-        return None
-
-def add_sales_data(data_file):
-    """Add sales data records directly to the database"""
-    client = DemandPredictionClient()
-    try:
-        result = client.add_sales_data(data_file)
-        print(f"✅ Successfully added sales data")
-        print(f"  - Inserted count: {result['data']['inserted_count']}")
-        if result['data'].get('invalid_records'):
-            print(f"  - Invalid records: {len(result['data']['invalid_records'])}")
-        return result
-    except Exception as e:
-        print(f"❌ Failed to add sales data: {e}")
-        return None
-
-def generate_sample_data(count):
-    """Generate sample sales data"""
-    client = DemandPredictionClient()
-    try:
-        result = client.generate_sample_data(count)
-        print(f"✅ Successfully generated sample data")
-        print(f"  - Generated {result['data']['inserted_count']} records")
-        return result
-    except Exception as e:
-        print(f"❌ Failed to generate sample data: {e}")
-        return None
-
-def check_health():
-    """Check the health status of the API"""
-    client = DemandPredictionClient()
-    try:
-        result = client.check_health()
-        print(f"✅ API health: {result['status']}")
-        print(f"  - MongoDB: {result['checks']['mongodb']}")
-        print(f"  - Models: {result['checks']['models']}")
-        return result
-    except Exception as e:
-        print(f"❌ Failed to check API health: {e}")
-        return None
-
-def get_version():
-    """Get API version information"""
-    client = DemandPredictionClient()
-    try:
-        version = client.get_version()
-        print(f"✅ API version: {version['api_version']}")
-        print(f"  - Models last trained: {version['models_last_trained']}")
-        return version
-    except Exception as e:
-        print(f"❌ Failed to get API version: {e}")
-        return None
-
-def get_stats():
-    """Get API usage statistics"""
-    client = DemandPredictionClient()
-    try:
-        stats = client.get_stats()
-        print(f"✅ API statistics:")
-        for key, value in stats.items():
-            print(f"  - {key}: {value}")
-        return stats
-    except Exception as e:
-        print(f"❌ Failed to get API statistics: {e}")
-        return None
-
-def main():
-    """Main function to handle command line arguments and execute actions"""
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description='Demand Prediction API Client')
-    parser.add_argument('action', choices=[
-        'status', 'regions', 'region', 'models', 
-        'predict-demand', 'predict-rise', 'predict-product', 'predict-all', 
-        'upload', 'add-sales', 'generate-samples', 'health', 'version', 'stats'
-    ], help='Action to perform')
-    parser.add_argument('--id', help='Region ID for specific region queries')
-    parser.add_argument('--file', help='Data file path for predictions or uploads')
-    parser.add_argument('--count', type=int, default=100, help='Number of sample records to generate')
-    parser.add_argument('--url', default=BASE_URL, help='Base URL for the API')
-    
-    args = parser.parse_args()
-    
-    # Execute requested action
-    if args.action == 'status':
-        test_api_status()
-    elif args.action == 'regions':
-        get_all_regions()
-    elif args.action == 'region':
-        if not args.id:
-            print("❌ Region ID is required for this action")
-            return
-        get_region_by_id(args.id)
-    elif args.action == 'models':
-        get_model_details()
-    elif args.action == 'predict-demand':
-        if not args.file:
-            print("❌ Data file is required for this action")
-            return
-        predict_demand(args.file)
-    elif args.action == 'predict-rise':
-        if not args.file:
-            print("❌ Data file is required for this action")
-            return
-        client = DemandPredictionClient()
-        try:
-            predictions = client.predict_demand_rise(args.file)
-            print(f"✅ Successfully predicted demand rise for {len(predictions)} records")
-            print("Sample predictions:")
-            sample_count = min(3, len(predictions))
-            print(json.dumps(predictions[:sample_count], indent=2))
-        except Exception as e:
-            print(f"❌ Failed to predict demand rise: {e}")
-    elif args.action == 'predict-product':
-        if not args.file:
-            print("❌ Data file is required for this action")
-            return
-        client = DemandPredictionClient()
-        try:
-            predictions = client.predict_top_product(args.file)
-            print(f"✅ Successfully predicted top product for {len(predictions)} records")
-            print("Sample predictions:")
-            sample_count = min(3, len(predictions))
-            print(json.dumps(predictions[:sample_count], indent=2))
-        except Exception as e:
-            print(f"❌ Failed to predict top product: {e}")
-    elif args.action == 'predict-all':
-        if not args.file:
-            print("❌ Data file is required for this action")
-            return
-        predict_all(args.file)
-    elif args.action == 'upload':
-        if not args.file:
-            print("❌ Data file is required for this action")
-            return
-        upload_data(args.file)
-    elif args.action == 'add-sales':
-        if not args.file:
-            print("❌ Data file is required for this action")
-            return
-        add_sales_data(args.file)
-    elif args.action == 'generate-samples':
-        generate_sample_data(args.count)
-    elif args.action == 'health':
-        check_health()
-    elif args.action == 'version':
-        get_version()
-    elif args.action == 'stats':
-        get_stats()
-
-if __name__ == '__main__':
-    main()
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import json
+import numpy as np
+import pandas as pd
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Union, Optional, Any, Tuple
+
+from client_cache import DEFAULT_CACHE_DIR, PredictionCache, record_key
+
+# Default base URL for the API
+BASE_URL = "http://localhost:5000"
+
+# Responses that mean "try again later"; the request was not processed
+RETRY_STATUSES = (429, 503)
+
+# Prediction endpoints by model name, as used by stream_predictions
+PREDICTION_ENDPOINTS = {
+    'demand': '/predict/demand',
+    'demand-rise': '/predict/demand-rise',
+    'top-product': '/predict/top-product',
+    'all': '/predict/all'
+}
+
+# Shapes predict_* can return: a list of dicts, a DataFrame, or a NumPy record array
+RETURN_TYPES = ('list', 'dataframe', 'records')
+
+# Block size when streaming files from disk
+READ_BLOCK_SIZE = 1024 * 1024
+
+# How long the model version used in cache keys is trusted before /version is asked again
+MODEL_VERSION_TTL = 300
+
+
+# Called as progress_callback(rows_done, total_rows, rows_per_sec) after each chunk;
+# total_rows is None when a file is streamed and its length is not known up front
+ProgressCallback = Callable[[int, Optional[int], float], None]
+
+# Called as request_callback(endpoint, rows, seconds) after each successful prediction request
+RequestCallback = Callable[[str, int, float], None]
+
+
+class APIError(Exception):
+    """
+    Raised when the API answers with an error status or a body that is not JSON.
+    
+    Attributes:
+        status_code: HTTP status of the response
+    """
+    
+    def __init__(self, message: str, status_code: int):
+        self.status_code = status_code
+        super().__init__(message)
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Whether a failed prediction request may succeed if sent again.
+    
+    Transport errors and 5xx/429 responses are transient; a 4xx response or a
+    local error (e.g. an unserializable record) fails the same way every time.
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return True
+    return isinstance(error, APIError) and (error.status_code >= 500 or error.status_code == 429)
+
+
+class ChunkedRequestError(Exception):
+    """
+    Raised when some chunks of a chunked request still fail after their retries.
+    
+    Attributes:
+        failed_chunks: Mapping of chunk index to the last error for that chunk
+        results: Per-chunk results in input order, None for failed chunks
+        chunk_size: Number of input rows per chunk
+    """
+    
+    def __init__(self, failed_chunks: Dict[int, Exception], results: List[Any], chunk_size: int):
+        self.failed_chunks = failed_chunks
+        self.results = results
+        self.chunk_size = chunk_size
+        first_index = min(failed_chunks)
+        super().__init__(
+            f"{len(failed_chunks)} of {len(results)} chunks failed; "
+            f"first failure (chunk {first_index}): {failed_chunks[first_index]}"
+        )
+
+
+class JitteredRetry(Retry):
+    """
+    Retry policy with "full jitter" exponential backoff.
+    
+    Each wait is drawn uniformly between 0 and the exponential backoff time so
+    that many clients throttled at the same moment do not retry in lockstep.
+    A Retry-After header on the response still takes precedence.
+    
+    Connection errors are retried for every method, since nothing was sent.
+    Read errors (timeouts, dropped connections) are retried only for
+    idempotent methods: a POST such as /sales/add may already have been
+    committed. 429/503 responses are retried for every method because the
+    request was rejected before any work was done.
+    """
+    
+    def get_backoff_time(self) -> float:
+        return random.uniform(0, super().get_backoff_time())
+    
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code in RETRY_STATUSES and self.status_forcelist and status_code in self.status_forcelist:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+class DemandPredictionClient:
+    """
+    Client for interacting with the Demand Prediction API.
+    
+    This client provides a simple interface to access all endpoints of the
+    Demand Prediction API, handling request formatting, error handling, and
+    response parsing.
+    """
+    
+    def __init__(self, base_url: str = BASE_URL, timeout: int = 10, pool_size: int = 10,
+                 max_retries: int = 3, backoff_factor: float = 0.5,
+                 session: Optional[requests.Session] = None, chunk_size: int = 5000,
+                 max_workers: int = 4, chunk_retries: int = 2, compress: bool = True,
+                 compress_level: int = 5, cache_dir: Optional[str] = None,
+                 cache_max_bytes: int = 512 * 1024 * 1024,
+                 request_callback: Optional[RequestCallback] = None):
+        """
+        Initialize the Demand Prediction API client.
+        
+        The client owns a pooled keep-alive session, so consecutive calls reuse
+        TCP connections instead of opening a new one per request.
+        
+        Args:
+            base_url: Base URL of the API, defaults to http://localhost:5000
+            timeout: Request timeout in seconds, defaults to 10
+            pool_size: Maximum number of kept-alive connections, defaults to 10
+            max_retries: Retries on connection errors and 429/503 responses (and on
+                read errors for GETs), defaults to 3
+            backoff_factor: Base of the jittered exponential backoff in seconds, defaults to 0.5
+            session: Optional preconfigured session to use instead of building one
+            chunk_size: Maximum rows per prediction request; larger inputs are
+                split and sent concurrently, defaults to 5000
+            max_workers: Maximum chunks in flight at once, defaults to 4
+            chunk_retries: Extra attempts for a chunk that fails, defaults to 2
+            compress: Gzip request bodies (Content-Encoding: gzip), defaults to True
+            compress_level: Gzip compression level, defaults to 5
+            cache_dir: Directory of a persistent prediction cache; predictions
+                are only requested for records not cached for the current
+                model version. Disabled by default
+            cache_max_bytes: Size limit of the prediction cache, defaults to 512 MB
+            request_callback: Optional callable receiving (endpoint, rows, seconds)
+                after each successful prediction request, e.g. to record latencies
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.chunk_retries = chunk_retries
+        self.compress = compress
+        self.compress_level = compress_level
+        self.request_callback = request_callback
+        # Every in-flight chunk needs its own pooled connection
+        pool_size = max(pool_size, max_workers)
+        self.session = session or self._build_session(pool_size, max_retries, backoff_factor)
+        self.cache = PredictionCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self._model_version: Optional[str] = None
+        self._model_version_checked = 0.0
+    
+    @staticmethod
+    def _build_session(pool_size: int, max_retries: int, backoff_factor: float) -> requests.Session:
+        """
+        Build a keep-alive session with a bounded connection pool and retries.
+        
+        Args:
+            pool_size: Maximum number of connections kept per host
+            max_retries: Total number of retries per request
+            backoff_factor: Base of the exponential backoff in seconds
+            
+        Returns:
+            Configured requests session
+        """
+        retry = JitteredRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def close(self) -> None:
+        """Close the pooled connections and the prediction cache held by the client."""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+    
+    def __enter__(self) -> 'DemandPredictionClient':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def _handle_response(self, response: requests.Response) -> Dict:
+        """
+        Handle API response, checking for errors and returning parsed JSON.
+        
+        Args:
+            response: Response object from requests
+            
+        Returns:
+            Parsed JSON response
+            
+        Raises:
+            APIError: If the response indicates an error
+        """
+        try:
+            data = response.json()
+            
+            if response.status_code >= 400 or (isinstance(data, dict) and data.get('status') == 'error'):
+                error_message = data.get('message', 'Unknown error') if isinstance(data, dict) else 'Unknown error'
+                raise APIError(f"API Error ({response.status_code}): {error_message}", response.status_code)
+                
+            return data
+        except json.JSONDecodeError:
+            raise APIError(f"Failed to parse API response as JSON: {response.text}", response.status_code)
+    
+    def check_api_status(self) -> Dict:
+        """
+        Test if the API is running and return available endpoints.
+        
+        Returns:
+            API status information including available endpoints
+        """
+        response = self.session.get(f"{self.base_url}/", timeout=self.timeout)
+        return self._handle_response(response)
+    
+    def get_all_regions(self) -> List[Dict]:
+        """
+        Fetch all region summaries.
+        
+        Returns:
+            List of region summaries
+        """
+        response = self.session.get(f"{self.base_url}/regions", timeout=self.timeout)
+        result = self._handle_response(response)
+        return result.get('data', [])
+    
+    def get_region_by_id(self, region_id: Union[int, str]) -> Dict:
+        """
+        Fetch a specific region by ID.
+        
+        Args:
+            region_id: ID of the region to retrieve
+            
+        Returns:
+            Region details
+        """
+        response = self.session.get(f"{self.base_url}/regions/{region_id}", timeout=self.timeout)
+        result = self._handle_response(response)
+        return result.get('data', {})
+    
+    def get_model_details(self) -> Dict:
+        """
+        Fetch model details and evaluation metrics.
+        
+        Returns:
+            Model details and evaluation metrics
+        """
+        response = self.session.get(f"{self.base_url}/models", timeout=self.timeout)
+        result = self._handle_response(response)
+        return result.get('data', {})
+    
+    def predict_demand(self, data: Union[List[Dict], str, pd.DataFrame],
+                       progress_callback: Optional[ProgressCallback] = None,
+                       return_type: str = 'list') -> Union[List[Dict], pd.DataFrame, np.recarray]:
+        """
+        Predict region demand using the API.
+        
+        Args:
+            data: Either a list of dictionaries, a DataFrame, or a file path
+            progress_callback: Optional callable receiving (rows_done, total_rows,
+                rows_per_sec) as chunks complete
+            return_type: 'list' (default), 'dataframe' or 'records' (NumPy record
+                array); the latter two are decoded from the columnar wire format
+            
+        Returns:
+            List of demand predictions, or a DataFrame / record array per return_type
+            
+        Raises:
+            ValueError: If the input data format is invalid
+            FileNotFoundError: If the specified file does not exist
+            ChunkedRequestError: If some chunks still fail after their retries
+        """
+        return self._predict("/predict/demand", data, progress_callback, return_type)
+    
+    def predict_demand_rise(self, data: Union[List[Dict], str, pd.DataFrame],
+                            progress_callback: Optional[ProgressCallback] = None,
+                            return_type: str = 'list') -> Union[List[Dict], pd.DataFrame, np.recarray]:
+        """
+        Predict if demand will rise using the API.
+        
+        Args:
+            data: Either a list of dictionaries, a DataFrame, or a file path
+            progress_callback: Optional callable receiving (rows_done, total_rows,
+                rows_per_sec) as chunks complete
+            return_type: 'list' (default), 'dataframe' or 'records' (NumPy record
+                array); the latter two are decoded from the columnar wire format
+            
+        Returns:
+            List of demand rise predictions, or a DataFrame / record array per return_type
+            
+        Raises:
+            ValueError: If the input data format is invalid
+            FileNotFoundError: If the specified file does not exist
+            ChunkedRequestError: If some chunks still fail after their retries
+        """
+        return self._predict("/predict/demand-rise", data, progress_callback, return_type)
+    
+    def predict_top_product(self, data: Union[List[Dict], str, pd.DataFrame],
+                            progress_callback: Optional[ProgressCallback] = None,
+                            return_type: str = 'list') -> Union[List[Dict], pd.DataFrame, np.recarray]:
+        """
+        Predict top product using the API.
+        
+        Args:
+            data: Either a list of dictionaries, a DataFrame, or a file path
+            progress_callback: Optional callable receiving (rows_done, total_rows,
+                rows_per_sec) as chunks complete
+            return_type: 'list' (default), 'dataframe' or 'records' (NumPy record
+                array); the latter two are decoded from the columnar wire format
+            
+        Returns:
+            List of top product predictions, or a DataFrame / record array per return_type
+            
+        Raises:
+            ValueError: If the input data format is invalid
+            FileNotFoundError: If the specified file does not exist
+            ChunkedRequestError: If some chunks still fail after their retries
+        """
+        return self._predict("/predict/top-product", data, progress_callback, return_type)
+    
+    def predict_all(self, data: Union[List[Dict], str, pd.DataFrame],
+                    progress_callback: Optional[ProgressCallback] = None,
+                    return_type: str = 'list') -> Dict:
+        """
+        Run all prediction models using the API.
+        
+        Args:
+            data: Either a list of dictionaries, a DataFrame, or a file path
+            progress_callback: Optional callable receiving (rows_done, total_rows,
+                rows_per_sec) as chunks complete
+            return_type: 'list' (default), 'dataframe' or 'records' (NumPy record
+                array); the latter two are decoded from the columnar wire format
+            
+        Returns:
+            Dictionary containing results from all prediction models, each in
+            the shape chosen by return_type
+            
+        Raises:
+            ValueError: If the input data format is invalid
+            FileNotFoundError: If the specified file does not exist
+            ChunkedRequestError: If some chunks still fail after their retries
+        """
+        return self._predict("/predict/all", data, progress_callback, return_type)
+    
+    def upload_data(self, file_path: str) -> Dict:
+        """
+        Upload data file to the API.
+        
+        Args:
+            file_path: Path to the data file
+            
+        Returns:
+            Upload results
+            
+        Raises:
+            FileNotFoundError: If the specified file does not exist
+            ValueError: If the file format is unsupported
+        """
+        # Check if file exists
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        # Check file type
+        if not file_path.endswith(('.csv', '.xls', '.xlsx', '.json')):
+            raise ValueError(f"Unsupported file format: {file_path}")
+        
+        # Upload file
+        if not self.compress:
+            with open(file_path, 'rb') as file:
+                response = self.session.post(
+                    f"{self.base_url}/upload/data",
+                    files={'file': file},
+                    timeout=self.timeout
+                )
+            return self._handle_response(response)
+        
+        # Gzip the multipart body block by block into a spooled file, which
+        # stays in memory for small files and spills to disk for large ones,
+        # and can be rewound if the request is retried
+        boundary = uuid.uuid4().hex
+        with tempfile.SpooledTemporaryFile(max_size=8 * READ_BLOCK_SIZE) as body:
+            compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, 31)
+            body.write(compressor.compress(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+                f'filename="{os.path.basename(file_path)}"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n'.encode()
+            ))
+            with open(file_path, 'rb') as file:
+                for block in iter(lambda: file.read(READ_BLOCK_SIZE), b''):
+                    body.write(compressor.compress(block))
+            body.write(compressor.compress(f'\r\n--{boundary}--\r\n'.encode()))
+            body.write(compressor.flush())
+            size = body.tell()
+            body.seek(0)
+            response = self.session.post(
+                f"{self.base_url}/upload/data",
+                data=body,
+                headers={
+                    "Content-Type": f"multipart/form-data; boundary={boundary}",
+                    "Content-Encoding": "gzip",
+                    "Content-Length": str(size)
+                },
+                timeout=self.timeout
+            )
+        
+        return self._handle_response(response)
+    
+    def add_sales_data(self, data: Union[List[Dict], str, pd.DataFrame]) -> Dict:
+        """
+        Add sales data records directly to the database.
+        
+        Args:
+            data: Either a list of dictionaries, a DataFrame, or a file path
+            
+        Returns:
+            Summary of added records
+        """
+        # Process input data based on type
+        processed_data = self._process_input_data(data)
+        
+        # Make API request
+        response = self.session.post(
+            f"{self.base_url}/sales/add",
+            json=processed_data,
+            headers={"Content-Type": "application/json"},
+            timeout=self.timeout
+        )
+        
+        return self._handle_response(response)
+    
+    def generate_sample_data(self, count: int = 100) -> Dict:
+        """
+        Generate and add sample sales data to the database.
+        
+        Args:
+            count: Number of records to generate, defaults to 100
+            
+        Returns:
+            Summary of generated records
+            
+        Raises:
+            ValueError: If count is not between 1 and 10000
+        """
+        if count <= 0 or count > 10000:
+            raise ValueError("Count must be between 1 and 10000")
+            
+        response = self.session.get(
+            f"{self.base_url}/generate-sample-data/{count}",
+            timeout=self.timeout
+        )
+        
+        return self._handle_response(response)
+    
+    def check_health(self) -> Dict:
+        """
+        Check the health status of the API.
+        
+        Returns:
+            Health status information
+        """
+        response = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
+        return self._handle_response(response)
+    
+    def get_version(self) -> Dict:
+        """
+        Get API version information.
+        
+        Returns:
+            API version and model training information
+        """
+        response = self.session.get(f"{self.base_url}/version", timeout=self.timeout)
+        result = self._handle_response(response)
+        return result.get('data', {})
+    
+    def get_stats(self) -> Dict:
+        """
+        Get API usage statistics.
+        
+        Returns:
+            Usage statistics
+        """
+        response = self.session.get(f"{self.base_url}/stats", timeout=self.timeout)
+        result = self._handle_response(response)
+        return result.get('data', {})
+    
+    def _post_chunk(self, endpoint: str, records: List[Dict], columnar: bool = False) -> Any:
+        """
+        Send one batch of records to a prediction endpoint.
+        
+        Args:
+            endpoint: API path, e.g. /predict/demand
+            records: Records to score
+            columnar: Ask for the columnar response format and decode it into DataFrames
+            
+        Returns:
+            The 'data' field of the response, decoded when columnar
+        """
+        body, headers = self._encode_json(records)
+        start = time.perf_counter()
+        response = self.session.post(
+            f"{self.base_url}{endpoint}",
+            params={'format': 'columns'} if columnar else None,
+            data=body,
+            headers=headers,
+            timeout=self.timeout
+        )
+        result = self._handle_response(response).get('data')
+        if columnar:
+            result = self._decode_columns(endpoint, result)
+        if self.request_callback is not None:
+            self.request_callback(endpoint, len(records), time.perf_counter() - start)
+        return result
+    
+    def _encode_json(self, payload: Any) -> Tuple[bytes, Dict[str, str]]:
+        """
+        Serialize a payload to a JSON request body, gzipped when compression is on.
+        
+        Returns:
+            Request body and the matching headers
+        """
+        body = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+        headers = {"Content-Type": "application/json"}
+        if self.compress:
+            compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, 31)
+            body = compressor.compress(body) + compressor.flush()
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+    
+    def _post_chunk_with_retries(self, endpoint: str, records: List[Dict], columnar: bool = False) -> Any:
+        """Send one chunk, retrying it on its own up to chunk_retries times after transient errors."""
+        for attempt in range(self.chunk_retries + 1):
+            try:
+                return self._post_chunk(endpoint, records, columnar)
+            except Exception as e:
+                if attempt == self.chunk_retries or not is_transient_error(e):
+                    raise
+                time.sleep(random.uniform(0, 0.5 * 2 ** attempt))
+    
+    @staticmethod
+    def _merge_chunk_results(results: List[Any]) -> Any:
+        """Concatenate per-chunk results in input order (lists or DataFrames, or dicts of them)."""
+        if results and isinstance(results[0], dict):
+            return {key: DemandPredictionClient._merge_chunk_results([result[key] for result in results])
+                    for key in results[0]}
+        if results and isinstance(results[0], pd.DataFrame):
+            return pd.concat(results, ignore_index=True)
+        return [item for result in results for item in result]
+    
+    @staticmethod
+    def _columns_frame(data: Union[Dict[str, Any], List[Dict]]) -> pd.DataFrame:
+        """
+        Build a DataFrame from one model's predictions.
+        
+        Columnar data ({"field": [...]}) maps straight onto typed columns;
+        nested columns such as all_products become "all_products.loan" etc.
+        Row data (cached predictions, or a server without the columnar
+        format) is normalized the same way.
+        """
+        if isinstance(data, list):
+            return pd.json_normalize(data, sep='.') if data else pd.DataFrame()
+        columns = {}
+        for key, values in data.items():
+            if isinstance(values, dict):
+                columns.update({f"{key}.{sub_key}": sub_values for sub_key, sub_values in values.items()})
+            else:
+                columns[key] = values
+        return pd.DataFrame(columns)
+    
+    @staticmethod
+    def _decode_columns(endpoint: str, data: Any) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """Decode a prediction response into a DataFrame, or a dict of DataFrames for /predict/all."""
+        if endpoint == PREDICTION_ENDPOINTS['all']:
+            return {key: DemandPredictionClient._columns_frame(value) for key, value in data.items()}
+        return DemandPredictionClient._columns_frame(data)
+    
+    @staticmethod
+    def _convert_result(result: Any, return_type: str) -> Any:
+        """Turn decoded DataFrames into record arrays when return_type is 'records'."""
+        if return_type != 'records':
+            return result
+        if isinstance(result, dict):
+            return {key: frame.to_records(index=False) for key, frame in result.items()}
+        return result.to_records(index=False)
+    
+    def _iter_chunk_outcomes(self, endpoint: str, chunks: Iterator[List[Dict]],
+                             report: Callable[[int], None], columnar: bool = False) -> Iterator[Tuple[int, Any]]:
+        """
+        Send chunks concurrently and yield (index, result or exception) in input order.
+        
+        At most 2 * max_workers chunks are read ahead of the one being
+        yielded, so memory stays bounded however long the input is.
+        """
+        window: deque = deque()
+        
+        def collect() -> Tuple[int, Any]:
+            index, rows, future = window.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                return index, e
+            report(rows)
+            return index, result
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for index, chunk in enumerate(chunks):
+                window.append((index, len(chunk), executor.submit(self._post_chunk_with_retries, endpoint, chunk, columnar)))
+                if len(window) >= 2 * self.max_workers:
+                    yield collect()
+            while window:
+                yield collect()
+    
+    def _progress_reporter(self, total_rows: Optional[int],
+                           progress_callback: Optional[ProgressCallback]) -> Callable[[int], None]:
+        """Build a thread-safe function that adds completed rows and calls progress_callback."""
+        start = time.perf_counter()
+        rows_done = 0
+        progress_lock = threading.Lock()
+        
+        def report(rows: int) -> None:
+            nonlocal rows_done
+            if progress_callback is None:
+                return
+            with progress_lock:
+                rows_done += rows
+                elapsed = time.perf_counter() - start
+                progress_callback(rows_done, total_rows, rows_done / elapsed if elapsed > 0 else 0.0)
+        
+        return report
+    
+    def _predict(self, endpoint: str, data: Union[List[Dict], str, pd.DataFrame],
+                 progress_callback: Optional[ProgressCallback] = None, return_type: str = 'list') -> Any:
+        """
+        Score input data, answering from the prediction cache where possible.
+        
+        Without a cache, or when the model version cannot be determined, every
+        record is sent to the API. For the 'dataframe' and 'records' return
+        types responses are requested in the columnar format and decoded
+        per chunk, so no per-row dicts are built.
+        
+        Raises:
+            ValueError: If return_type is unknown
+        """
+        if return_type not in RETURN_TYPES:
+            raise ValueError(f"Unknown return_type: {return_type}. Expected one of {', '.join(RETURN_TYPES)}")
+        columnar = return_type != 'list'
+        if self.cache is not None:
+            model_version = self._current_model_version()
+            if model_version is not None:
+                result = self._predict_cached(endpoint, data, model_version, progress_callback)
+                return self._convert_result(self._decode_columns(endpoint, result), return_type) if columnar else result
+        return self._convert_result(self._predict_uncached(endpoint, data, progress_callback, columnar), return_type)
+    
+    def _current_model_version(self) -> Optional[str]:
+        """Model version from /version, re-checked every MODEL_VERSION_TTL seconds; None if unavailable."""
+        if time.monotonic() - self._model_version_checked > MODEL_VERSION_TTL:
+            try:
+                version = self.get_version()
+                self._model_version = f"{version.get('api_version')}/{version.get('models_last_trained')}"
+            except Exception:
+                self._model_version = None
+            self._model_version_checked = time.monotonic()
+        return self._model_version
+    
+    def _predict_cached(self, endpoint: str, data: Union[List[Dict], str, pd.DataFrame], model_version: str,
+                        progress_callback: Optional[ProgressCallback] = None) -> Any:
+        """
+        Score input data, sending only records that are not in the cache.
+        
+        Identical records are sent once. Fresh predictions are stored in the
+        cache and merged with the cached ones in input order. The progress
+        callback reports the rows actually sent.
+        """
+        records = self._process_input_data(data)
+        if not records:
+            return self._predict_uncached(endpoint, records, progress_callback)
+        keys = [record_key(endpoint, model_version, record) for record in records]
+        predictions = self.cache.get_many(keys)
+        misses: Dict[str, Dict] = {}
+        for key, record in zip(keys, records):
+            if key not in predictions and key not in misses:
+                misses[key] = record
+        if misses:
+            result = self._predict_uncached(endpoint, list(misses.values()), progress_callback)
+            fresh = dict(zip(misses, self._split_result(result)))
+            self.cache.set_many(fresh)
+            predictions.update(fresh)
+        return self._join_results([predictions[key] for key in keys], endpoint)
+    
+    @staticmethod
+    def _split_result(result: Any) -> List[Any]:
+        """Split a response into one prediction per input record (rows, or dicts of rows)."""
+        if isinstance(result, dict):
+            return [dict(zip(result, values)) for values in zip(*result.values())]
+        return result
+    
+    @staticmethod
+    def _join_results(predictions: List[Any], endpoint: str) -> Any:
+        """Inverse of _split_result for the given endpoint."""
+        if endpoint == PREDICTION_ENDPOINTS['all']:
+            return {key: [prediction[key] for prediction in predictions] for key in predictions[0]}
+        return predictions
+    
+    def _predict_uncached(self, endpoint: str, data: Union[List[Dict], str, pd.DataFrame],
+                          progress_callback: Optional[ProgressCallback] = None, columnar: bool = False) -> Any:
+        """
+        Score input data, splitting it into chunks sent concurrently when large.
+        
+        Inputs of at most chunk_size rows go out as a single request. Larger
+        inputs are split into chunk_size batches (files are read a chunk at a
+        time), sent through a pool of max_workers threads sharing the
+        session's connection pool, and the results are reassembled in input
+        order. A chunk that fails with a transport error or a 5xx/429 response
+        is retried on its own, whether or not the input was split; chunks that
+        still fail are reported in ChunkedRequestError together with the
+        results of the chunks that succeeded.
+        
+        Args:
+            endpoint: API path, e.g. /predict/demand
+            data: Either a list of dictionaries, a DataFrame, or a file path
+            progress_callback: Optional callable receiving (rows_done, total_rows, rows_per_sec)
+            columnar: Request the columnar format and decode each chunk into DataFrames
+            
+        Returns:
+            Merged 'data' field of the responses
+        """
+        total_rows, chunks = self._iter_input_chunks(data)
+        report = self._progress_reporter(total_rows, progress_callback)
+        
+        first = next(chunks, [])
+        second = next(chunks, None)
+        if second is None:
+            result = self._post_chunk_with_retries(endpoint, first, columnar)
+            report(len(first))
+            return result
+        
+        results: List[Any] = []
+        failed_chunks: Dict[int, Exception] = {}
+        for index, outcome in self._iter_chunk_outcomes(endpoint, itertools.chain([first, second], chunks),
+                                                             report, columnar):
+            if isinstance(outcome, Exception):
+                failed_chunks[index] = outcome
+                results.append(None)
+            else:
+                results.append(outcome)
+        
+        if failed_chunks:
+            raise ChunkedRequestError(failed_chunks, results, self.chunk_size)
+        return self._merge_chunk_results(results)
+    
+    def stream_predictions(self, model: str, data: Union[List[Dict], str, pd.DataFrame],
+                           progress_callback: Optional[ProgressCallback] = None,
+                           return_type: str = 'list') -> Iterator[Any]:
+        """
+        Score input data chunk by chunk, yielding each chunk's predictions in input order.
+        
+        Files are read a chunk at a time and only a bounded number of chunks
+        is in flight, so client memory stays constant for arbitrarily large
+        inputs as long as the caller writes each result out as it arrives.
+        
+        Args:
+            model: One of 'demand', 'demand-rise', 'top-product' or 'all'
+            data: Either a list of dictionaries, a DataFrame, or a file path
+            progress_callback: Optional callable receiving (rows_done, total_rows, rows_per_sec)
+            return_type: 'list' (default), 'dataframe' or 'records', as for predict_*
+            
+        Yields:
+            The 'data' field of each chunk's response
+            
+        Raises:
+            ValueError: If the model name or return_type is unknown
+            Exception: The error of the first chunk that still fails after its retries
+        """
+        if model not in PREDICTION_ENDPOINTS:
+            raise ValueError(f"Unknown model: {model}. Expected one of {', '.join(PREDICTION_ENDPOINTS)}")
+        if return_type not in RETURN_TYPES:
+            raise ValueError(f"Unknown return_type: {return_type}. Expected one of {', '.join(RETURN_TYPES)}")
+        total_rows, chunks = self._iter_input_chunks(data)
+        report = self._progress_reporter(total_rows, progress_callback)
+        outcomes = self._iter_chunk_outcomes(PREDICTION_ENDPOINTS[model], chunks, report, return_type != 'list')
+        for index, outcome in outcomes:
+            if isinstance(outcome, Exception):
+                raise outcome
+            yield self._convert_result(outcome, return_type)
+    
+    @staticmethod
+    def _frame_records(df: pd.DataFrame) -> List[Dict]:
+        """Convert a DataFrame to records, with missing values as None."""
+        return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+    
+    def _iter_input_chunks(self, data: Union[List[Dict], str, pd.DataFrame]) -> Tuple[Optional[int], Iterator[List[Dict]]]:
+        """
+        Split input data into chunks of at most chunk_size records.
+        
+        CSV and JSON Lines files are read from disk a chunk at a time; JSON
+        arrays and Excel workbooks have to be parsed whole.
+        
+        Returns:
+            Total number of rows (None when a file is streamed) and an iterator of chunks
+        """
+        if isinstance(data, str) and data.endswith(('.csv', '.jsonl', '.ndjson')):
+            if not os.path.exists(data):
+                raise FileNotFoundError(f"File not found: {data}")
+            if data.endswith('.csv'):
+                readers = pd.read_csv(data, chunksize=self.chunk_size)
+            else:
+                readers = pd.read_json(data, lines=True, chunksize=self.chunk_size)
+            return None, (self._frame_records(chunk) for chunk in readers)
+        
+        records = self._process_input_data(data)
+        return len(records), (records[i:i + self.chunk_size] for i in range(0, len(records), self.chunk_size))
+    
+    @staticmethod
+    def _process_input_data(data: Union[List[Dict], str, pd.DataFrame]) -> List[Dict]:
+        """
+        Process input data based on its type.
+        
+        Args:
+            data: Either a list of dictionaries, a DataFrame, or a file path
+            
+        Returns:
+            List of dictionaries ready for API submission
+            
+        Raises:
+            ValueError: If the input data format is invalid
+            FileNotFoundError: If the specified file does not exist
+        """
+        # If data is already a list of dictionaries, use it directly
+        if isinstance(data, list) and all(isinstance(item, dict) for item in data):
+            return data
+        
+        # If data is a DataFrame, convert to list of dictionaries
+        elif isinstance(data, pd.DataFrame):
+            return data.to_dict(orient='records')
+        
+        # If data is a file path, load the file
+        elif isinstance(data, str):
+            # Check if file exists
+            if not os.path.exists(data):
+                raise FileNotFoundError(f"File not found: {data}")
+            
+            # Determine file type and load data
+            if data.endswith('.csv'):
+                df = pd.read_csv(data)
+            elif data.endswith(('.xls', '.xlsx')):
+                df = pd.read_excel(data)
+            elif data.endswith('.json'):
+                df = pd.read_json(data)
+            elif data.endswith(('.jsonl', '.ndjson')):
+                df = pd.read_json(data, lines=True)
+            else:
+                raise ValueError(f"Unsupported file format: {data}")
+            
+            # Convert DataFrame to list of dictionaries
+            return df.to_dict(orient='records')
+        
+        # Invalid input type
+        else:
+            raise ValueError(f"Invalid input data type: {type(data)}")
+
+
+def test_api_status():
+    """Test if the API is running"""
+    client = DemandPredictionClient()
+    try:
+        result = client.check_api_status()
+        print("✅ API is running")
+        print(f"Available endpoints: {json.dumps(result['endpoints'], indent=2)}")
+        return True
+    except Exception as e:
+        print(f"❌ API is not responding: {e}")
+        return False
+
+def get_all_regions():
+    """Fetch all region summaries"""
+    client = DemandPredictionClient()
+    try:
+        regions = client.get_all_regions()
+        print(f"✅ Retrieved {len(regions)} regions")
+        print("Sample region data:")
+        print(json.dumps(regions[0] if regions else {}, indent=2))
+        return regions
+    except Exception as e:
+        print(f"❌ Failed to retrieve regions: {e}")
+        return []
+
+def get_region_by_id(region_id):
+    """Fetch a specific region by ID"""
+    client = DemandPredictionClient()
+    try:
+        region = client.get_region_by_id(region_id)
+        print(f"✅ Retrieved data for region {region_id}")
+        print(json.dumps(region, indent=2))
+        return region
+    except Exception as e:
+        print(f"❌ Failed to retrieve region {region_id}: {e}")
+        return None
+
+def get_model_details():
+    """Fetch model details and evaluation metrics"""
+    client = DemandPredictionClient()
+    try:
+        data = client.get_model_details()
+        print("✅ Retrieved model details and evaluation metrics")
+        print(f"Found {len(data['model_details'])} models:")
+        for model in data['model_details']:
+            print(f"  - {model['model_type']}: {model['target']}")
+        return data
+    except Exception as e:
+        print(f"❌ Failed to retrieve model details: {e}")
+        return None
+
+def predict_demand(data_file, client=None):
+    """Predict region demand using the API"""
+    client = client or DemandPredictionClient()
+    try:
+        predictions = client.predict_demand(data_file)
+        print(f"✅ Successfully predicted demand for {len(predictions)} records")
+        print("Sample predictions:")
+        sample_count = min(3, len(predictions))
+        print(json.dumps(predictions[:sample_count], indent=2))
+        return predictions
+    except Exception as e:
+        print(f"❌ Failed to predict demand: {e}")
+        return None
+
+def predict_all(data_file, client=None):
+    """Run all prediction models using the API"""
+    client = client or DemandPredictionClient()
+    try:
+        results = client.predict_all(data_file)
+        print(f"✅ Successfully ran all predictions")
+        print("Results include:")
+        
+        for model_type, predictions in results.items():
+            print(f"  - {model_type}: {len(predictions)} predictions")
+        
+        return results
+    except Exception as e:
+        print(f"❌ Failed to run predictions: {e}")
+        return None
+
+def upload_data(file_path):
+    """Upload data file to the API"""
+    client = DemandPredictionClient()
+    try:
+        result = client.upload_data(file_path)
+        print(f"✅ Successfully uploaded data")
+        print(f"  - Rows: {result['data']['rows']}")
+        print(f"  - Columns: {', '.join(result['data']['columns'])}")
+        return result
+    except Exception as e:
+        print(f"❌ Failed to upload data: {e}")
+        return None
+
+def add_sales_data(data_file):
+    """Add sales data records directly to the database"""
+    client = DemandPredictionClient()
+    try:
+        result = client.add_sales_data(data_file)
+        print(f"✅ Successfully added sales data")
+        print(f"  - Inserted count: {result['data']['inserted_count']}")
+        if result['data'].get('invalid_records'):
+            print(f"  - Invalid records: {len(result['data']['invalid_records'])}")
+        return result
+    except Exception as e:
+        print(f"❌ Failed to add sales data: {e}")
+        return None
+
+def generate_sample_data(count):
+    """Generate sample sales data"""
+    client = DemandPredictionClient()
+    try:
+        result = client.generate_sample_data(count)
+        print(f"✅ Successfully generated sample data")
+        print(f"  - Generated {result['data']['inserted_count']} records")
+        return result
+    except Exception as e:
+        print(f"❌ Failed to generate sample data: {e}")
+        return None
+
+def check_health():
+    """Check the health status of the API"""
+    client = DemandPredictionClient()
+    try:
+        result = client.check_health()
+        print(f"✅ API health: {result['status']}")
+        print(f"  - MongoDB: {result['checks']['mongodb']}")
+        print(f"  - Models: {result['checks']['models']}")
+        return result
+    except Exception as e:
+        print(f"❌ Failed to check API health: {e}")
+        return None
+
+def get_version():
+    """Get API version information"""
+    client = DemandPredictionClient()
+    try:
+        version = client.get_version()
+        print(f"✅ API version: {version['api_version']}")
+        print(f"  - Models last trained: {version['models_last_trained']}")
+        return version
+    except Exception as e:
+        print(f"❌ Failed to get API version: {e}")
+        return None
+
+def cache_stats(cache_dir, max_bytes, clear=False):
+    """Show (and optionally clear) the persistent prediction cache"""
+    cache = PredictionCache(cache_dir, max_bytes)
+    try:
+        if clear:
+            cache.clear()
+            print(f"✅ Cleared prediction cache at {cache.path}")
+            return None
+        stats = cache.stats()
+        print(f"✅ Prediction cache at {stats['path']}")
+        print(f"  - Entries: {stats['entries']}")
+        print(f"  - Size: {stats['bytes'] / 1024 / 1024:.1f} MB of {stats['max_bytes'] / 1024 / 1024:.0f} MB")
+        hit_ratio = f"{stats['hit_ratio']:.1%}" if stats['hit_ratio'] is not None else "n/a"
+        print(f"  - Hits: {stats['hits']}, misses: {stats['misses']} (hit ratio {hit_ratio})")
+        print(f"  - Evictions: {stats['evictions']}")
+        return stats
+    finally:
+        cache.close()
+
+def run_batch(client, source, output_dir, model, output_format, jobs):
+    """Score every file in a directory or glob and write predictions to output files"""
+    # Imported here: client_batch builds on this module
+    from client_batch import BatchRunner, find_input_files, input_root
+    
+    input_files = find_input_files(source)
+    if not input_files:
+        print(f"❌ No input files found for {source}")
+        return None
+    
+    def progress(input_path, rows, error):
+        if error is None:
+            print(f"✅ {input_path}: {rows} rows")
+        else:
+            print(f"❌ {input_path}: {error}")
+    
+    try:
+        runner = BatchRunner(client, output_dir, model=model, output_format=output_format, jobs=jobs,
+                             input_root=input_root(source))
+    except (ValueError, ImportError) as e:
+        print(f"❌ {e}")
+        return None
+    print(f"Processing {len(input_files)} files into {output_dir} ({jobs} at a time)")
+    summary = runner.run(input_files, progress=progress)
+    
+    print(f"\nFiles: {summary['processed']} processed, {summary['skipped']} skipped (already done), "
+          f"{summary['failed']} failed")
+    print(f"Rows: {summary['rows']} in {summary['seconds']:.2f}s ({summary['rows_per_sec']:,.0f} rows/sec)")
+    if summary['requests']:
+        print(f"Requests: {summary['requests']}, p50 latency {summary['p50_request_seconds'] * 1000:.0f} ms, "
+              f"p95 latency {summary['p95_request_seconds'] * 1000:.0f} ms")
+    return summary
+
+def get_stats():
+    """Get API usage statistics"""
+    client = DemandPredictionClient()
+    try:
+        stats = client.get_stats()
+        print(f"✅ API statistics:")
+        for key, value in stats.items():
+            print(f"  - {key}: {value}")
+        return stats
+    except Exception as e:
+        print(f"❌ Failed to get API statistics: {e}")
+        return None
+
+def main():
+    """Main function to handle command line arguments and execute actions"""
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description='Demand Prediction API Client')
+    parser.add_argument('action', choices=[
+        'status', 'regions', 'region', 'models', 
+        'predict-demand', 'predict-rise', 'predict-product', 'predict-all', 
+        'upload', 'add-sales', 'generate-samples', 'health', 'version', 'stats',
+        'cache-stats', 'cache-clear', 'batch'
+    ], help='Action to perform')
+    parser.add_argument('--id', help='Region ID for specific region queries')
+    parser.add_argument('--file', help='Data file path for predictions or uploads')
+    parser.add_argument('--count', type=int, default=100, help='Number of sample records to generate')
+    parser.add_argument('--url', default=BASE_URL, help='Base URL for the API')
+    parser.add_argument('--cache', action='store_true',
+                        help=f'Cache predictions on disk and only send new records (in {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-dir', help='Prediction cache directory (implies --cache)')
+    parser.add_argument('--cache-max-mb', type=int, default=512, help='Prediction cache size limit in MB')
+    parser.add_argument('--input', help='Directory or glob of input files for batch')
+    parser.add_argument('--output-dir', default='predictions', help='Output directory for batch')
+    parser.add_argument('--model', default='all', choices=list(PREDICTION_ENDPOINTS), help='Model to run in batch')
+    parser.add_argument('--format', default='csv', choices=['csv', 'parquet', 'ndjson'], help='Batch output format')
+    parser.add_argument('--jobs', type=int, default=2, help='Files processed concurrently in batch')
+    
+    args = parser.parse_args()
+    
+    cache_dir = args.cache_dir or (DEFAULT_CACHE_DIR if args.cache else None)
+    if args.action in ('cache-stats', 'cache-clear'):
+        cache_stats(args.cache_dir or DEFAULT_CACHE_DIR, args.cache_max_mb * 1024 * 1024,
+                    clear=args.action == 'cache-clear')
+        return
+    
+    # Client for the prediction actions; batch jobs each keep up to max_workers requests in flight
+    client = DemandPredictionClient(args.url, pool_size=max(10, args.jobs * 4), cache_dir=cache_dir,
+                                    cache_max_bytes=args.cache_max_mb * 1024 * 1024)
+    
+    # Execute requested action
+    if args.action == 'status':
+        test_api_status()
+    elif args.action == 'regions':
+        get_all_regions()
+    elif args.action == 'region':
+        if not args.id:
+            print("❌ Region ID is required for this action")
+            return
+        get_region_by_id(args.id)
+    elif args.action == 'models':
+        get_model_details()
+    elif args.action == 'predict-demand':
+        if not args.file:
+            print("❌ Data file is required for this action")
+            return
+        predict_demand(args.file, client)
+    elif args.action == 'predict-rise':
+        if not args.file:
+            print("❌ Data file is required for this action")
+            return
+        try:
+            predictions = client.predict_demand_rise(args.file)
+            print(f"✅ Successfully predicted demand rise for {len(predictions)} records")
+            print("Sample predictions:")
+            sample_count = min(3, len(predictions))
+            print(json.dumps(predictions[:sample_count], indent=2))
+        except Exception as e:
+            print(f"❌ Failed to predict demand rise: {e}")
+    elif args.action == 'predict-product':
+        if not args.file:
+            print("❌ Data file is required for this action")
+            return
+        try:
+            predictions = client.predict_top_product(args.file)
+            print(f"✅ Successfully predicted top product for {len(predictions)} records")
+            print("Sample predictions:")
+            sample_count = min(3, len(predictions))
+            print(json.dumps(predictions[:sample_count], indent=2))
+        except Exception as e:
+            print(f"❌ Failed to predict top product: {e}")
+    elif args.action == 'predict-all':
+        if not args.file:
+            print("❌ Data file is required for this action")
+            return
+        predict_all(args.file, client)
+    elif args.action == 'upload':
+        if not args.file:
+            print("❌ Data file is required for this action")
+            return
+        upload_data(args.file)
+    elif args.action == 'add-sales':
+        if not args.file:
+            print("❌ Data file is required for this action")
+            return
+        add_sales_data(args.file)
+    elif args.action == 'generate-samples':
+        generate_sample_data(args.count)
+    elif args.action == 'health':
+        check_health()
+    elif args.action == 'version':
+        get_version()
+    elif args.action == 'stats':
+        get_stats()
+    elif args.action == 'batch':
+        if not args.input:
+            print("❌ Input directory or glob (--input) is required for this action")
+            return 1
+        summary = run_batch(client, args.input, args.output_dir, args.model, args.format, args.jobs)
+        if summary is None or summary['failed']:
+            return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
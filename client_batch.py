@@ -0,0 +1,295 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pyarrow_available = True
+except ImportError:
+    pyarrow_available = False
+
+from client import DemandPredictionClient
+
+# Input files picked up when a directory is given
+BATCH_INPUT_FORMATS = ('.csv', '.xls', '.xlsx', '.json', '.jsonl', '.ndjson')
+
+# Output formats and their file extensions
+OUTPUT_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'ndjson': '.ndjson'}
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def find_input_files(source: str) -> List[str]:
+    """
+    Resolve a directory or glob pattern to the input files to process.
+
+    Args:
+        source: Directory (its supported files are used, not recursively) or glob pattern
+
+    Returns:
+        Sorted list of file paths
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(BATCH_INPUT_FORMATS))
+
+
+def input_root(source: str) -> str:
+    """
+    Directory the output paths of a batch are made relative to.
+
+    Args:
+        source: Directory or glob pattern, as given to find_input_files
+
+    Returns:
+        The directory itself, or the directory part of a pattern before its first wildcard
+    """
+    if os.path.isdir(source):
+        return source
+    return os.path.dirname(re.split(r'[*?\[]', source, maxsplit=1)[0]) or '.'
+
+
+def _prediction_rows(result: Any) -> List[Dict]:
+    """Turn one chunk's result into output rows; predict-all gives one row per input holding all three predictions."""
+    if isinstance(result, dict):
+        return [dict(zip(result, values)) for values in zip(*result.values())]
+    return result
+
+
+def _prediction_frame(result: Any) -> pd.DataFrame:
+    """Turn one chunk's decoded result into a table; predict-all columns are prefixed with the model name."""
+    if isinstance(result, dict):
+        frame = pd.concat(list(result.values()), axis=1, keys=list(result))
+        frame.columns = [f"{model}.{column}" for model, column in frame.columns]
+        return frame
+    return result
+
+
+class _OutputWriter:
+    """Appends predictions to a CSV or Parquet file (as DataFrames) or NDJSON file (as rows) one chunk at a time."""
+
+    def __init__(self, path: str, output_format: str):
+        self.path = path
+        self.output_format = output_format
+        self.rows = 0
+        self._file = None
+        self._parquet = None
+
+    def write(self, rows: Union[List[Dict], pd.DataFrame]) -> None:
+        if len(rows) == 0:
+            return
+        if self.output_format == 'ndjson':
+            if self._file is None:
+                self._file = open(self.path, 'w', encoding='utf-8')
+            self._file.writelines(json.dumps(row, separators=(',', ':'), default=str) + '\n' for row in rows)
+        else:
+            df = rows
+            if self.output_format == 'csv':
+                df.to_csv(self.path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+            else:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if self._parquet is None:
+                    self._parquet = pq.ParquetWriter(self.path, table.schema)
+                self._parquet.write_table(table.cast(self._parquet.schema))
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        if self._parquet is not None:
+            self._parquet.close()
+        if not os.path.exists(self.path):
+            # No rows: still leave an (empty) output behind
+            open(self.path, 'w').close()
+
+
+class BatchRunner:
+    """
+    Score many input files concurrently and write predictions to output files.
+
+    Files are streamed through DemandPredictionClient.stream_predictions, so
+    memory does not grow with file size. Each finished file is recorded in a
+    manifest in the output directory; rerunning the same batch skips files
+    whose manifest entry matches the input's size and modification time.
+    Outputs are written under a temporary name and renamed when complete, so
+    an interrupted file is simply redone.
+    """
+
+    def __init__(self, client: DemandPredictionClient, output_dir: str, model: str = 'all',
+                 output_format: str = 'csv', jobs: int = 2, input_root: Optional[str] = None):
+        """
+        Args:
+            client: Client used for all requests; its request_callback is set to record latencies
+            output_dir: Directory for prediction files and the manifest
+            model: One of 'demand', 'demand-rise', 'top-product' or 'all'
+            output_format: One of 'csv', 'parquet' or 'ndjson'
+            jobs: Maximum number of files processed at once
+            input_root: Directory whose layout is mirrored in output_dir; defaults
+                to the deepest directory holding every input of a run
+
+        Raises:
+            ValueError: If the output format is unknown
+            ImportError: If Parquet output is requested without pyarrow
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}. Expected one of {', '.join(OUTPUT_FORMATS)}")
+        if output_format == 'parquet' and not pyarrow_available:
+            raise ImportError("pyarrow is required for Parquet output. Please install with 'pip install pyarrow'")
+        self.client = client
+        self.output_dir = output_dir
+        self.model = model
+        self.output_format = output_format
+        self.jobs = jobs
+        self.input_root = input_root
+        self._root = input_root
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self.client.request_callback = self._record_request
+
+    def _record_request(self, endpoint: str, rows: int, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _load_manifest(self) -> Dict:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        return {'files': {}}
+
+    def _save_manifest(self, manifest: Dict) -> None:
+        """Write the manifest atomically (caller holds the lock)."""
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def output_path(self, input_path: str) -> str:
+        """
+        Output file for an input file, e.g. out/march/sales.csv.all.csv for in/march/sales.csv
+
+        The input's path below the input root, extension included, names the
+        output, so same-named files in different directories or with
+        different extensions never share one. An input outside the root is
+        named after its file name and a hash of its full path.
+        """
+        absolute = os.path.abspath(input_path)
+        relative = os.path.relpath(absolute, os.path.abspath(self._root or os.path.dirname(absolute)))
+        if relative.startswith(os.pardir):
+            digest = hashlib.sha1(absolute.encode('utf-8')).hexdigest()[:8]
+            relative = f"{os.path.basename(absolute)}.{digest}"
+        return os.path.join(self.output_dir, f"{relative}.{self.model}{OUTPUT_FORMATS[self.output_format]}")
+
+    @staticmethod
+    def _fingerprint(input_path: str) -> Dict:
+        stat = os.stat(input_path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def _is_done(self, manifest: Dict, input_path: str) -> bool:
+        entry = manifest['files'].get(os.path.abspath(input_path))
+        return (entry is not None and entry.get('model') == self.model
+                and entry.get('format') == self.output_format
+                and {k: entry.get(k) for k in ('size', 'mtime')} == self._fingerprint(input_path)
+                and os.path.exists(entry.get('output', '')))
+
+    def _process_file(self, input_path: str) -> int:
+        """Score one file into its output file and return the number of rows written."""
+        output_path = self.output_path(input_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        tmp_path = f"{output_path}.part"
+        writer = _OutputWriter(tmp_path, self.output_format)
+        try:
+            if self.output_format == 'ndjson':
+                for result in self.client.stream_predictions(self.model, input_path):
+                    writer.write(_prediction_rows(result))
+            else:
+                # Tabular outputs take the columnar wire format straight into DataFrames
+                for result in self.client.stream_predictions(self.model, input_path, return_type='dataframe'):
+                    writer.write(_prediction_frame(result))
+        except Exception:
+            writer.close()
+            os.remove(tmp_path)
+            raise
+        writer.close()
+        os.replace(tmp_path, output_path)
+        return writer.rows
+
+    def run(self, input_files: List[str], progress: Optional[Callable[[str, int, Optional[Exception]], None]] = None) -> Dict:
+        """
+        Process input files with at most `jobs` files in flight.
+
+        Args:
+            input_files: Files to score
+            progress: Optional callable receiving (input_path, rows, error) as each file finishes
+
+        Returns:
+            Summary with file counts, rows, elapsed seconds, rows/sec,
+            request latency percentiles and the failed files with their errors
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.input_root is None and input_files:
+            self._root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in input_files])
+        manifest = self._load_manifest()
+        pending = [p for p in input_files if not self._is_done(manifest, p)]
+        skipped = len(input_files) - len(pending)
+        failures: Dict[str, str] = {}
+        rows_total = 0
+        start = time.perf_counter()
+
+        def handle(input_path: str) -> None:
+            nonlocal rows_total
+            fingerprint = self._fingerprint(input_path)
+            file_start = time.perf_counter()
+            try:
+                rows = self._process_file(input_path)
+            except Exception as e:
+                with self._lock:
+                    failures[input_path] = str(e)
+                if progress is not None:
+                    progress(input_path, 0, e)
+                return
+            with self._lock:
+                rows_total += rows
+                manifest['files'][os.path.abspath(input_path)] = {
+                    **fingerprint,
+                    'model': self.model,
+                    'format': self.output_format,
+                    'output': self.output_path(input_path),
+                    'rows': rows,
+                    'seconds': round(time.perf_counter() - file_start, 3),
+                    'completed_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+                }
+                self._save_manifest(manifest)
+            if progress is not None:
+                progress(input_path, rows, None)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            list(executor.map(handle, pending))
+
+        elapsed = time.perf_counter() - start
+        latencies = np.array(self._latencies) if self._latencies else None
+        return {
+            'files': len(input_files),
+            'processed': len(pending) - len(failures),
+            'skipped': skipped,
+            'failed': len(failures),
+            'rows': rows_total,
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(rows_total / elapsed, 1) if elapsed > 0 else 0.0,
+            'requests': len(self._latencies),
+            'p50_request_seconds': round(float(np.percentile(latencies, 50)), 4) if latencies is not None else None,
+            'p95_request_seconds': round(float(np.percentile(latencies, 95)), 4) if latencies is not None else None,
+            'failures': failures
+        }
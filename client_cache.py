@@ -0,0 +1,185 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Default location of the on-disk prediction cache
+DEFAULT_CACHE_DIR = os.environ.get('GROMO_CLIENT_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'gromo-client'))
+
+# Evict down to this fraction of max_bytes so evictions are not run on every insert
+EVICTION_LOW_WATERMARK = 0.9
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH = 500
+
+
+def _normalize_value(value: Any) -> Any:
+    """Normalize one field so equivalent inputs (1 vs 1.0, NaN vs None, padded strings) hash alike."""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if value.is_integer():
+            return int(value)
+    elif isinstance(value, str):
+        return value.strip()
+    elif hasattr(value, 'item'):
+        # NumPy scalars from DataFrame inputs
+        return _normalize_value(value.item())
+    return value
+
+
+def record_key(endpoint: str, model_version: str, record: Dict) -> str:
+    """
+    Hash a prediction input record for use as a cache key.
+
+    Args:
+        endpoint: API path the record is scored by, e.g. /predict/demand
+        model_version: Version of the models that produced the prediction
+        record: Input record
+
+    Returns:
+        Hex SHA-256 digest of the endpoint, model version and normalized record
+    """
+    normalized = {str(k): _normalize_value(v) for k, v in record.items()}
+    normalized = {k: v for k, v in normalized.items() if v is not None}
+    payload = json.dumps([endpoint, model_version, normalized], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PredictionCache:
+    """
+    Persistent, size-bounded cache of per-record predictions.
+
+    Entries live in a SQLite database in cache_dir, so they survive between
+    runs and can be shared by processes on the same machine. When the stored
+    predictions exceed max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Open (or create) the cache.
+
+        Args:
+            cache_dir: Directory holding the cache database
+            max_bytes: Maximum total size of the cached predictions, defaults to 512 MB
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'predictions.sqlite3')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    def close(self) -> None:
+        """Close the cache database."""
+        self._conn.close()
+
+    def _bump(self, name: str, amount: int) -> None:
+        """Add to a persistent counter (caller holds the lock and transaction)."""
+        if amount:
+            self._conn.execute(
+                'INSERT INTO counters (name, value) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+                (name, amount)
+            )
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Look up cached predictions.
+
+        Args:
+            keys: Cache keys from record_key
+
+        Returns:
+            Mapping of the keys found to their cached predictions
+        """
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock, self._conn:
+            for i in range(0, len(unique), _QUERY_BATCH):
+                batch = unique[i:i + _QUERY_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(f'SELECT key, value FROM entries WHERE key IN ({placeholders})', batch)
+                found.update((key, json.loads(value)) for key, value in rows)
+            now = time.time()
+            for i in range(0, len(found), _QUERY_BATCH):
+                batch = list(found)[i:i + _QUERY_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                self._conn.execute(f'UPDATE entries SET accessed = ? WHERE key IN ({placeholders})', [now] + batch)
+            hits = sum(1 for key in keys if key in found)
+            self._bump('hits', hits)
+            self._bump('misses', len(keys) - hits)
+        return found
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        """
+        Store predictions and evict the least recently used entries if over max_bytes.
+
+        Args:
+            items: Mapping of cache key to prediction
+        """
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            encoded = json.dumps(value, separators=(',', ':'), default=str)
+            rows.append((key, encoded, len(encoded), now))
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)', rows)
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(total - int(self.max_bytes * EVICTION_LOW_WATERMARK))
+
+    def _evict(self, excess: int) -> None:
+        """Delete least recently used entries totalling at least excess bytes (caller holds the lock)."""
+        freed, evicted, doomed = 0, 0, []
+        for key, size in self._conn.execute('SELECT key, size FROM entries ORDER BY accessed, rowid'):
+            doomed.append(key)
+            freed += size
+            if freed >= excess:
+                break
+        for i in range(0, len(doomed), _QUERY_BATCH):
+            batch = doomed[i:i + _QUERY_BATCH]
+            evicted += self._conn.execute(f'DELETE FROM entries WHERE key IN ({",".join("?" * len(batch))})', batch).rowcount
+        self._bump('evictions', evicted)
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM entries')
+            self._conn.execute('DELETE FROM counters')
+        self._conn.execute('VACUUM')
+
+    def stats(self) -> Dict:
+        """
+        Report the size and effectiveness of the cache.
+
+        Returns:
+            Entry count, stored bytes, limit, and lifetime hits, misses, hit ratio and evictions
+        """
+        with self._lock:
+            entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+            counters = dict(self._conn.execute('SELECT name, value FROM counters'))
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        return {
+            'path': self.path,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+            'evictions': counters.get('evictions', 0)
+        }
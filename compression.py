@@ -0,0 +1,75 @@
+# Transparent gzip for request and response bodies
+
+from flask import request
+from werkzeug.wsgi import LimitedStream
+import gzip
+import logging
+
+from request_timing import phase
+
+try:
+    from config import COMPRESS_RESPONSES, COMPRESSION_MIN_SIZE, COMPRESSION_LEVEL, MAX_DECOMPRESSED_REQUEST_SIZE
+except ImportError:
+    COMPRESS_RESPONSES = True
+    COMPRESSION_MIN_SIZE = 1024
+    COMPRESSION_LEVEL = 5
+    MAX_DECOMPRESSED_REQUEST_SIZE = 256 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+def _accepts_gzip(accept_encoding):
+    """Check whether an Accept-Encoding header allows gzip (q > 0)"""
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding.strip().lower() in ('gzip', '*'):
+            quality = params.strip()
+            return not (quality.startswith('q=') and float(quality[2:] or 0) == 0)
+    return False
+
+def decompress_request():
+    """
+    Swap a gzip-encoded request body for a stream that inflates it on read
+
+    The body is decompressed as the handler reads it, so a large upload is
+    never held in memory in compressed and uncompressed form at once. The
+    inflated size is capped at MAX_DECOMPRESSED_REQUEST_SIZE so a small
+    compressed body cannot expand without bound.
+    """
+    environ = request.environ
+    encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+    if encoding != 'gzip':
+        return None
+    raw = environ['wsgi.input']
+    content_length = environ.get('CONTENT_LENGTH')
+    if content_length and not environ.get('wsgi.input_terminated'):
+        raw = LimitedStream(raw, int(content_length))
+    environ['wsgi.input'] = LimitedStream(gzip.GzipFile(fileobj=raw, mode='rb'),
+                                          MAX_DECOMPRESSED_REQUEST_SIZE, is_max=True)
+    environ['wsgi.input_terminated'] = True
+    # The declared length is that of the compressed body
+    environ.pop('CONTENT_LENGTH', None)
+    environ.pop('HTTP_CONTENT_ENCODING', None)
+    return None
+
+def compress_response(response):
+    """Gzip a response body when the client accepts it and it is large enough to pay off"""
+    if not COMPRESS_RESPONSES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or not _accepts_gzip(request.headers.get('Accept-Encoding', ''))):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    with phase("compress"):
+        response.set_data(gzip.compress(data, compresslevel=COMPRESSION_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def init_compression(app):
+    """Register request decompression and response compression on a Flask app"""
+    app.before_request(decompress_request)
+    app.after_request(compress_response)
@@ -1,23 +1,128 @@
-# Flask application configuration
-import os
-
-# MongoDB configuration
-MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
-MONGO_DB = os.environ.get('MONGO_DB', 'gromo')
-
-# API configuration
-API_HOST = os.environ.get('API_HOST', '0.0.0.0')
-API_PORT = int(os.environ.get('API_PORT', 5000))
-DEBUG = os.environ.get('DEBUG', 'True') == 'True'
-
-# CORS settings
-CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
-
-# Security settings
-SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-
-# Maximum file upload size (in bytes)
-MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16 MB
-
-# Rate limiting
+# Flask application configuration
+import os
+
+# MongoDB configuration
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+MONGO_DB = os.environ.get('MONGO_DB', 'gromo')
+# Create the declared indexes (db_indexes.py) when the API starts; the first
+# start against a large unindexed sales_data collection will build them
+ENSURE_INDEXES_ON_STARTUP = os.environ.get('ENSURE_INDEXES_ON_STARTUP', 'True') == 'True'
+# How far behind the clock the region summary watermark stays (region_summary.py)
+SUMMARY_WATERMARK_LAG_SECONDS = float(os.environ.get('SUMMARY_WATERMARK_LAG_SECONDS', 5))
+
+# The API connects in the background and retries every MONGO_RECONNECT_SECONDS
+# until MongoDB answers; each attempt waits up to MONGO_SERVER_SELECTION_TIMEOUT_MS
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGO_RECONNECT_SECONDS = float(os.environ.get('MONGO_RECONNECT_SECONDS', 5))
+# MongoDB commands taking at least this long are logged (mongo_monitoring.py)
+MONGO_SLOW_MS = float(os.environ.get('MONGO_SLOW_MS', 100))
+
+# API configuration
+API_HOST = os.environ.get('API_HOST', '0.0.0.0')
+API_PORT = int(os.environ.get('API_PORT', 5000))
+# Development server only (python app.py); never enable in production
+DEBUG = os.environ.get('DEBUG', 'False') == 'True'
+
+# Production server (server.py): gunicorn with GUNICORN_WORKERS processes
+# (0 = one per CPU) of GUNICORN_WORKER_CLASS, each with GUNICORN_THREADS
+# threads for gthread. A worker silent for GUNICORN_TIMEOUT seconds is killed;
+# each is replaced after GUNICORN_MAX_REQUESTS requests (plus up to
+# GUNICORN_MAX_REQUESTS_JITTER, so they do not all restart at once; 0 = never).
+# With GUNICORN_PRELOAD the master imports the app, models and lookup tables
+# once before forking and the workers share those pages
+GUNICORN_BIND = os.environ.get('GUNICORN_BIND', f'{API_HOST}:{API_PORT}')
+GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', 0))
+GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+GUNICORN_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+GUNICORN_GRACEFUL_TIMEOUT = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+GUNICORN_KEEPALIVE = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+GUNICORN_MAX_REQUESTS = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+GUNICORN_MAX_REQUESTS_JITTER = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+GUNICORN_PRELOAD = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Import pandas, scikit-learn, Faker and pymongo when the app is imported
+# instead of on first use, so workers forked afterwards share them (server.py
+# does this itself when GUNICORN_PRELOAD is on)
+PRELOAD_IMPORTS = os.environ.get('PRELOAD_IMPORTS', 'False') == 'True'
+
+# Readiness (/ready): each worker scores a synthetic batch of WARMUP_ROWS rows
+# with every model before reporting ready; the live MongoDB ping gives up after
+# READINESS_DB_TIMEOUT_SECONDS
+WARMUP_ROWS = int(os.environ.get('WARMUP_ROWS', 200))
+READINESS_DB_TIMEOUT_SECONDS = float(os.environ.get('READINESS_DB_TIMEOUT_SECONDS', 1.0))
+
+# Model metadata (model_registry.py) is cached per worker; its version is
+# re-checked at most every MODEL_METADATA_CHECK_SECONDS and the documents are
+# re-read only when a new model version has been published
+MODEL_METADATA_CHECK_SECONDS = float(os.environ.get('MODEL_METADATA_CHECK_SECONDS', 30))
+
+# Circuit breakers (circuit_breaker.py): after CIRCUIT_FAILURE_THRESHOLD
+# failures in a row a model's requests go straight to its fallback, and every
+# CIRCUIT_PROBE_SECONDS a background probe scores CIRCUIT_PROBE_ROWS synthetic
+# rows with the model until it succeeds
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_PROBE_SECONDS = float(os.environ.get('CIRCUIT_PROBE_SECONDS', 10))
+CIRCUIT_PROBE_ROWS = int(os.environ.get('CIRCUIT_PROBE_ROWS', 20))
+
+# CORS settings
+CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
+
+# Security settings
+SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+
+# Maximum file upload size (in bytes)
+MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16 MB
+
+# Compression: gzip request bodies (Content-Encoding: gzip) are inflated on
+# read up to MAX_DECOMPRESSED_REQUEST_SIZE bytes; responses of at least
+# COMPRESSION_MIN_SIZE bytes are gzipped for clients sending Accept-Encoding: gzip
+COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 5))
+MAX_DECOMPRESSED_REQUEST_SIZE = int(os.environ.get('MAX_DECOMPRESSED_REQUEST_SIZE', 256 * 1024 * 1024))
+
+# Request timing: every response carries a Server-Timing header with the
+# duration of each phase (get_json, dataframe, preprocess, model, jsonify, ...);
+# TIMING_LOG_SAMPLE_RATE is the fraction of requests also logged as JSON
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'True') == 'True'
+TIMING_LOG_SAMPLE_RATE = float(os.environ.get('TIMING_LOG_SAMPLE_RATE', 0.0))
+
+# Request profiling: requests sending X-Profile-Token: <PROFILE_TOKEN> and a
+# PROFILE_SAMPLE_RATE fraction of all requests are profiled with cProfile into
+# PROFILE_DIR, keeping the newest PROFILE_MAX_FILES; leave PROFILE_TOKEN empty
+# to disable profiling on request and the /profiles endpoints
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 200))
+
+# Memory watchdog: every MEMORY_WATCHDOG_INTERVAL seconds (0 disables) each
+# worker records its RSS and cache sizes and, with MEMORY_TRACEMALLOC, logs the
+# allocations that grew since the last check. A worker whose RSS exceeds
+# MEMORY_RSS_LIMIT_MB (0 = no limit) reports unhealthy for MEMORY_DRAIN_SECONDS
+# so load balancers stop sending it traffic, then shuts down gracefully. Only
+# gunicorn workers (server.py) are recycled; other processes just report it
+MEMORY_WATCHDOG_INTERVAL = float(os.environ.get('MEMORY_WATCHDOG_INTERVAL', 60))
+MEMORY_RSS_LIMIT_MB = int(os.environ.get('MEMORY_RSS_LIMIT_MB', 0))
+MEMORY_DRAIN_SECONDS = float(os.environ.get('MEMORY_DRAIN_SECONDS', 10))
+MEMORY_TRACEMALLOC = os.environ.get('MEMORY_TRACEMALLOC', 'False') == 'True'
+MEMORY_TRACEMALLOC_TOP = int(os.environ.get('MEMORY_TRACEMALLOC_TOP', 10))
+# Pincode coordinate table (pincode_table.py), memory-mapped by every worker
+PINCODE_TABLE_PATH = os.environ.get('PINCODE_TABLE_PATH', 'pincode_coordinates.npy')
+# Coordinates of pincodes missing from that table, cached by model.assign_coordinates; the oldest are dropped beyond this
+COORDINATE_CACHE_MAX_ENTRIES = int(os.environ.get('COORDINATE_CACHE_MAX_ENTRIES', 500000))
+
+# Upload parsing: Excel (and any other UPLOAD_POOL_FORMATS) is parsed in a
+# process pool of UPLOAD_PARSE_WORKERS processes, which stream back chunks of
+# UPLOAD_PARSE_CHUNK_ROWS rows; a parse fails if no chunk arrives within
+# UPLOAD_PARSE_TIMEOUT seconds. Uploads beyond UPLOAD_PARSE_MAX_PENDING queued
+# files are rejected with 503
+UPLOAD_PARSE_WORKERS = int(os.environ.get('UPLOAD_PARSE_WORKERS', 2))
+UPLOAD_PARSE_MAX_PENDING = int(os.environ.get('UPLOAD_PARSE_MAX_PENDING', 8))
+UPLOAD_PARSE_CHUNK_ROWS = int(os.environ.get('UPLOAD_PARSE_CHUNK_ROWS', 5000))
+UPLOAD_PARSE_TIMEOUT = float(os.environ.get('UPLOAD_PARSE_TIMEOUT', 120))
+UPLOAD_POOL_FORMATS = tuple(os.environ.get('UPLOAD_POOL_FORMATS', '.xls,.xlsx').split(','))
+
+# Rate limiting
 RATE_LIMIT = os.environ.get('RATE_LIMIT', '100 per minute')
\ No newline at end of file
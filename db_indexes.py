@@ -0,0 +1,143 @@
+# Declared MongoDB indexes and query-plan verification for the API collections
+
+from pymongo import MongoClient, ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+import argparse
+import datetime
+import logging
+import sys
+
+try:
+    from config import MONGO_URI, MONGO_DB
+except ImportError:
+    MONGO_URI = "mongodb://localhost:27017/"
+    MONGO_DB = "gromo"
+
+logger = logging.getLogger(__name__)
+
+# Every index the application relies on, keyed by collection. Names are fixed
+# so that re-applying the set is a no-op on the server.
+INDEXES = {
+    "sales_data": [
+        IndexModel([("pincode", ASCENDING), ("product", ASCENDING),
+                    ("channel", ASCENDING), ("date", ASCENDING)],
+                   name="pincode_product_channel_date"),
+        IndexModel([("date", ASCENDING)], name="date"),
+        IndexModel([("inserted_at", ASCENDING)], name="inserted_at"),
+    ],
+    "demand_prediction": [
+        IndexModel([("region_id", ASCENDING)], name="region_id", unique=True),
+    ],
+    "sales_cube": [
+        IndexModel([("pincode", ASCENDING), ("product", ASCENDING),
+                    ("channel", ASCENDING), ("day", ASCENDING)],
+                   name="pincode_product_channel_day", unique=True),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+}
+
+# Query shapes issued by the API and the batch jobs. Each entry is
+# (name, collection, filter); the filters use representative values.
+_now = datetime.datetime.now()
+QUERY_SHAPES = [
+    ("get_region", "demand_prediction", {"region_id": 1}),
+    ("sales_by_pincode", "sales_data", {"pincode": "400001"}),
+    ("sales_by_pincode_product_channel", "sales_data",
+     {"pincode": "400001", "product": "loan", "channel": "online"}),
+    ("sales_by_pincode_date_range", "sales_data",
+     {"pincode": "400001", "product": "loan", "channel": "online",
+      "date": {"$gte": _now - datetime.timedelta(days=30), "$lt": _now}}),
+    ("sales_by_date_range", "sales_data",
+     {"date": {"$gte": _now - datetime.timedelta(days=30), "$lt": _now}}),
+    ("sales_since_watermark", "sales_data", {"inserted_at": {"$gt": _now - datetime.timedelta(hours=1)}}),
+    ("cube_by_pincodes", "sales_cube", {"pincode": {"$in": ["400001", "400002"]}}),
+    ("cube_since_watermark", "sales_cube", {"updated_at": {"$gt": _now - datetime.timedelta(hours=1)}}),
+]
+
+def ensure_indexes(db):
+    """
+    Create the declared indexes, skipping any that already exist
+
+    Parameters:
+    -----------
+    db : pymongo Database
+        Database to apply the index set to
+
+    Returns:
+    --------
+    created : dict
+        Mapping of collection name to the index names reported by the server
+    """
+    created = {}
+    for collection_name, indexes in INDEXES.items():
+        try:
+            created[collection_name] = db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            # An equivalent index under another name, or a unique index over
+            # duplicate data; leave the existing state alone and report it
+            logger.warning(f"Could not apply indexes on {collection_name}: {e}")
+            created[collection_name] = []
+    return created
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree"""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+def check_query_plans(db, shapes=QUERY_SHAPES):
+    """
+    Run explain on each query shape and flag the ones that scan a collection
+
+    Returns:
+    --------
+    results : list of dict
+        One entry per shape with name, collection, winning stages and a
+        collscan flag
+    """
+    results = []
+    for name, collection_name, query in shapes:
+        explain = db.command("explain", {"find": collection_name, "filter": query},
+                             verbosity="queryPlanner")
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = list(_plan_stages(winning_plan))
+        results.append({
+            "name": name,
+            "collection": collection_name,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return results
+
+def main():
+    """Apply the index set or verify query plans from the command line"""
+    parser = argparse.ArgumentParser(description='Manage MongoDB indexes for the Demand Prediction API')
+    parser.add_argument('action', choices=['apply', 'check'],
+                        help='apply: create declared indexes; check: explain each query shape')
+    parser.add_argument('--mongo-uri', default=MONGO_URI, help='MongoDB connection URI')
+    parser.add_argument('--db', default=MONGO_DB, help='MongoDB database name')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri)[args.db]
+
+    if args.action == 'apply':
+        for collection_name, names in ensure_indexes(db).items():
+            print(f"{collection_name}: {', '.join(names) if names else 'not applied'}")
+        return 0
+
+    results = check_query_plans(db)
+    for result in results:
+        marker = "❌ COLLSCAN" if result["collscan"] else "✅"
+        print(f"{marker} {result['name']} ({result['collection']}): {' -> '.join(result['stages'])}")
+    collscans = [r for r in results if r["collscan"]]
+    print(f"\n{len(results) - len(collscans)}/{len(results)} query shapes use an index")
+    return 1 if collscans else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+# Memory accounting for long-running workers: RSS, cache sizes, allocation
+# growth between tracemalloc snapshots, and recycling past an RSS ceiling
+
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+from metrics import record_memory
+
+try:
+    from config import (
+        MEMORY_WATCHDOG_INTERVAL, MEMORY_RSS_LIMIT_MB, MEMORY_DRAIN_SECONDS,
+        MEMORY_TRACEMALLOC, MEMORY_TRACEMALLOC_TOP
+    )
+except ImportError:
+    MEMORY_WATCHDOG_INTERVAL = 60.0
+    MEMORY_RSS_LIMIT_MB = 0
+    MEMORY_DRAIN_SECONDS = 10.0
+    MEMORY_TRACEMALLOC = False
+    MEMORY_TRACEMALLOC_TOP = 10
+
+logger = logging.getLogger(__name__)
+
+# name -> callable returning the number of entries in an in-process cache
+_caches = {}
+
+_lock = threading.Lock()
+_started_pid = None
+# Set in a worker started by a process manager (gunicorn) that replaces it when it exits
+_managed_pid = None
+_previous_snapshot = None
+_state = {
+    "checks": 0,
+    "rss_bytes": None,
+    "peak_rss_bytes": None,
+    "top_growth": [],
+    "draining": False,
+    "over_limit": False
+}
+
+def register_cache(name, size):
+    """Report the size of an in-process cache; size() returns its number of entries"""
+    _caches[name] = size
+
+def rss_bytes():
+    """Current resident set size of this process, or None if it cannot be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+def process_memory(pid='self'):
+    """
+    RSS, PSS, USS and shared bytes of a process from /proc/<pid>/smaps_rollup, or None
+
+    USS (private pages) is what the process alone costs; PSS splits each
+    shared page between the processes mapping it. Pages a gunicorn --preload
+    master wrote before forking stay shared with its workers until written.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return {
+        "rss": fields.get('Rss', 0),
+        "pss": fields.get('Pss', 0),
+        "uss": fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        "shared": fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    }
+
+def cache_sizes():
+    """Number of entries in each registered cache"""
+    sizes = {}
+    for name, size in list(_caches.items()):
+        try:
+            sizes[name] = size()
+        except Exception as e:
+            logger.error(f"Error measuring cache {name}: {e}")
+    return sizes
+
+def mark_managed():
+    """
+    Allow this process to recycle itself past the RSS ceiling
+
+    Called in each gunicorn worker after the fork; the master starts a
+    replacement when the worker exits. A process nothing would restart,
+    such as `python app.py`, only reports that it is over the ceiling.
+    """
+    global _managed_pid
+    _managed_pid = os.getpid()
+
+def is_managed():
+    """True in a worker that mark_managed() was called in"""
+    return _managed_pid == os.getpid()
+
+def is_draining():
+    """True once the worker has crossed the RSS ceiling and is shutting down"""
+    return _state["draining"]
+
+def memory_status():
+    """'ok', 'draining' (over the RSS ceiling, recycling soon) or 'over_limit' (over it, not recyclable)"""
+    if _state["draining"]:
+        return "draining"
+    return "over_limit" if _state["over_limit"] else "ok"
+
+def _allocation_growth():
+    """Diff a new tracemalloc snapshot against the previous one and return the top growing lines"""
+    global _previous_snapshot
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    previous, _previous_snapshot = _previous_snapshot, snapshot
+    if previous is None:
+        return []
+    growth = [stat for stat in snapshot.compare_to(previous, 'lineno') if stat.size_diff > 0]
+    return [{
+        "location": str(stat.traceback[0]),
+        "size_diff_bytes": stat.size_diff,
+        "size_bytes": stat.size,
+        "count_diff": stat.count_diff
+    } for stat in growth[:MEMORY_TRACEMALLOC_TOP]]
+
+def check_memory():
+    """Take one measurement; start draining the worker if it is over the RSS ceiling and managed"""
+    rss = rss_bytes()
+    sizes = cache_sizes()
+    growth = _allocation_growth() if tracemalloc.is_tracing() else []
+    over_limit = bool(MEMORY_RSS_LIMIT_MB) and rss is not None and rss > MEMORY_RSS_LIMIT_MB * 1024 * 1024
+    with _lock:
+        _state["checks"] += 1
+        _state["rss_bytes"] = rss
+        if rss is not None:
+            _state["peak_rss_bytes"] = max(rss, _state["peak_rss_bytes"] or 0)
+        _state["top_growth"] = growth
+        managed = is_managed()
+        start_draining = managed and over_limit and not _state["draining"]
+        if start_draining:
+            _state["draining"] = True
+        newly_over_limit = not managed and over_limit and not _state["over_limit"]
+        if not managed:
+            _state["over_limit"] = over_limit
+    record_memory(rss, sizes)
+    for entry in growth[:3]:
+        logger.info(f"Allocation growth: +{entry['size_diff_bytes'] / 1024:.1f} KiB at {entry['location']}")
+    if start_draining:
+        logger.warning(f"Worker {os.getpid()} RSS {rss / 2 ** 20:.0f} MB is over the {MEMORY_RSS_LIMIT_MB} MB ceiling; "
+                       f"draining for {MEMORY_DRAIN_SECONDS:.0f}s, then recycling. Cache sizes: {sizes}")
+        threading.Timer(MEMORY_DRAIN_SECONDS, _recycle).start()
+    elif newly_over_limit:
+        logger.error(f"Process {os.getpid()} RSS {rss / 2 ** 20:.0f} MB is over the {MEMORY_RSS_LIMIT_MB} MB ceiling; "
+                     f"reporting unhealthy but not recycling, since no process manager would restart it "
+                     f"(run under server.py). Cache sizes: {sizes}")
+
+def _recycle():
+    """
+    Ask this worker to shut down gracefully
+
+    gunicorn workers finish their in-flight requests on SIGTERM and the
+    master starts a replacement. Only reached in workers marked as managed.
+    """
+    logger.warning(f"Recycling worker {os.getpid()}")
+    os.kill(os.getpid(), signal.SIGTERM)
+
+def _watch():
+    while True:
+        time.sleep(MEMORY_WATCHDOG_INTERVAL)
+        try:
+            check_memory()
+        except Exception as e:
+            logger.error(f"Error in memory watchdog: {e}")
+
+def ensure_watchdog():
+    """
+    Start the watchdog thread in this process if it is not running yet
+
+    Called on every request rather than at import, so that each forked
+    worker (e.g. under gunicorn --preload) gets its own thread.
+    """
+    global _started_pid, _previous_snapshot
+    if _started_pid == os.getpid() or MEMORY_WATCHDOG_INTERVAL <= 0:
+        return None
+    with _lock:
+        if _started_pid == os.getpid():
+            return None
+        _started_pid = os.getpid()
+        _previous_snapshot = None
+        _state["draining"] = False
+        _state["over_limit"] = False
+    if MEMORY_TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    threading.Thread(target=_watch, name="memory-watchdog", daemon=True).start()
+    return None
+
+def memory_report():
+    """Current RSS (and PSS / USS where available), cache sizes and the allocation growth seen at the last check"""
+    rss = rss_bytes()
+    with _lock:
+        report = {
+            "pid": os.getpid(),
+            "rss_mb": round(rss / 2 ** 20, 1) if rss is not None else None,
+            "peak_rss_mb": round(_state["peak_rss_bytes"] / 2 ** 20, 1) if _state["peak_rss_bytes"] else None,
+            "rss_limit_mb": MEMORY_RSS_LIMIT_MB or None,
+            "draining": _state["draining"],
+            "over_limit": _state["over_limit"],
+            "recyclable": is_managed(),
+            "checks": _state["checks"],
+            "tracemalloc": tracemalloc.is_tracing(),
+            "top_growth": list(_state["top_growth"])
+        }
+    usage = process_memory()
+    if usage is not None:
+        report["pss_mb"] = round(usage["pss"] / 2 ** 20, 1)
+        report["uss_mb"] = round(usage["uss"] / 2 ** 20, 1)
+        report["shared_mb"] = round(usage["shared"] / 2 ** 20, 1)
+    report["caches"] = cache_sizes()
+    return report
+
+def init_memory_watchdog(app):
+    """Start a memory watchdog in each worker process serving a Flask app"""
+    app.before_request(ensure_watchdog)
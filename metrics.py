@@ -0,0 +1,135 @@
+# Prometheus metrics for the API, aggregated across gunicorn worker processes
+
+from flask import request, g
+import logging
+import os
+import time
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+    )
+    from prometheus_client import multiprocess
+    prometheus_available = True
+except ImportError:
+    prometheus_available = False
+
+logger = logging.getLogger(__name__)
+
+# With several gunicorn workers each process writes its samples to
+# memory-mapped files in this directory and /metrics merges them; it must be
+# set before the workers start and emptied whenever the server is restarted
+MULTIPROCESS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+# Latency buckets in seconds; predictions on large batches take seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+if prometheus_available:
+    REQUESTS = Counter('gromo_http_requests_total', 'HTTP requests handled',
+                       ['method', 'route', 'status'])
+    REQUEST_LATENCY = Histogram('gromo_http_request_duration_seconds', 'HTTP request latency',
+                                ['method', 'route'], buckets=REQUEST_BUCKETS)
+    ROWS_SCORED = Counter('gromo_prediction_rows_total', 'Rows scored by the prediction models', ['model'])
+    FALLBACKS = Counter('gromo_prediction_fallbacks_total',
+                        'Prediction requests served by the simple fallback instead of the model', ['model'])
+    MONGO_LATENCY = Histogram('gromo_mongo_command_duration_seconds', 'MongoDB command latency',
+                              ['command', 'collection', 'outcome'], buckets=MONGO_BUCKETS)
+    CACHE_LOOKUPS = Counter('gromo_cache_lookups_total', 'In-process cache lookups; hit ratio = hit / (hit + miss)',
+                            ['cache', 'result'])
+    # Per-worker gauges; in multiprocess mode each live worker is its own series (pid label)
+    WORKER_RSS = Gauge('gromo_worker_rss_bytes', 'Resident memory of the worker process',
+                       multiprocess_mode='liveall')
+    CACHE_ENTRIES = Gauge('gromo_cache_entries', 'Entries held in an in-process cache', ['cache'],
+                          multiprocess_mode='liveall')
+    # 1 while the model's circuit breaker is open in any live worker
+    CIRCUIT_OPEN = Gauge('gromo_circuit_breaker_open', 'Whether the model circuit breaker is open', ['model'],
+                         multiprocess_mode='livemax')
+    CIRCUIT_TRIPS = Counter('gromo_circuit_breaker_trips_total', 'Times the model circuit breaker opened', ['model'])
+
+# Labelled children by label values. prometheus_client takes a lock on every
+# .labels() call; a plain dict lookup avoids that on the hot path, and a race
+# on first use only creates the same child twice.
+_children = {}
+
+def _child(metric, *labels):
+    key = (metric, labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+def record_prediction(model, rows, fallback=False):
+    """Count rows scored by a model, and whether the fallback produced them"""
+    if not prometheus_available:
+        return
+    _child(ROWS_SCORED, model).inc(rows)
+    if fallback:
+        _child(FALLBACKS, model).inc()
+
+def record_cache(cache, hits, misses):
+    """Count hits and misses of an in-process cache"""
+    if not prometheus_available:
+        return
+    if hits:
+        _child(CACHE_LOOKUPS, cache, 'hit').inc(hits)
+    if misses:
+        _child(CACHE_LOOKUPS, cache, 'miss').inc(misses)
+
+def record_memory(rss, cache_sizes):
+    """Set the worker's resident memory and the entry count of each in-process cache"""
+    if not prometheus_available:
+        return
+    if rss is not None:
+        WORKER_RSS.set(rss)
+    for cache, entries in cache_sizes.items():
+        _child(CACHE_ENTRIES, cache).set(entries)
+
+def record_circuit_state(model, is_open, tripped=False):
+    """Set whether a model's circuit breaker is open, counting a trip when it just opened"""
+    if not prometheus_available:
+        return
+    _child(CIRCUIT_OPEN, model).set(1 if is_open else 0)
+    if tripped:
+        _child(CIRCUIT_TRIPS, model).inc()
+
+def record_mongo_command(command, collection, seconds, succeeded=True):
+    """Observe the latency of one MongoDB command (see mongo_monitoring.py)"""
+    if not prometheus_available:
+        return
+    _child(MONGO_LATENCY, command, collection, 'success' if succeeded else 'failure').observe(seconds)
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+
+def _finish_request(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        # The rule, not the path, so /regions/<region_id> is one series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        _child(REQUEST_LATENCY, request.method, route).observe(time.perf_counter() - start)
+        _child(REQUESTS, request.method, route, str(response.status_code)).inc()
+    return response
+
+def metrics_response():
+    """Return (body, content type) of the Prometheus text exposition of all metrics"""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_worker_dead(pid):
+    """Drop a dead worker's live-only samples; call from gunicorn's child_exit hook"""
+    if prometheus_available and MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(pid)
+
+def init_metrics(app):
+    """Record request metrics for a Flask app"""
+    if not prometheus_available:
+        logger.warning("prometheus_client not available; /metrics is disabled. "
+                       "Please install with 'pip install prometheus-client'")
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
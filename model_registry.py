@@ -0,0 +1,118 @@
+# In-process registry of model metadata (model_details, model_evaluation),
+# loaded once per model version and shared by the routes and the predictions
+
+import datetime
+import logging
+import threading
+import time
+
+try:
+    from config import MODEL_METADATA_CHECK_SECONDS
+except ImportError:
+    MODEL_METADATA_CHECK_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+
+# Served while no metadata has been loaded (no database, or no model published)
+DEFAULT_PRODUCT_CLASSES = ["loan", "credit_card", "insurance"]
+DEFAULT_TRAINED_AT = "2023-10-01"
+
+_lock = threading.Lock()
+_metadata = None
+_checked_at = 0.0
+
+def _timestamp(value):
+    """ISO string of a stored date, which is a datetime or already a string"""
+    return value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value
+
+def model_version(db):
+    """
+    Identify the published models without reading their full documents
+
+    A model version changes when a model_details document is added, removed
+    or retrained (training_date) or a new evaluation is stored (timestamp).
+    """
+    details = db["model_details"].find({}, {"_id": 0, "model_type": 1, "training_date": 1})
+    evaluation = db["model_evaluation"].find_one({}, {"_id": 0, "timestamp": 1}) or {}
+    models = sorted((str(doc.get("model_type")), str(_timestamp(doc.get("training_date")))) for doc in details)
+    return tuple(models), str(_timestamp(evaluation.get("timestamp")))
+
+def _product_classes(models):
+    """Product of each class index of the top product classifier"""
+    details = models.get("multi_class_classification") or {}
+    product_mapping = details.get("metrics", {}).get("product_mapping")
+    if product_mapping:
+        try:
+            return [product_mapping[str(i)] for i in range(len(product_mapping))]
+        except KeyError:
+            logger.error(f"Incomplete product mapping in model_details: {product_mapping}")
+    return list(DEFAULT_PRODUCT_CLASSES)
+
+def _load(db, version):
+    model_details = list(db["model_details"].find({}, {"_id": 0}))
+    evaluation = db["model_evaluation"].find_one({}, {"_id": 0})
+    models = {doc.get("model_type"): doc for doc in model_details}
+    trained_at = (evaluation or {}).get("timestamp")
+    if trained_at is None:
+        trained_at = max((_timestamp(doc["training_date"]) for doc in model_details if doc.get("training_date")),
+                         default=DEFAULT_TRAINED_AT)
+    return {
+        "version": version,
+        "model_details": model_details,
+        "evaluation": evaluation,
+        "models": models,
+        "hyperparameters": {model_type: doc.get("hyperparameters", {}) for model_type, doc in models.items()},
+        "metrics": {model_type: doc.get("metrics", {}) for model_type, doc in models.items()},
+        "product_classes": _product_classes(models),
+        "trained_at": _timestamp(trained_at),
+        "loaded_at": datetime.datetime.now().isoformat()
+    }
+
+def get_metadata(db, force=False):
+    """
+    Metadata of the published models, or None if it has never been loaded
+
+    The version is checked at most every MODEL_METADATA_CHECK_SECONDS and the
+    documents are re-read only when it changed. If MongoDB is unavailable the
+    last loaded metadata keeps being served.
+    """
+    global _metadata, _checked_at
+    now = time.monotonic()
+    if db is None or (not force and now - _checked_at < MODEL_METADATA_CHECK_SECONDS):
+        return _metadata
+    with _lock:
+        if not force and now - _checked_at < MODEL_METADATA_CHECK_SECONDS:
+            return _metadata
+        try:
+            version = model_version(db)
+            if _metadata is None or _metadata["version"] != version:
+                _metadata = _load(db, version)
+                logger.info(f"Loaded model metadata for {len(_metadata['models'])} models "
+                            f"(trained {_metadata['trained_at']})")
+        except Exception as e:
+            logger.error(f"Error loading model metadata: {e}")
+        _checked_at = now
+    return _metadata
+
+def product_classes(db):
+    """Product names by class index of the top product model"""
+    metadata = get_metadata(db)
+    return metadata["product_classes"] if metadata is not None else list(DEFAULT_PRODUCT_CLASSES)
+
+def trained_at(db):
+    """When the published models were last trained or evaluated"""
+    metadata = get_metadata(db)
+    return metadata["trained_at"] if metadata is not None else DEFAULT_TRAINED_AT
+
+def registry_info():
+    """Version and load time of the cached metadata, for /stats"""
+    metadata = _metadata
+    if metadata is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "models": sorted(str(model_type) for model_type in metadata["models"]),
+        "trained_at": metadata["trained_at"],
+        "loaded_at": metadata["loaded_at"],
+        "check_seconds": MODEL_METADATA_CHECK_SECONDS
+    }
@@ -0,0 +1,126 @@
+# MongoDB command monitoring: per-command latency, collection and document
+# counts, a slow-operation log, and running totals per collection and operation
+
+from pymongo import monitoring
+import logging
+import threading
+
+from metrics import record_mongo_command
+from request_timing import add_phase
+
+try:
+    from config import MONGO_SLOW_MS
+except ImportError:
+    MONGO_SLOW_MS = 100.0
+
+logger = logging.getLogger(__name__)
+
+# Reply fields holding the documents a command returned
+_CURSOR_BATCHES = ('firstBatch', 'nextBatch')
+
+def _collection(command_name, command):
+    """Collection a command targets, or '' for database and admin commands"""
+    if command_name == 'getMore':
+        return command.get('collection', '')
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ''
+
+def _documents(reply):
+    """Number of documents a command returned or affected, or None if it does not apply"""
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        for batch in _CURSOR_BATCHES:
+            if batch in cursor:
+                return len(cursor[batch])
+    if 'n' in reply:
+        # count, update and delete report matched / affected documents
+        return reply['n']
+    return None
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    Record every MongoDB command a client in this process runs
+
+    Each command's latency goes to the Prometheus histogram and to the
+    current request's "mongo" Server-Timing phase. Commands slower than
+    MONGO_SLOW_MS are logged. Events are published on the thread that ran
+    the command, so started/succeeded pairs are matched by request id.
+    """
+
+    def __init__(self, slow_ms=MONGO_SLOW_MS):
+        self.slow_ms = slow_ms
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def started(self, event):
+        # Inserts count the documents sent; other commands count those in the reply
+        self._pending[(event.connection_id, event.request_id)] = (
+            _collection(event.command_name, event.command),
+            len(event.command.get('documents', ())) if event.command_name == 'insert' else None
+        )
+
+    def succeeded(self, event):
+        collection, sent = self._pending.pop((event.connection_id, event.request_id), ('', None))
+        documents = sent if sent is not None else _documents(event.reply)
+        self._record(event, collection, documents, True)
+
+    def failed(self, event):
+        collection, sent = self._pending.pop((event.connection_id, event.request_id), ('', None))
+        self._record(event, collection, sent, False)
+
+    def _record(self, event, collection, documents, succeeded):
+        seconds = event.duration_micros / 1e6
+        record_mongo_command(event.command_name, collection, seconds, succeeded)
+        add_phase("mongo", seconds)
+        key = (collection, event.command_name)
+        with self._lock:
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = {"calls": 0, "failures": 0, "seconds": 0.0, "max_seconds": 0.0, "documents": 0}
+            totals["calls"] += 1
+            totals["failures"] += 0 if succeeded else 1
+            totals["seconds"] += seconds
+            totals["max_seconds"] = max(totals["max_seconds"], seconds)
+            totals["documents"] += documents or 0
+        if seconds * 1000 >= self.slow_ms:
+            outcome = "" if succeeded else f" (failed: {event.failure})"
+            logger.warning(
+                f"Slow MongoDB {event.command_name} on {event.database_name}.{collection or '-'}: "
+                f"{seconds * 1000:.1f} ms, {documents if documents is not None else '-'} documents{outcome}"
+            )
+
+    def summary(self):
+        """Calls, failures, total and max seconds and documents per collection and operation"""
+        with self._lock:
+            items = sorted(self._totals.items(), key=lambda item: item[1]["seconds"], reverse=True)
+            return [{
+                "collection": collection or None,
+                "operation": operation,
+                "calls": totals["calls"],
+                "failures": totals["failures"],
+                "total_ms": round(totals["seconds"] * 1000, 2),
+                "avg_ms": round(totals["seconds"] * 1000 / totals["calls"], 3),
+                "max_ms": round(totals["max_seconds"] * 1000, 2),
+                "documents": totals["documents"]
+            } for (collection, operation), totals in items]
+
+# The process-wide monitor, once registered
+command_monitor = None
+
+def register_command_monitor():
+    """
+    Monitor all MongoClients created from now on in this process
+
+    pymongo applies globally registered listeners to clients created after
+    registration, so call this before connecting. Calling it again is a no-op.
+    """
+    global command_monitor
+    if command_monitor is None:
+        command_monitor = CommandMonitor()
+        monitoring.register(command_monitor)
+    return command_monitor
+
+def command_summary():
+    """Per collection and operation totals, or [] if monitoring is not registered"""
+    return command_monitor.summary() if command_monitor is not None else []
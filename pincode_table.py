@@ -0,0 +1,165 @@
+# Pincode coordinate lookup table, stored as a sorted .npy array and memory-mapped
+# read-only, so every gunicorn worker reads the same pages of the OS page cache
+# instead of building its own copy
+#
+# Usage:
+#   python pincode_table.py build                 # from the distinct pincodes in sales_data
+#   python pincode_table.py build --pincodes 5000 # from set_up_db.py's generated pincodes
+#   python pincode_table.py show
+
+import argparse
+import logging
+import os
+import threading
+
+import numpy as np
+
+try:
+    from config import PINCODE_TABLE_PATH
+except ImportError:
+    PINCODE_TABLE_PATH = 'pincode_coordinates.npy'
+
+logger = logging.getLogger(__name__)
+
+# One record per pincode, sorted by pincode for np.searchsorted
+TABLE_DTYPE = np.dtype([('pincode', 'U10'), ('latitude', 'f8'), ('longitude', 'f8')])
+
+# Latitude and longitude ranges of India, as in model.assign_coordinates
+LATITUDE_RANGE = (8.0, 37.0)
+LONGITUDE_RANGE = (68.0, 97.0)
+
+_table = None
+_table_path = None
+_lock = threading.Lock()
+
+def build_pincode_table(pincodes, path=PINCODE_TABLE_PATH, seed=None):
+    """
+    Write a coordinate table for `pincodes` to `path` and return its size
+
+    Coordinates are drawn uniformly within India from a seeded generator. The
+    file is written next to `path` and renamed over it, so processes that
+    have the old table mapped keep reading a complete file.
+    """
+    unique = sorted({str(pincode) for pincode in pincodes})
+    rng = np.random.default_rng(seed)
+    table = np.empty(len(unique), dtype=TABLE_DTYPE)
+    table['pincode'] = unique
+    table['latitude'] = rng.uniform(*LATITUDE_RANGE, len(unique))
+    table['longitude'] = rng.uniform(*LONGITUDE_RANGE, len(unique))
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, table)
+    os.replace(tmp_path, path)
+    return len(table)
+
+def load_pincode_table(path=PINCODE_TABLE_PATH):
+    """
+    Memory-map the coordinate table, or return None if there is none
+
+    The mapping is made once per process. Loaded in a gunicorn master started
+    with --preload, it is inherited by every worker.
+    """
+    global _table, _table_path
+    if _table is not None and _table_path == path:
+        return _table
+    with _lock:
+        if _table is None or _table_path != path:
+            if not os.path.isfile(path):
+                return None
+            try:
+                table = np.load(path, mmap_mode='r')
+            except (OSError, ValueError) as e:
+                logger.error(f"Error loading pincode table {path}: {e}")
+                return None
+            if table.dtype != TABLE_DTYPE:
+                logger.error(f"Pincode table {path} has dtype {table.dtype}, expected {TABLE_DTYPE}")
+                return None
+            _table, _table_path = table, path
+            logger.info(f"Mapped pincode table {path} ({len(table)} pincodes)")
+    return _table
+
+def lookup_coordinates(pincodes):
+    """Map each of `pincodes` found in the table to its (latitude, longitude)"""
+    table = load_pincode_table()
+    if table is None or len(table) == 0 or not pincodes:
+        return {}
+    keys = np.asarray([str(pincode) for pincode in pincodes], dtype=TABLE_DTYPE['pincode'])
+    index = np.minimum(np.searchsorted(table['pincode'], keys), len(table) - 1)
+    found = np.flatnonzero(table['pincode'][index] == keys)
+    latitudes = table['latitude'][index[found]]
+    longitudes = table['longitude'][index[found]]
+    return {pincodes[i]: (float(lat), float(lon)) for i, lat, lon in zip(found, latitudes, longitudes)}
+
+def region_centroids(regions):
+    """
+    Mean coordinates of each region's pincodes found in the table
+
+    `regions` maps region id to its pincodes; regions with none of their
+    pincodes in the table are left out.
+    """
+    centroids = {}
+    for region_id, pincodes in regions.items():
+        coordinates = list(lookup_coordinates(list(pincodes)).values())
+        if coordinates:
+            latitudes, longitudes = zip(*coordinates)
+            centroids[region_id] = (sum(latitudes) / len(latitudes), sum(longitudes) / len(longitudes))
+    return centroids
+
+def table_info():
+    """Path and size of the mapped table, for /stats"""
+    table = load_pincode_table()
+    return {
+        "path": PINCODE_TABLE_PATH,
+        "loaded": table is not None,
+        "pincodes": len(table) if table is not None else 0,
+        "bytes": table.nbytes if table is not None else 0
+    }
+
+def distinct_pincodes(mongo_uri, mongo_db):
+    """Distinct pincodes in the sales_data collection"""
+    from pymongo import MongoClient
+    client = MongoClient(mongo_uri)
+    try:
+        return client[mongo_db]["sales_data"].distinct("pincode")
+    finally:
+        client.close()
+
+def main():
+    try:
+        from config import MONGO_URI, MONGO_DB
+    except ImportError:
+        MONGO_URI = "mongodb://localhost:27017/"
+        MONGO_DB = "gromo"
+
+    parser = argparse.ArgumentParser(description='Build or inspect the memory-mapped pincode coordinate table')
+    parser.add_argument('command', choices=['build', 'show'])
+    parser.add_argument('--path', default=PINCODE_TABLE_PATH, help='Table file')
+    parser.add_argument('--pincodes', type=int, default=None,
+                        help="Use set_up_db.py's first N generated pincodes instead of sales_data")
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible coordinates')
+    parser.add_argument('--mongo-uri', default=MONGO_URI, help='MongoDB connection URI')
+    parser.add_argument('--db', default=MONGO_DB, help='MongoDB database name')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        if args.pincodes is not None:
+            from set_up_db import build_pincodes
+            pincodes = build_pincodes(args.pincodes)
+        else:
+            pincodes = distinct_pincodes(args.mongo_uri, args.db)
+        count = build_pincode_table(pincodes, args.path, args.seed)
+        print(f"Wrote {count} pincodes to {args.path} ({os.path.getsize(args.path) / 1024:.1f} KiB)")
+    else:
+        table = load_pincode_table(args.path)
+        if table is None:
+            print(f"❌ No pincode table at {args.path}")
+            return 1
+        print(f"{args.path}: {len(table)} pincodes, {table.nbytes / 1024:.1f} KiB")
+        for record in table[:10]:
+            print(f"  {record['pincode']:<10} {record['latitude']:8.4f} {record['longitude']:8.4f}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,38 @@
+# Prediction response formats shared by the models (model.py) and the API's
+# fallback predictions (app.py); kept free of numpy and pandas imports so the
+# fallbacks work even when the model module cannot be loaded
+
+def _to_list(values):
+    """A numpy array, pandas Series or list as a list of Python values"""
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+def format_predictions(result, as_columns=False):
+    """
+    Return prediction columns as row dicts or as a dict of column lists
+
+    Parameters:
+    -----------
+    result : dict
+        Mapping of output field to a numpy array, Series or list with one
+        entry per row; a nested dict holds sub-columns (e.g. per-product
+        probabilities)
+    as_columns : bool
+        Return {"field": [...]} instead of a list of {"field": value} rows
+
+    Returns:
+    --------
+    predictions : list of dict or dict of list
+    """
+    columns = {
+        key: ({k: _to_list(v) for k, v in value.items()} if isinstance(value, dict) else _to_list(value))
+        for key, value in result.items()
+    }
+    if as_columns:
+        return columns
+    flat = {}
+    for key, value in columns.items():
+        if isinstance(value, dict):
+            # Rows of the nested column, as one dict per row
+            value = [dict(zip(value, values)) for values in zip(*value.values())]
+        flat[key] = value
+    return [dict(zip(flat, values)) for values in zip(*flat.values())]
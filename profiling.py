@@ -0,0 +1,120 @@
+# On-demand CPU profiling of single requests with cProfile
+
+from flask import request, g
+import hmac
+import io
+import logging
+import os
+import random
+import re
+import time
+
+try:
+    from config import PROFILE_DIR, PROFILE_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_MAX_FILES
+except ImportError:
+    PROFILE_DIR = 'profiles'
+    PROFILE_TOKEN = ''
+    PROFILE_SAMPLE_RATE = 0.0
+    PROFILE_MAX_FILES = 200
+
+logger = logging.getLogger(__name__)
+
+# A request sending this header with the value of PROFILE_TOKEN is profiled
+PROFILE_HEADER = 'X-Profile-Token'
+
+# Profile file names: <timestamp>_<route>_<pid>.prof
+PROFILE_NAME_PATTERN = re.compile(r'^[\w.-]+\.prof$')
+
+def is_authorized():
+    """Check the request's profile token; profiling on request is off while PROFILE_TOKEN is unset"""
+    token = request.headers.get(PROFILE_HEADER)
+    # Compared as bytes, since compare_digest rejects str holding non-ASCII
+    # characters; WSGI hands over header bytes decoded as latin-1
+    return (bool(PROFILE_TOKEN) and token is not None
+            and hmac.compare_digest(token.encode('latin-1', 'replace'), PROFILE_TOKEN.encode('utf-8')))
+
+def _profile_name():
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    route = re.sub(r'[^\w-]+', '-', route).strip('-') or 'index'
+    stamp = time.strftime('%Y%m%dT%H%M%S') + f"{time.time() % 1:.6f}"[1:]
+    return f"{stamp}_{route}_{os.getpid()}.prof"
+
+def start_profiling():
+    """Start profiling the request if it is authorized to ask for it or is sampled"""
+    if not is_authorized() and not (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+        return None
+    import cProfile
+    profiler = cProfile.Profile()
+    g.profiler = profiler
+    profiler.enable()
+    return None
+
+def _stop_profiler():
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+    return profiler
+
+def finish_profiling(response):
+    """Write the request's profile to PROFILE_DIR and name it in the X-Profile-Id header"""
+    profiler = _stop_profiler()
+    if profiler is None:
+        return response
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = _profile_name()
+        profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+        response.headers['X-Profile-Id'] = name
+        prune_profiles()
+    except OSError as e:
+        logger.error(f"Error saving request profile: {e}")
+    return response
+
+def discard_profiling(exc):
+    """Stop a profiler left running by a request that failed before after_request"""
+    _stop_profiler()
+
+def prune_profiles():
+    """Delete the oldest profiles beyond PROFILE_MAX_FILES"""
+    profiles = list_profiles()
+    for entry in profiles[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, entry["name"]))
+        except OSError:
+            pass
+
+def list_profiles():
+    """List saved profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.is_file() and PROFILE_NAME_PATTERN.match(entry.name):
+            stat = entry.stat()
+            profiles.append({
+                "name": entry.name,
+                "size": stat.st_size,
+                "created": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(stat.st_mtime))
+            })
+    return sorted(profiles, key=lambda p: p["name"], reverse=True)
+
+def profile_path(name):
+    """Path of a saved profile, or None if the name is invalid or not found"""
+    if not PROFILE_NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+def profile_summary(path, sort='cumulative', limit=40):
+    """Render the top functions of a saved profile as pstats text"""
+    import pstats
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+def init_profiling(app):
+    """Register per-request profiling on a Flask app"""
+    app.before_request(start_profiling)
+    app.after_request(finish_profiling)
+    app.teardown_request(discard_profiling)
@@ -0,0 +1,164 @@
+# Readiness: warm each worker up before it takes traffic, and report it ready
+# only once the warmup has finished and MongoDB answers a live ping
+
+import logging
+import os
+import threading
+import time
+
+# pincode_table (numpy) is imported by the functions that need it, keeping
+# it out of app.py's import
+from model_registry import get_metadata
+
+try:
+    from config import WARMUP_ROWS, READINESS_DB_TIMEOUT_SECONDS
+except ImportError:
+    WARMUP_ROWS = 200
+    READINESS_DB_TIMEOUT_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS = ["loan", "credit_card", "insurance"]
+CHANNELS = ["online", "offline"]
+# Used for the synthetic batch when there is no pincode table
+FALLBACK_PINCODES = ["110001", "110002", "110003", "400001", "400002", "600001"]
+
+# Seconds between checks while the warmup waits for MongoDB
+DB_WAIT_INTERVAL = 0.5
+
+_lock = threading.Lock()
+_started_pid = None
+_state = {}
+# Region id -> (latitude, longitude) of its pincodes, loaded by the warmup
+_centroids = {}
+
+def _reset_state():
+    _state.clear()
+    _state.update({
+        "warmup": "running",
+        "models": "pending",
+        "pincode_table": "pending",
+        "predictions": "pending",
+        "region_centroids": "pending",
+        "model_metadata": "pending",
+        "seconds": None,
+        "error": None
+    })
+
+def synthetic_batch(rows=WARMUP_ROWS):
+    """A prediction batch of `rows` rows over known pincodes, products and channels"""
+    import pandas as pd
+    from pincode_table import load_pincode_table
+    table = load_pincode_table()
+    pincodes = list(table['pincode'][:rows]) if table is not None and len(table) else FALLBACK_PINCODES
+    return pd.DataFrame({
+        "pincode": [str(pincodes[i % len(pincodes)]) for i in range(rows)],
+        "product": [PRODUCTS[i % len(PRODUCTS)] for i in range(rows)],
+        "channel": [CHANNELS[i % len(CHANNELS)] for i in range(rows)]
+    })
+
+def _load_centroids(db):
+    from pincode_table import region_centroids
+    regions = {}
+    for region in db["demand_prediction"].find({}, {"_id": 0, "region_id": 1, "pincodes": 1}):
+        regions[region["region_id"]] = region.get("pincodes", [])
+    return region_centroids(regions)
+
+def run_warmup(get_model, get_db):
+    """
+    Load and exercise everything the first requests would otherwise pay for
+
+    Imports the models, maps the pincode table and reads through it, scores a
+    synthetic batch with each predict_* function in both response formats,
+    then waits for MongoDB and loads the region centroids and model metadata.
+    """
+    global _centroids
+    from pincode_table import load_pincode_table
+    start = time.perf_counter()
+    try:
+        model = get_model()
+        if model is None:
+            raise RuntimeError("model.py could not be imported")
+        _state["models"] = "loaded"
+
+        table = load_pincode_table()
+        if table is not None:
+            # Fault the mapped pages in now rather than on the first lookups;
+            # records are stored whole, so reading one field reads every page
+            table['latitude'].sum()
+            _state["pincode_table"] = f"loaded ({len(table)} pincodes)"
+        else:
+            _state["pincode_table"] = "missing"
+            logger.warning("No pincode table; coordinates are assigned per worker. "
+                           "Build one with 'python pincode_table.py build'")
+
+        batch = synthetic_batch()
+        for predict in (model.predict_region_demand, model.predict_demand_rise, model.predict_top_product):
+            predict(batch.copy(), False)
+            predict(batch.copy(), True)
+        _state["predictions"] = f"warmed ({len(batch)} rows)"
+
+        # Retried until MongoDB is connected and answers
+        metadata = None
+        while metadata is None:
+            db = get_db()
+            if db is not None:
+                try:
+                    _centroids = _load_centroids(db)
+                    _state["region_centroids"] = f"loaded ({len(_centroids)} regions)"
+                    metadata = get_metadata(db, force=True)
+                except Exception as e:
+                    logger.warning(f"Warmup could not read from MongoDB, retrying: {e}")
+            if metadata is None:
+                time.sleep(DB_WAIT_INTERVAL)
+        _state["model_metadata"] = f"loaded ({len(metadata['models'])} models)"
+        _state["warmup"] = "done"
+    except Exception as e:
+        _state["warmup"] = "failed"
+        _state["error"] = str(e)
+        logger.error(f"Warmup failed in worker {os.getpid()}: {e}")
+    _state["seconds"] = round(time.perf_counter() - start, 3)
+    if _state["warmup"] == "done":
+        logger.info(f"Worker {os.getpid()} warmed up in {_state['seconds']:.2f}s")
+
+def start_warmup(get_model, get_db):
+    """
+    Start the warmup thread in this process if it has not run yet
+
+    get_model returns the model module (or None) and get_db the database,
+    or None until connected. Called per request, like the memory watchdog,
+    so each forked worker warms itself.
+    """
+    global _started_pid
+    if _started_pid == os.getpid():
+        return
+    with _lock:
+        if _started_pid == os.getpid():
+            return
+        _started_pid = os.getpid()
+        _reset_state()
+    threading.Thread(target=run_warmup, args=(get_model, get_db), name="warmup", daemon=True).start()
+
+def get_region_centroids():
+    """Region id -> (latitude, longitude), empty until the warmup has loaded them"""
+    return _centroids
+
+def check_database(client):
+    """Ping MongoDB now, giving up after READINESS_DB_TIMEOUT_SECONDS"""
+    if client is None:
+        return "connecting"
+    import pymongo
+    try:
+        with pymongo.timeout(READINESS_DB_TIMEOUT_SECONDS):
+            client.admin.command('ping')
+        return "ok"
+    except Exception as e:
+        logger.warning(f"Readiness ping failed: {e}")
+        return "unreachable"
+
+def readiness_report(client):
+    """Return (ready, checks): warmup progress per step and a live MongoDB check"""
+    checks = dict(_state) if _started_pid == os.getpid() else {"warmup": "not started"}
+    checks["mongodb"] = check_database(client)
+    ready = checks["warmup"] == "done" and checks["mongodb"] == "ok"
+    return ready, checks
@@ -0,0 +1,334 @@
+# Incremental materialization of demand_prediction region summaries from the sales cube
+
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import datetime
+import logging
+import time
+
+try:
+    from config import MONGO_URI, MONGO_DB, SUMMARY_WATERMARK_LAG_SECONDS
+except ImportError:
+    MONGO_URI = "mongodb://localhost:27017/"
+    MONGO_DB = "gromo"
+    SUMMARY_WATERMARK_LAG_SECONDS = 5
+
+logger = logging.getLogger(__name__)
+
+# Each source keeps its own watermark in summary_state, under STATE_ID:<source>
+STATE_ID = "region_summary"
+# Where sales counts are read from: (collection, change timestamp, count expression).
+# The cube (sales_cube.py) holds one row per pincode x product x channel x day,
+# so it is orders of magnitude smaller than the raw sales history.
+SOURCES = {
+    "cube": ("sales_cube", "updated_at", "$count"),
+    "sales": ("sales_data", "inserted_at", 1),
+}
+# Region that collects sales from pincodes not listed in any region
+UNASSIGNED_REGION_ID = -1
+DUPLICATE_KEY_ERROR = 11000
+# Product and channel names become keys of the stored counters; these characters
+# would otherwise be read as field paths or operators ("." and "$")
+KEY_ESCAPES = [("%", "%25"), (".", "%2E"), ("$", "%24")]
+
+def load_pincode_regions(db):
+    """Map each pincode to the region whose summary lists it"""
+    pincode_regions = {}
+    for region in db["demand_prediction"].find({}, {"_id": 0, "region_id": 1, "pincodes": 1}):
+        for pincode in region.get("pincodes", []):
+            pincode_regions[str(pincode)] = region["region_id"]
+    return pincode_regions
+
+def encode_key(key):
+    """Escape a counter key so it is stored as a single field name"""
+    key = str(key)
+    for char, escaped in KEY_ESCAPES:
+        key = key.replace(char, escaped)
+    return key
+
+def decode_key(key):
+    """Reverse encode_key"""
+    for char, escaped in reversed(KEY_ESCAPES):
+        key = key.replace(escaped, char)
+    return key
+
+def _encode_counts(delta):
+    """Counters of a region with every pincode, product and channel key escaped"""
+    return {
+        "total": delta["total"],
+        **{field: {encode_key(k): v for k, v in delta[field].items()}
+           for field in ("pincodes", "products", "channels")}
+    }
+
+def _group_pipeline(match, count_expr=1):
+    """Aggregation that counts sales per pincode, product and channel"""
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {"pincode": "$pincode", "product": "$product", "channel": "$channel"},
+            "count": {"$sum": count_expr}
+        }}
+    ]
+
+def _region_deltas(groups, pincode_regions):
+    """Fold (pincode, product, channel) counts into per-region counters"""
+    deltas = {}
+    for group in groups:
+        key = group["_id"]
+        pincode = str(key.get("pincode"))
+        region_id = pincode_regions.get(pincode, UNASSIGNED_REGION_ID)
+        region = deltas.setdefault(region_id, {"total": 0, "pincodes": {}, "products": {}, "channels": {}})
+        count = group["count"]
+        region["total"] += count
+        region["pincodes"][pincode] = region["pincodes"].get(pincode, 0) + count
+        product = key.get("product")
+        if product is not None:
+            region["products"][product] = region["products"].get(product, 0) + count
+        channel = key.get("channel")
+        if channel is not None:
+            region["channels"][channel] = region["channels"].get(channel, 0) + count
+    return deltas
+
+def _distribution(counts):
+    """Return the top key and the rounded share of each key"""
+    total = sum(counts.values())
+    if not total:
+        return None, {}
+    top = max(counts, key=counts.get)
+    return top, {k: round(v / total, 2) for k, v in counts.items()}
+
+def summarize_counts(region):
+    """
+    Derive the served summary fields from a region's stored counters
+
+    Parameters:
+    -----------
+    region : dict
+        demand_prediction document containing a ``counts`` sub-document
+
+    Returns:
+    --------
+    fields : dict
+        total_demand, avg_demand_per_pincode, products and channels
+    """
+    counts = region.get("counts", {})
+    total = counts.get("total", 0)
+    pincode_count = len(region.get("pincodes") or counts.get("pincodes", {})) or 1
+    products = {decode_key(k): v for k, v in counts.get("products", {}).items()}
+    channels = {decode_key(k): v for k, v in counts.get("channels", {}).items()}
+    top_product, product_distribution = _distribution(products)
+    top_channel, channel_distribution = _distribution(channels)
+    return {
+        "total_demand": total,
+        "avg_demand_per_pincode": round(total / pincode_count, 2),
+        "products": {"top_product": top_product, "distribution": product_distribution},
+        "channels": {"top_channel": top_channel, "distribution": channel_distribution}
+    }
+
+def _refresh_summaries(db, region_ids):
+    """Recompute the derived fields of the given regions from their counters"""
+    collection = db["demand_prediction"]
+    updates = []
+    for region in collection.find({"region_id": {"$in": list(region_ids)}}):
+        updates.append(UpdateOne({"_id": region["_id"]}, {"$set": summarize_counts(region)}))
+    if updates:
+        collection.bulk_write(updates, ordered=False)
+    return len(updates)
+
+def _apply_updates(collection, updates):
+    """
+    Run region updates, ignoring duplicate-key errors from racing upserts
+
+    Upserts filter on region_id alone, so two runs creating the same region
+    at once can both insert; the unique region_id index rejects the second,
+    whose region then exists as intended.
+    """
+    if not updates:
+        return
+    try:
+        collection.bulk_write(updates, ordered=False)
+    except BulkWriteError as e:
+        other_errors = [err for err in e.details.get("writeErrors", [])
+                        if err.get("code") != DUPLICATE_KEY_ERROR]
+        if other_errors:
+            raise
+
+def _state_id(source):
+    return f"{STATE_ID}:{source}"
+
+def _begin_run(db, lag_seconds, source):
+    """Return the (low, high) window of ``source`` for this run, resuming an interrupted one"""
+    # Before watermarks were kept per source, both shared the STATE_ID document
+    state = (db["summary_state"].find_one({"_id": _state_id(source)})
+             or db["summary_state"].find_one({"_id": STATE_ID}) or {})
+    low = state.get("watermark")
+    high = state.get("pending_watermark")
+    if high is None:
+        # Stay a little behind the clock so sales stamped just before the run
+        # but committed after it are picked up by the next run
+        high = datetime.datetime.now() - datetime.timedelta(seconds=lag_seconds)
+        db["summary_state"].update_one({"_id": _state_id(source)}, {"$set": {"pending_watermark": high}},
+                                       upsert=True)
+    return low, high
+
+def _finish_run(db, high, source, mode, stats):
+    """Advance the watermark of ``source`` once every region update has been applied"""
+    db["summary_state"].update_one(
+        {"_id": _state_id(source)},
+        {"$set": {"watermark": high, "last_run": {"mode": mode, "at": datetime.datetime.now(), **stats}},
+         "$unset": {"pending_watermark": ""}},
+        upsert=True
+    )
+
+def _write_counters(db, deltas, region_ids, high):
+    """
+    Replace the counters of ``region_ids`` with absolute values from ``deltas``
+
+    Regions in ``region_ids`` without any sales in ``deltas`` are reset to zero.
+    """
+    collection = db["demand_prediction"]
+    updates = [UpdateOne(
+        {"region_id": region_id},
+        {"$set": {"counts": _encode_counts(delta), "summary_watermark": high},
+         "$addToSet": {"pincodes": {"$each": list(delta["pincodes"])}},
+         "$setOnInsert": {"demand_rise_flag": False}},
+        upsert=True
+    ) for region_id, delta in deltas.items()]
+    empty_counts = {"total": 0, "pincodes": {}, "products": {}, "channels": {}}
+    stale_ids = [region_id for region_id in region_ids if region_id not in deltas]
+    updates.extend(UpdateOne({"region_id": region_id},
+                             {"$set": {"counts": empty_counts, "summary_watermark": high}})
+                   for region_id in stale_ids)
+    _apply_updates(collection, updates)
+    _refresh_summaries(db, list(deltas) + stale_ids)
+    return len(deltas) + len(stale_ids)
+
+def _run_stats(groups, deltas, regions, start):
+    """Summary of a run for logging and the state document"""
+    return {
+        "groups": len(groups),
+        "sales": sum(delta["total"] for delta in deltas.values()),
+        "regions": regions,
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+
+def _incremental(db, low, high, source):
+    """
+    Recompute the regions whose sales changed in (low, high] of ``source``
+
+    The changed rows (indexed on the source's timestamp) only identify the
+    touched regions; their counters are then re-aggregated over the full
+    history and written as absolute values. Both sources therefore agree,
+    and a retried or repeated run rewrites the same values.
+    """
+    collection_name, timestamp_field, count_expr = SOURCES[source]
+    match = {timestamp_field: {"$lte": high}}
+    if low is not None:
+        match[timestamp_field]["$gt"] = low
+    touched = [str(p) for p in db[collection_name].distinct("pincode", match)]
+    if not touched:
+        return [], {}, 0
+
+    pincode_regions = load_pincode_regions(db)
+    region_ids = {pincode_regions.get(p, UNASSIGNED_REGION_ID) for p in touched}
+    # Every pincode of a touched region is re-read so the counters stay absolute;
+    # the unassigned region lists the pincodes it has collected so far
+    pincodes = {p for p, region_id in pincode_regions.items() if region_id in region_ids}
+    pincodes.update(touched)
+
+    history = {"pincode": {"$in": sorted(pincodes)}}
+    if source == "sales":
+        # Sales inserted after ``high`` belong to the next run, as in a rebuild
+        history[timestamp_field] = {"$lte": high}
+    groups = list(db[collection_name].aggregate(_group_pipeline(history, count_expr), allowDiskUse=True))
+    deltas = _region_deltas(groups, pincode_regions)
+    return groups, deltas, _write_counters(db, deltas, region_ids, high)
+
+def run_incremental(db, lag_seconds=SUMMARY_WATERMARK_LAG_SECONDS, source="cube"):
+    """
+    Bring the region summaries up to date with sales ingested since the last watermark
+
+    With ``source="cube"`` the cells updated since the watermark (indexed on
+    ``updated_at``) identify the touched regions; with ``source="sales"`` the
+    raw sales with ``inserted_at`` in (watermark, now - lag] do. Either way
+    the touched regions are recomputed from that source as absolute counters,
+    so the cost follows the regions changed rather than the total history.
+    Each source keeps its own watermark; since neither adds deltas, switching
+    sources never counts a sale twice.
+
+    Returns:
+    --------
+    stats : dict
+        Number of (pincode, product, channel) groups, sales and regions
+        touched, plus elapsed seconds
+    """
+    start = time.perf_counter()
+    low, high = _begin_run(db, lag_seconds, source)
+    groups, deltas, regions = _incremental(db, low, high, source)
+    stats = _run_stats(groups, deltas, regions, start)
+    _finish_run(db, high, source, f"incremental:{source}", stats)
+    return stats
+
+def _partition(items, parts):
+    """Split ``items`` into at most ``parts`` round-robin lists"""
+    parts = max(1, min(parts, len(items)))
+    return [items[i::parts] for i in range(parts)]
+
+def run_rebuild(db, workers=4, lag_seconds=SUMMARY_WATERMARK_LAG_SECONDS, source="cube"):
+    """
+    Recompute every region summary from the full history
+
+    The pincodes are split into ``workers`` partitions and each partition is
+    aggregated by its own server-side pipeline in parallel; the partial
+    results are merged and written as absolute counters.
+    """
+    start = time.perf_counter()
+    _, high = _begin_run(db, lag_seconds, source)
+    collection_name, timestamp_field, count_expr = SOURCES[source]
+    pincodes = [str(p) for p in db[collection_name].distinct("pincode")]
+
+    def aggregate(partition):
+        match = {"pincode": {"$in": partition}}
+        if source == "sales":
+            match[timestamp_field] = {"$lte": high}
+        return list(db[collection_name].aggregate(_group_pipeline(match, count_expr), allowDiskUse=True))
+
+    groups = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for partial in executor.map(aggregate, _partition(pincodes, workers)):
+            groups.extend(partial)
+    deltas = _region_deltas(groups, load_pincode_regions(db))
+
+    region_ids = set(deltas) | set(db["demand_prediction"].distinct("region_id"))
+    regions = _write_counters(db, deltas, region_ids, high)
+    stats = _run_stats(groups, deltas, regions, start)
+    _finish_run(db, high, source, f"rebuild:{source}", stats)
+    return stats
+
+def main():
+    """Run an incremental update or a full rebuild from the command line"""
+    parser = argparse.ArgumentParser(description='Materialize demand_prediction region summaries from sales data')
+    parser.add_argument('action', choices=['incremental', 'rebuild'],
+                        help='incremental: merge sales since the last watermark; rebuild: recompute everything')
+    parser.add_argument('--source', choices=list(SOURCES), default='cube',
+                        help='Read counts from the sales cube or from raw sales_data')
+    parser.add_argument('--workers', type=int, default=4, help='Parallel aggregations for a rebuild')
+    parser.add_argument('--lag-seconds', type=float, default=SUMMARY_WATERMARK_LAG_SECONDS,
+                        help='How far behind the clock the watermark stays')
+    parser.add_argument('--mongo-uri', default=MONGO_URI, help='MongoDB connection URI')
+    parser.add_argument('--db', default=MONGO_DB, help='MongoDB database name')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri)[args.db]
+    if args.action == 'incremental':
+        stats = run_incremental(db, lag_seconds=args.lag_seconds, source=args.source)
+    else:
+        stats = run_rebuild(db, workers=args.workers, lag_seconds=args.lag_seconds, source=args.source)
+
+    print(f"✅ {args.action}: {stats['sales']} sales in {stats['groups']} groups "
+          f"merged into {stats['regions']} regions in {stats['seconds']:.2f}s")
+
+if __name__ == "__main__":
+    main()
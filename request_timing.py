@@ -0,0 +1,106 @@
+# Per-request phase timing: Server-Timing headers and sampled structured logs
+
+from contextlib import contextmanager
+from flask import request
+import contextvars
+import json
+import logging
+import random
+import time
+
+try:
+    from config import SERVER_TIMING_HEADER, TIMING_LOG_SAMPLE_RATE
+except ImportError:
+    SERVER_TIMING_HEADER = True
+    TIMING_LOG_SAMPLE_RATE = 0.0
+
+logger = logging.getLogger(__name__)
+
+class RequestTimings:
+    """Start time, accumulated phase durations and extra log fields of one request"""
+    __slots__ = ('start', 'phases', 'fields')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.fields = {}
+
+# Timings of the request being handled in this context, or None outside a request
+_current = contextvars.ContextVar('request_timings', default=None)
+
+@contextmanager
+def phase(name):
+    """
+    Time a block as phase `name` of the current request
+
+    Phases with the same name (e.g. preprocessing in each model of
+    /predict/all) add up. Outside a request, such as when model.py is used
+    for training, this does nothing.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases[name] = timings.phases.get(name, 0.0) + time.perf_counter() - start
+
+def add_phase(name, seconds):
+    """Add time measured elsewhere (e.g. by a MongoDB command listener) to a phase of the current request"""
+    timings = _current.get()
+    if timings is not None:
+        timings.phases[name] = timings.phases.get(name, 0.0) + seconds
+
+def annotate(**fields):
+    """Add fields (e.g. rows=len(df)) to the current request's timing log entry"""
+    timings = _current.get()
+    if timings is not None:
+        timings.fields.update(fields)
+
+def server_timing_header(phases, total):
+    """Format phase durations in seconds as a Server-Timing header value in milliseconds"""
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+def start_request_timing():
+    """Begin timing a request"""
+    _current.set(RequestTimings())
+    return None
+
+def finish_request_timing(response):
+    """Attach the Server-Timing header and log a sample of requests as JSON"""
+    timings = _current.get()
+    if timings is None:
+        return response
+    total = time.perf_counter() - timings.start
+    if SERVER_TIMING_HEADER:
+        response.headers['Server-Timing'] = server_timing_header(timings.phases, total)
+    if TIMING_LOG_SAMPLE_RATE > 0 and random.random() < TIMING_LOG_SAMPLE_RATE:
+        logger.info(json.dumps({
+            "event": "request_timing",
+            "method": request.method,
+            "route": request.url_rule.rule if request.url_rule is not None else request.path,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in timings.phases.items()},
+            **timings.fields
+        }, default=str))
+    return response
+
+def clear_request_timing(exc):
+    """Forget the finished request's timings"""
+    _current.set(None)
+
+def init_request_timing(app):
+    """
+    Register request timing on a Flask app
+
+    Call this before registering other after_request hooks (such as
+    compression) so that their time is included in the total.
+    """
+    app.before_request(start_request_timing)
+    app.after_request(finish_request_timing)
+    app.teardown_request(clear_request_timing)
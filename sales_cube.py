@@ -0,0 +1,179 @@
+# Pre-aggregated sales cube keyed by pincode x product x channel x day
+
+from pymongo import MongoClient, UpdateOne
+import pandas as pd
+import argparse
+import datetime
+import logging
+import time
+
+from db_indexes import INDEXES
+
+try:
+    from config import MONGO_URI, MONGO_DB
+except ImportError:
+    MONGO_URI = "mongodb://localhost:27017/"
+    MONGO_DB = "gromo"
+
+logger = logging.getLogger(__name__)
+
+CUBE_COLLECTION = "sales_cube"
+CUBE_KEYS = ["pincode", "product", "channel", "day"]
+
+def _to_day(value, default):
+    """Truncate a sale date (datetime, ISO string or epoch milliseconds) to midnight"""
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            value = None
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        # DataFrame.to_json writes datetimes as epoch milliseconds
+        value = datetime.datetime.utcfromtimestamp(value / 1000)
+    if not isinstance(value, datetime.datetime):
+        value = default
+    return datetime.datetime(value.year, value.month, value.day)
+
+def _number(value):
+    """Return value as a float, or None when it is missing or not numeric"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return None if value != value else float(value)
+
+def aggregate_records(records):
+    """
+    Fold sales records into cube cells
+
+    Parameters:
+    -----------
+    records : list of dict
+        Sales records with pincode, product, channel and optional date,
+        customer_age and customer_income
+
+    Returns:
+    --------
+    cells : dict
+        Mapping of (pincode, product, channel, day) to count and sums
+    """
+    now = datetime.datetime.now()
+    cells = {}
+    for record in records:
+        if any(record.get(key) is None for key in ("pincode", "product", "channel")):
+            continue
+        day = _to_day(record.get("date"), record.get("inserted_at") or now)
+        key = (str(record["pincode"]), record["product"], record["channel"], day)
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = {"count": 0, "income_sum": 0.0, "income_count": 0,
+                                 "age_sum": 0.0, "age_count": 0}
+        cell["count"] += 1
+        income = _number(record.get("customer_income"))
+        if income is not None:
+            cell["income_sum"] += income
+            cell["income_count"] += 1
+        age = _number(record.get("customer_age"))
+        if age is not None:
+            cell["age_sum"] += age
+            cell["age_count"] += 1
+    return cells
+
+def update_cube(db, records):
+    """
+    Add newly ingested sales records to the cube
+
+    Each touched cell is upserted with ``$inc`` so concurrent ingests merge
+    correctly, and stamped with ``updated_at`` for incremental consumers.
+
+    Returns:
+    --------
+    cells : int
+        Number of cube cells touched
+    """
+    cells = aggregate_records(records)
+    if not cells:
+        return 0
+    now = datetime.datetime.now()
+    updates = [
+        UpdateOne(
+            dict(zip(CUBE_KEYS, key)),
+            {"$inc": cell, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for key, cell in cells.items()
+    ]
+    db[CUBE_COLLECTION].bulk_write(updates, ordered=False)
+    return len(updates)
+
+def rebuild_cube(db, source="sales_data"):
+    """
+    Recompute the whole cube from raw sales with a server-side aggregation
+
+    Returns:
+    --------
+    cells : int
+        Number of cube cells written
+    """
+    now = datetime.datetime.now()
+    date = {"$ifNull": ["$date", "$inserted_at"]}
+    pipeline = [
+        {"$match": {"pincode": {"$ne": None}, "product": {"$ne": None}, "channel": {"$ne": None}}},
+        {"$group": {
+            "_id": {
+                "pincode": {"$toString": "$pincode"},
+                "product": "$product",
+                "channel": "$channel",
+                "day": {"$dateFromParts": {"year": {"$year": date}, "month": {"$month": date},
+                                           "day": {"$dayOfMonth": date}}}
+            },
+            "count": {"$sum": 1},
+            "income_sum": {"$sum": {"$cond": [{"$isNumber": "$customer_income"}, "$customer_income", 0]}},
+            "income_count": {"$sum": {"$cond": [{"$isNumber": "$customer_income"}, 1, 0]}},
+            "age_sum": {"$sum": {"$cond": [{"$isNumber": "$customer_age"}, "$customer_age", 0]}},
+            "age_count": {"$sum": {"$cond": [{"$isNumber": "$customer_age"}, 1, 0]}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "pincode": "$_id.pincode", "product": "$_id.product",
+            "channel": "$_id.channel", "day": "$_id.day",
+            "count": 1, "income_sum": 1, "income_count": 1, "age_sum": 1, "age_count": 1,
+            "updated_at": {"$literal": now}
+        }},
+        {"$out": CUBE_COLLECTION}
+    ]
+    db[source].aggregate(pipeline, allowDiskUse=True)
+    # $out keeps the indexes of an existing cube but a first build has none
+    db[CUBE_COLLECTION].create_indexes(INDEXES[CUBE_COLLECTION])
+    return db[CUBE_COLLECTION].estimated_document_count()
+
+def load_cube(db, match=None):
+    """
+    Load cube cells as a DataFrame with one row per cell
+
+    The mean customer age and income of each cell are derived from the sums,
+    and ``count`` holds the number of sales the row stands for.
+    """
+    cells = list(db[CUBE_COLLECTION].find(match or {}, {"_id": 0, "updated_at": 0}))
+    df = pd.DataFrame(cells, columns=CUBE_KEYS + ["count", "income_sum", "income_count",
+                                                  "age_sum", "age_count"])
+    df["customer_income"] = df["income_sum"] / df["income_count"].where(df["income_count"] > 0)
+    df["customer_age"] = df["age_sum"] / df["age_count"].where(df["age_count"] > 0)
+    df = df.rename(columns={"day": "date"})
+    # Keeps the datetime dtype when there are no cells
+    df["date"] = pd.to_datetime(df["date"])
+    return df.drop(columns=["income_sum", "income_count", "age_sum", "age_count"])
+
+def main():
+    """Rebuild the cube from sales_data from the command line"""
+    parser = argparse.ArgumentParser(description='Maintain the pincode x product x channel x day sales cube')
+    parser.add_argument('action', choices=['rebuild'], help='rebuild: recompute the cube from sales_data')
+    parser.add_argument('--mongo-uri', default=MONGO_URI, help='MongoDB connection URI')
+    parser.add_argument('--db', default=MONGO_DB, help='MongoDB database name')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri)[args.db]
+    start = time.perf_counter()
+    cells = rebuild_cube(db)
+    print(f"✅ Rebuilt {CUBE_COLLECTION} with {cells} cells in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# Production server: the API under gunicorn, configured from config.py
+#
+# Usage:
+#   python server.py
+#   GUNICORN_WORKERS=8 GUNICORN_MAX_REQUESTS=5000 python server.py
+#   PROMETHEUS_MULTIPROC_DIR=/tmp/gromo-metrics python server.py   # /metrics across workers
+#
+# With GUNICORN_PRELOAD (the default) the master imports app.py, pandas,
+# scikit-learn and model.py and memory-maps the pincode table before forking,
+# so that memory is shared by all workers instead of duplicated in each.
+
+import gc
+import glob
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+
+try:
+    from config import (
+        GUNICORN_BIND, GUNICORN_WORKERS, GUNICORN_WORKER_CLASS, GUNICORN_THREADS, GUNICORN_TIMEOUT,
+        GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_KEEPALIVE, GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER,
+        GUNICORN_PRELOAD
+    )
+except ImportError:
+    GUNICORN_BIND = '0.0.0.0:5000'
+    GUNICORN_WORKERS = 0
+    GUNICORN_WORKER_CLASS = 'gthread'
+    GUNICORN_THREADS = 4
+    GUNICORN_TIMEOUT = 120
+    GUNICORN_GRACEFUL_TIMEOUT = 30
+    GUNICORN_KEEPALIVE = 5
+    GUNICORN_MAX_REQUESTS = 1000
+    GUNICORN_MAX_REQUESTS_JITTER = 100
+    GUNICORN_PRELOAD = True
+
+logger = logging.getLogger(__name__)
+
+def worker_count():
+    """GUNICORN_WORKERS, or one worker per CPU this process may run on"""
+    if GUNICORN_WORKERS > 0:
+        return GUNICORN_WORKERS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def reset_multiprocess_dir():
+    """
+    Empty PROMETHEUS_MULTIPROC_DIR before any worker writes to it
+
+    Must run before metrics.py (and prometheus_client) is imported, since the
+    client picks its storage when imported. Samples left by a previous run
+    would otherwise be merged into this one's.
+    """
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+def when_ready(server):
+    # Move everything the master loaded into the permanent GC generation so
+    # the workers' collections do not touch, and so un-share, those pages
+    gc.freeze()
+    # The master never serves requests; drop the zero-valued per-process
+    # gauges it created when app.py was preloaded
+    from metrics import mark_worker_dead
+    mark_worker_dead(os.getpid())
+    server.log.info(f"Master {os.getpid()} ready; {gc.get_freeze_count()} objects frozen before forking")
+
+def post_fork(server, worker):
+    # The master replaces a worker that exits, so the memory watchdog may
+    # recycle this one past MEMORY_RSS_LIMIT_MB
+    from memory_watchdog import mark_managed
+    mark_managed()
+    # Connect to MongoDB and warm up right away rather than on the first
+    # request, so /ready turns green before traffic arrives
+    import app
+    app.start_worker()
+
+def child_exit(server, worker):
+    # Drop the worker's live-only gauge samples (RSS, cache entries)
+    from metrics import mark_worker_dead
+    mark_worker_dead(worker.pid)
+
+class APIServer(BaseApplication):
+    """gunicorn application serving app.app with options from config.py"""
+
+    def __init__(self, options=None):
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        import app
+        if self.cfg.preload_app:
+            # Imports, the model module and the pincode table load here once
+            app.warm_imports()
+        return app.app
+
+def server_options():
+    """gunicorn settings from config.py"""
+    return {
+        'bind': GUNICORN_BIND,
+        'workers': worker_count(),
+        'worker_class': GUNICORN_WORKER_CLASS,
+        'threads': GUNICORN_THREADS,
+        'timeout': GUNICORN_TIMEOUT,
+        'graceful_timeout': GUNICORN_GRACEFUL_TIMEOUT,
+        'keepalive': GUNICORN_KEEPALIVE,
+        'max_requests': GUNICORN_MAX_REQUESTS,
+        'max_requests_jitter': GUNICORN_MAX_REQUESTS_JITTER,
+        'preload_app': GUNICORN_PRELOAD,
+        'when_ready': when_ready,
+        'post_fork': post_fork,
+        'child_exit': child_exit
+    }
+
+def main():
+    reset_multiprocess_dir()
+    APIServer(server_options()).run()
+
+if __name__ == "__main__":
+    main()
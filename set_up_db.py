@@ -1,186 +1,347 @@
-# Simple file to set up the MongoDB database
-
-from pymongo import MongoClient
-import datetime
-import random
-import json
-
-def initialize_database():
-    """Initialize MongoDB database with required collections and sample data"""
-    print("Initializing database...")
-    
-    # Connect to MongoDB
-    try:
-        client = MongoClient("mongodb://localhost:27017/")
-        db = client["gromo"]
-        print("Connected to MongoDB successfully")
-    except Exception as e:
-        print(f"Error connecting to MongoDB: {e}")
-        return
-    
-    # Create or clear collections
-    collections = ["demand_prediction", "model_details", "model_evaluation", "sales_data", "uploaded_data"]
-    for collection_name in collections:
-        if collection_name in db.list_collection_names():
-            db[collection_name].delete_many({})
-            print(f"Cleared existing collection: {collection_name}")
-        else:
-            db.create_collection(collection_name)
-            print(f"Created new collection: {collection_name}")
-    
-    # Create sample data for demand_prediction
-    sample_regions = [
-        {
-            "region_id": 0,
-            "pincodes": ["110001", "110002", "110003"],
-            "total_demand": 500,
-            "avg_demand_per_pincode": 166.67,
-            "demand_rise_flag": True,
-            "products": {
-                "top_product": "loan",
-                "distribution": {"loan": 0.55, "credit_card": 0.30, "insurance": 0.15}
-            },
-            "channels": {
-                "top_channel": "online",
-                "distribution": {"online": 0.65, "offline": 0.35}
-            }
-        },
-        {
-            "region_id": 1,
-            "pincodes": ["400001", "400002"],
-            "total_demand": 420,
-            "avg_demand_per_pincode": 210.0,
-            "demand_rise_flag": True,
-            "products": {
-                "top_product": "credit_card",
-                "distribution": {"loan": 0.35, "credit_card": 0.45, "insurance": 0.20}
-            },
-            "channels": {
-                "top_channel": "offline",
-                "distribution": {"online": 0.40, "offline": 0.60}
-            }
-        }
-    ]
-    
-    db["demand_prediction"].insert_many(sample_regions)
-    print(f"Added {len(sample_regions)} sample regions to demand_prediction collection")
-    
-    # Create sample model details
-    sample_model_details = [
-        {
-            "model_type": "regression",
-            "target": "region_total",
-            "hyperparameters": {
-                "model__n_estimators": 100,
-                "model__learning_rate": 0.1,
-                "model__max_depth": 3
-            },
-            "metrics": {
-                "mse": 150.25,
-                "rmse": 12.26,
-                "mae": 9.85,
-                "r2": 0.85
-            },
-            "training_date": datetime.datetime.now().isoformat()
-        },
-        {
-            "model_type": "binary_classification",
-            "target": "demand_rise",
-            "hyperparameters": {
-                "model__C": 1.0,
-                "model__solver": "liblinear"
-            },
-            "metrics": {
-                "accuracy": 0.92,
-                "classification_report": {
-                    "0": {"precision": 0.90, "recall": 0.88, "f1-score": 0.89},
-                    "1": {"precision": 0.93, "recall": 0.95, "f1-score": 0.94}
-                }
-            },
-            "training_date": datetime.datetime.now().isoformat()
-        },
-        {
-            "model_type": "multi_class_classification",
-            "target": "product_top",
-            "hyperparameters": {
-                "model__n_estimators": 100,
-                "model__max_depth": 5
-            },
-            "metrics": {
-                "accuracy": 0.87,
-                "classification_report": {
-                    "0": {"precision": 0.85, "recall": 0.88, "f1-score": 0.86},
-                    "1": {"precision": 0.90, "recall": 0.87, "f1-score": 0.88},
-                    "2": {"precision": 0.86, "recall": 0.85, "f1-score": 0.85}
-                },
-                "product_mapping": {"0": "loan", "1": "credit_card", "2": "insurance"}
-            },
-            "training_date": datetime.datetime.now().isoformat()
-        }
-    ]
-    
-    db["model_details"].insert_many(sample_model_details)
-    print(f"Added {len(sample_model_details)} sample model details to model_details collection")
-    
-    # Create sample model evaluation
-    sample_evaluation = {
-        "timestamp": datetime.datetime.now().isoformat(),
-        "dataset_size": 1000,
-        "regression_metrics": {
-            "mse": 150.25,
-            "rmse": 12.26,
-            "mae": 9.85,
-            "r2": 0.85
-        },
-        "binary_classification_metrics": {
-            "accuracy": 0.92,
-            "report": {"0": {"f1-score": 0.89}, "1": {"f1-score": 0.94}}
-        },
-        "multi_classification_metrics": {
-            "accuracy": 0.87,
-            "report": {"0": {"f1-score": 0.86}, "1": {"f1-score": 0.88}, "2": {"f1-score": 0.85}}
-        }
-    }
-    
-    db["model_evaluation"].insert_one(sample_evaluation)
-    print(f"Added sample evaluation to model_evaluation collection")
-    
-    # Create sample sales data
-    products = ["loan", "credit_card", "insurance"]
-    channels = ["online", "offline"]
-    pincodes = ["110001", "110002", "110003", "400001", "400002", "400003", "600001", "600002"]
-    cities = ["Delhi", "Mumbai", "Chennai"]
-    
-    # Generate random sales records
-    sample_sales = []
-    for _ in range(100):
-        # Generate random date in the last year
-        days_ago = random.randint(0, 365)
-        date = datetime.datetime.now() - datetime.timedelta(days=days_ago)
-        
-        record = {
-            "date": date,
-            "pincode": random.choice(pincodes),
-            "city": random.choice(cities),
-            "product": random.choice(products),
-            "channel": random.choice(channels),
-            "agent_id": f"AG{random.randint(1000, 9999)}",
-            "customer_age": random.randint(21, 60),
-            "customer_income": random.randint(20000, 100000),
-            "inserted_at": datetime.datetime.now()
-        }
-        sample_sales.append(record)
-    
-    db["sales_data"].insert_many(sample_sales)
-    print(f"Added {len(sample_sales)} sample sales records to sales_data collection")
-    
-    print("\nDatabase initialization complete.")
-    print(f"Collections: {db.list_collection_names()}")
-    
-    # Print collection counts
-    for collection_name in db.list_collection_names():
-        count = db[collection_name].count_documents({})
-        print(f"Collection {collection_name}: {count} documents")
-
-if __name__ == "__main__":
-    initialize_database()
\ No newline at end of file
+# Simple file to set up the MongoDB database
+
+from pymongo import MongoClient
+from contextlib import contextmanager
+import argparse
+import datetime
+import multiprocessing
+import random
+import time
+import json
+
+from db_indexes import INDEXES, ensure_indexes
+from mongo_monitoring import register_command_monitor, command_summary
+from sales_cube import rebuild_cube
+from pincode_table import build_pincode_table, PINCODE_TABLE_PATH
+
+try:
+    from config import MONGO_URI, MONGO_DB
+except ImportError:
+    MONGO_URI = "mongodb://localhost:27017/"
+    MONGO_DB = "gromo"
+
+COLLECTIONS = ["demand_prediction", "model_details", "model_evaluation", "sales_data", "uploaded_data",
+               "sales_cube", "summary_state"]
+
+PRODUCTS = ["loan", "credit_card", "insurance"]
+CHANNELS = ["online", "offline"]
+BASE_PINCODES = ["110001", "110002", "110003", "400001", "400002", "400003", "600001", "600002"]
+CITIES = ["Delhi", "Mumbai", "Chennai"]
+
+# Per-process database handle used by the seeding pool
+_worker_db = None
+
+@contextmanager
+def timed_phase(timings, name):
+    """Record the wall time of a seeding phase into ``timings``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+def build_pincodes(count):
+    """Return ``count`` pincodes, starting with the fixed sample pincodes"""
+    pincodes = BASE_PINCODES[:count]
+    next_pincode = 700001
+    while len(pincodes) < count:
+        pincodes.append(str(next_pincode))
+        next_pincode += 1
+    return pincodes
+
+def generate_sales_chunk(size, pincodes, days, seed):
+    """Generate ``size`` random sales records spread over the last ``days`` days"""
+    rng = random.Random(seed)
+    now = datetime.datetime.now()
+    max_seconds = days * 86400
+    records = []
+    for _ in range(size):
+        record = {
+            "date": now - datetime.timedelta(seconds=rng.randint(0, max_seconds)),
+            "pincode": rng.choice(pincodes),
+            "city": rng.choice(CITIES),
+            "product": rng.choice(PRODUCTS),
+            "channel": rng.choice(CHANNELS),
+            "agent_id": f"AG{rng.randint(1000, 9999)}",
+            "customer_age": rng.randint(21, 60),
+            "customer_income": rng.randint(20000, 100000),
+            "inserted_at": now
+        }
+        records.append(record)
+    return records
+
+def _init_seed_worker(mongo_uri, mongo_db):
+    """Open one MongoDB connection per seeding process"""
+    global _worker_db
+    register_command_monitor()
+    _worker_db = MongoClient(mongo_uri)[mongo_db]
+
+def _insert_sales_chunk(task):
+    """Generate and insert one chunk of sales records inside a pool worker"""
+    size, pincodes, days, seed = task
+    records = generate_sales_chunk(size, pincodes, days, seed)
+    _worker_db["sales_data"].insert_many(records, ordered=False)
+    return len(records)
+
+def seed_sales_data(db, rows, pincodes, days, workers, chunk_size, seed, mongo_uri, mongo_db):
+    """Insert ``rows`` random sales records in chunks, in parallel when ``workers`` > 1"""
+    tasks = []
+    remaining = rows
+    chunk_index = 0
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        tasks.append((size, pincodes, days, seed + chunk_index))
+        remaining -= size
+        chunk_index += 1
+
+    inserted = 0
+    if workers <= 1 or len(tasks) <= 1:
+        for size, chunk_pincodes, chunk_days, chunk_seed in tasks:
+            records = generate_sales_chunk(size, chunk_pincodes, chunk_days, chunk_seed)
+            db["sales_data"].insert_many(records, ordered=False)
+            inserted += len(records)
+    else:
+        with multiprocessing.Pool(workers, initializer=_init_seed_worker,
+                                  initargs=(mongo_uri, mongo_db)) as pool:
+            for count in pool.imap_unordered(_insert_sales_chunk, tasks):
+                inserted += count
+    return inserted
+
+def build_indexes(db):
+    """Build the declared indexes after the bulk load
+
+    Maintaining indexes row by row during the inserts is much slower than a
+    single build at the end, so this runs once the data is in place.
+    """
+    created = ensure_indexes(db)
+    for collection_name in INDEXES:
+        print(f"Built indexes on {collection_name}: {', '.join(created.get(collection_name, []))}")
+
+def seed_reference_data(db):
+    """Insert the sample regions, model details and model evaluation"""
+    # Create sample data for demand_prediction
+    sample_regions = [
+        {
+            "region_id": 0,
+            "pincodes": ["110001", "110002", "110003"],
+            "total_demand": 500,
+            "avg_demand_per_pincode": 166.67,
+            "demand_rise_flag": True,
+            "products": {
+                "top_product": "loan",
+                "distribution": {"loan": 0.55, "credit_card": 0.30, "insurance": 0.15}
+            },
+            "channels": {
+                "top_channel": "online",
+                "distribution": {"online": 0.65, "offline": 0.35}
+            }
+        },
+        {
+            "region_id": 1,
+            "pincodes": ["400001", "400002"],
+            "total_demand": 420,
+            "avg_demand_per_pincode": 210.0,
+            "demand_rise_flag": True,
+            "products": {
+                "top_product": "credit_card",
+                "distribution": {"loan": 0.35, "credit_card": 0.45, "insurance": 0.20}
+            },
+            "channels": {
+                "top_channel": "offline",
+                "distribution": {"online": 0.40, "offline": 0.60}
+            }
+        }
+    ]
+    
+    db["demand_prediction"].insert_many(sample_regions)
+    print(f"Added {len(sample_regions)} sample regions to demand_prediction collection")
+    
+    # Create sample model details
+    sample_model_details = [
+        {
+            "model_type": "regression",
+            "target": "region_total",
+            "hyperparameters": {
+                "model__n_estimators": 100,
+                "model__learning_rate": 0.1,
+                "model__max_depth": 3
+            },
+            "metrics": {
+                "mse": 150.25,
+                "rmse": 12.26,
+                "mae": 9.85,
+                "r2": 0.85
+            },
+            "training_date": datetime.datetime.now().isoformat()
+        },
+        {
+            "model_type": "binary_classification",
+            "target": "demand_rise",
+            "hyperparameters": {
+                "model__C": 1.0,
+                "model__solver": "liblinear"
+            },
+            "metrics": {
+                "accuracy": 0.92,
+                "classification_report": {
+                    "0": {"precision": 0.90, "recall": 0.88, "f1-score": 0.89},
+                    "1": {"precision": 0.93, "recall": 0.95, "f1-score": 0.94}
+                }
+            },
+            "training_date": datetime.datetime.now().isoformat()
+        },
+        {
+            "model_type": "multi_class_classification",
+            "target": "product_top",
+            "hyperparameters": {
+                "model__n_estimators": 100,
+                "model__max_depth": 5
+            },
+            "metrics": {
+                "accuracy": 0.87,
+                "classification_report": {
+                    "0": {"precision": 0.85, "recall": 0.88, "f1-score": 0.86},
+                    "1": {"precision": 0.90, "recall": 0.87, "f1-score": 0.88},
+                    "2": {"precision": 0.86, "recall": 0.85, "f1-score": 0.85}
+                },
+                "product_mapping": {"0": "loan", "1": "credit_card", "2": "insurance"}
+            },
+            "training_date": datetime.datetime.now().isoformat()
+        }
+    ]
+    
+    db["model_details"].insert_many(sample_model_details)
+    print(f"Added {len(sample_model_details)} sample model details to model_details collection")
+    
+    # Create sample model evaluation
+    sample_evaluation = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "dataset_size": 1000,
+        "regression_metrics": {
+            "mse": 150.25,
+            "rmse": 12.26,
+            "mae": 9.85,
+            "r2": 0.85
+        },
+        "binary_classification_metrics": {
+            "accuracy": 0.92,
+            "report": {"0": {"f1-score": 0.89}, "1": {"f1-score": 0.94}}
+        },
+        "multi_classification_metrics": {
+            "accuracy": 0.87,
+            "report": {"0": {"f1-score": 0.86}, "1": {"f1-score": 0.88}, "2": {"f1-score": 0.85}}
+        }
+    }
+    
+    db["model_evaluation"].insert_one(sample_evaluation)
+    print(f"Added sample evaluation to model_evaluation collection")
+
+def initialize_database(rows=100, pincode_count=len(BASE_PINCODES), days=365, workers=1,
+                        chunk_size=10000, seed=None, mongo_uri=MONGO_URI, mongo_db=MONGO_DB):
+    """Initialize MongoDB database with required collections and sample data"""
+    print("Initializing database...")
+    timings = {}
+    if seed is None:
+        seed = random.randint(0, 2 ** 31)
+    
+    # Connect to MongoDB, monitoring every command this process sends
+    register_command_monitor()
+    with timed_phase(timings, "connect"):
+        try:
+            client = MongoClient(mongo_uri)
+            db = client[mongo_db]
+            print("Connected to MongoDB successfully")
+        except Exception as e:
+            print(f"Error connecting to MongoDB: {e}")
+            return
+    
+    # Drop and recreate collections; dropping is a single metadata operation
+    # whereas delete_many({}) removes (and un-indexes) every document in turn
+    with timed_phase(timings, "reset"):
+        existing = db.list_collection_names()
+        for collection_name in COLLECTIONS:
+            if collection_name in existing:
+                db.drop_collection(collection_name)
+                print(f"Dropped existing collection: {collection_name}")
+            db.create_collection(collection_name)
+            print(f"Created new collection: {collection_name}")
+    
+    with timed_phase(timings, "seed_reference"):
+        seed_reference_data(db)
+    
+    # Create sample sales data
+    pincodes = build_pincodes(pincode_count)
+    with timed_phase(timings, "seed_sales"):
+        inserted = seed_sales_data(db, rows, pincodes, days, workers, chunk_size, seed,
+                                   mongo_uri, mongo_db)
+    print(f"Added {inserted} sample sales records to sales_data collection "
+          f"({len(pincodes)} pincodes, {days} days, {workers} workers)")
+    
+    # Give the API workers shared coordinates for the seeded pincodes
+    with timed_phase(timings, "pincode_table"):
+        build_pincode_table(pincodes, seed=seed)
+    print(f"Wrote {len(pincodes)} pincode coordinates to {PINCODE_TABLE_PATH}")
+    
+    with timed_phase(timings, "build_indexes"):
+        build_indexes(db)
+    
+    # Roll the sales up into the pincode x product x channel x day cube
+    with timed_phase(timings, "build_cube"):
+        cells = rebuild_cube(db)
+    print(f"Built sales_cube with {cells} cells")
+    
+    print("\nDatabase initialization complete.")
+    print(f"Collections: {db.list_collection_names()}")
+    
+    # Print collection counts from collection metadata rather than a full count
+    for collection_name in db.list_collection_names():
+        count = db[collection_name].estimated_document_count()
+        print(f"Collection {collection_name}: {count} documents")
+    
+    # Print timing breakdown per phase
+    total = sum(timings.values())
+    print("\nTiming breakdown:")
+    for phase, duration in timings.items():
+        print(f"  {phase:<16} {duration:8.2f}s")
+    print(f"  {'total':<16} {total:8.2f}s")
+    if timings.get("seed_sales"):
+        print(f"  Sales insert rate: {inserted / timings['seed_sales']:,.0f} rows/sec")
+    
+    # Print MongoDB time per collection and operation (pool workers' inserts are not included)
+    commands = command_summary()
+    if commands:
+        print("\nMongoDB commands:")
+        for entry in commands[:15]:
+            name = f"{entry['collection'] or '-'}.{entry['operation']}"
+            print(f"  {name:<36} {entry['calls']:>6} calls {entry['total_ms']:>10.1f} ms "
+                  f"(max {entry['max_ms']:.1f} ms) {entry['documents']:>9} docs")
+    return timings
+
+def main():
+    """Parse command line options and seed the database"""
+    parser = argparse.ArgumentParser(description='Initialize the Demand Prediction database')
+    parser.add_argument('--rows', type=int, default=100, help='Number of sales records to generate')
+    parser.add_argument('--pincodes', type=int, default=len(BASE_PINCODES),
+                        help='Number of distinct pincodes in the sales data')
+    parser.add_argument('--days', type=int, default=365, help='Date span of the sales data in days')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes inserting sales data in parallel')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Records per insert_many batch')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data')
+    parser.add_argument('--mongo-uri', default=MONGO_URI, help='MongoDB connection URI')
+    parser.add_argument('--db', default=MONGO_DB, help='MongoDB database name')
+    
+    args = parser.parse_args()
+    initialize_database(
+        rows=args.rows,
+        pincode_count=args.pincodes,
+        days=args.days,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        mongo_uri=args.mongo_uri,
+        mongo_db=args.db
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+# Shared fixtures: an in-memory MongoDB (mongomock) standing in for the server
+
+import mongomock
+import pytest
+from mongomock.collection import BulkOperationBuilder
+
+# pymongo 4.9+ passes a `sort` argument to bulk updates that mongomock does not
+# accept; the code under test never sets it
+_add_update = BulkOperationBuilder.add_update
+
+def _add_update_without_sort(self, *args, sort=None, **kwargs):
+    return _add_update(self, *args, **kwargs)
+
+BulkOperationBuilder.add_update = _add_update_without_sort
+
+@pytest.fixture
+def db():
+    """A fresh, empty database"""
+    return mongomock.MongoClient()["gromo_test"]
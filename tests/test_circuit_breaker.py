@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, CIRCUIT_FAILURE_THRESHOLD
+
+class Probe:
+    """Raises until `recover` is set, counting its calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.recover = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        if not self.recover.is_set():
+            raise RuntimeError("model still broken")
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+@pytest.fixture
+def probe():
+    return Probe()
+
+@pytest.fixture
+def breaker(probe):
+    return CircuitBreaker("test", probe, failure_threshold=3, probe_interval=0.01)
+
+def test_opens_after_consecutive_failures(breaker, probe):
+    breaker.record_failure(RuntimeError("1"))
+    breaker.record_failure(RuntimeError("2"))
+    # A success resets the run, so the threshold counts failures in a row
+    breaker.record_success()
+    breaker.record_failure(RuntimeError("3"))
+    breaker.record_failure(RuntimeError("4"))
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_failure(RuntimeError("5"))
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["trips"] == 1
+    probe.recover.set()
+
+def test_probe_closes_breaker_once_model_recovers(breaker, probe):
+    for i in range(3):
+        breaker.record_failure(RuntimeError(str(i)))
+    # The probe keeps failing and the breaker stays open
+    assert wait_for(lambda: probe.calls >= 3)
+    assert breaker.state == OPEN and not breaker.allow()
+    assert breaker.last_error == "model still broken"
+
+    probe.recover.set()
+    assert wait_for(lambda: breaker.state == CLOSED)
+    assert breaker.allow()
+    snapshot = breaker.snapshot()
+    assert (snapshot["failures"], snapshot["trips"], snapshot["opened_at"]) == (0, 1, None)
+
+    # The probe thread has exited; a later trip starts a new one
+    calls = probe.calls
+    probe.recover.clear()
+    for i in range(3):
+        breaker.record_failure(RuntimeError(str(i)))
+    assert breaker.state == OPEN and breaker.trips == 2
+    assert wait_for(lambda: probe.calls > calls)
+    probe.recover.set()
+    assert wait_for(lambda: breaker.state == CLOSED)
+
+def test_failures_while_open_do_not_trip_again(breaker, probe):
+    for i in range(6):
+        breaker.record_failure(RuntimeError(str(i)))
+    assert breaker.trips == 1
+    probe.recover.set()
+    assert wait_for(lambda: breaker.state == CLOSED)
+
+BAD_ROWS = [
+    [{"pincode": ["400001"], "product": "loan", "channel": "online"}],
+    [{"pincode": "400001", "product": {"name": "loan"}, "channel": "online"}],
+    [{"pincode": "400001", "product": "loan", "channel": "online"}, {"pincode": "400002", "product": "loan"}],
+    [{"pincode": 400001.5, "product": "loan", "channel": "online"}],
+]
+
+@pytest.fixture
+def api(monkeypatch):
+    import app
+    # No MongoDB connection or warmup threads; the predictions do not need them
+    monkeypatch.setattr(app, "start_worker", lambda: None)
+    return app
+
+@pytest.mark.parametrize("route, name", [
+    ("/predict/demand", "demand"),
+    ("/predict/demand-rise", "demand_rise"),
+    ("/predict/top-product", "top_product"),
+])
+def test_bad_input_does_not_trip_breaker(api, route, name):
+    client = api.app.test_client()
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        for rows in BAD_ROWS:
+            assert client.post(route, json=rows).status_code == 400
+    breaker = api.BREAKERS[name]
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+    response = client.post(route, json=[{"pincode": 400001, "product": "loan", "channel": "online"}])
+    assert response.status_code == 200
+    assert response.get_json()["data"][0]["pincode"] == "400001"
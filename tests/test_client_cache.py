@@ -0,0 +1,71 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import client_cache
+from client_cache import PredictionCache, record_key
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Make every time.time() call in the cache one second later than the last"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(client_cache.time, "time", lambda: float(next(ticks)))
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = PredictionCache(str(tmp_path), max_bytes=100)
+    yield cache
+    cache.close()
+
+def prediction(i):
+    # 20 bytes once encoded
+    return {"demand": 100000000 + i}
+
+def test_record_key_normalizes_equivalent_records():
+    key = record_key("/predict/demand", "v1", {"pincode": "400001", "product": "loan", "age": 30})
+    assert key == record_key("/predict/demand", "v1", {"product": " loan ", "age": 30.0, "pincode": "400001"})
+    assert key == record_key("/predict/demand", "v1", {"pincode": "400001", "product": "loan",
+                                                       "age": np.int64(30), "income": float("nan")})
+    assert key == record_key("/predict/demand", "v1", {"pincode": "400001", "product": "loan",
+                                                       "age": np.float64(30.0), "income": None})
+
+def test_record_key_separates_endpoints_versions_and_values():
+    record = {"pincode": "400001", "product": "loan"}
+    keys = {
+        record_key("/predict/demand", "v1", record),
+        record_key("/predict/top-product", "v1", record),
+        record_key("/predict/demand", "v2", record),
+        record_key("/predict/demand", "v1", dict(record, product="insurance")),
+        record_key("/predict/demand", "v1", dict(record, pincode=400001.5)),
+    }
+    assert len(keys) == 5
+
+def test_round_trip_and_counters(cache):
+    cache.set_many({"a": prediction(1), "b": prediction(2)})
+    assert cache.get_many(["a", "b", "c", "a"]) == {"a": prediction(1), "b": prediction(2)}
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 3, 1)
+
+def test_evicts_least_recently_used(cache):
+    cache.set_many({key: prediction(i) for i, key in enumerate("abcde")})
+    assert cache.stats()["bytes"] == 100
+    # Reading a and b makes c the least recently used entry
+    cache.get_many(["a", "b"])
+
+    cache.set_many({"f": prediction(6)})
+
+    # 120 bytes is evicted down to the 90-byte low watermark: c and d go
+    assert set(cache.get_many(list("abcdef"))) == {"a", "b", "e", "f"}
+    stats = cache.stats()
+    assert stats["evictions"] == 2
+    assert stats["bytes"] <= 100 * client_cache.EVICTION_LOW_WATERMARK
+
+def test_entries_survive_reopening(tmp_path, clock):
+    with_entry = PredictionCache(str(tmp_path))
+    with_entry.set_many({"a": prediction(1)})
+    with_entry.close()
+
+    reopened = PredictionCache(str(tmp_path))
+    assert reopened.get_many(["a"]) == {"a": prediction(1)}
+    reopened.close()
@@ -0,0 +1,113 @@
+import datetime
+import time
+
+import pytest
+
+import region_summary
+from db_indexes import INDEXES
+from sales_cube import update_cube
+
+REGIONS = {1: ["400001", "400002"], 2: ["110001"]}
+
+def make_sales(count, start, products=("loan", "credit_card", "insurance")):
+    sales = []
+    pincodes = ["400001", "400002", "110001", "560001"]
+    for i in range(count):
+        sales.append({
+            "pincode": pincodes[i % len(pincodes)],
+            "product": products[i % len(products)],
+            "channel": "online" if i % 3 else "offline",
+            "date": start + datetime.timedelta(days=i % 5),
+            "customer_age": 30 + i % 20,
+            "customer_income": 50000.0 + i
+        })
+    return sales
+
+def seed_regions(db, unique_index=True):
+    if unique_index:
+        db["demand_prediction"].create_indexes(INDEXES["demand_prediction"])
+    for region_id, pincodes in REGIONS.items():
+        db["demand_prediction"].insert_one({"region_id": region_id, "pincodes": pincodes})
+
+def ingest(db, sales):
+    """Store sales as /sales/add does, then let the clock move past them"""
+    now = datetime.datetime.now()
+    sales = [dict(sale, inserted_at=now) for sale in sales]
+    db["sales_data"].insert_many([dict(sale) for sale in sales])
+    update_cube(db, sales)
+    time.sleep(0.01)
+
+def summaries(db):
+    fields = {"_id": 0, "region_id": 1, "pincodes": 1, "counts": 1, "total_demand": 1,
+              "avg_demand_per_pincode": 1, "products": 1, "channels": 1}
+    regions = {}
+    for region in db["demand_prediction"].find({}, fields):
+        region["pincodes"] = sorted(region.get("pincodes", []))
+        regions[region["region_id"]] = region
+    return regions
+
+def past(seconds):
+    return datetime.datetime.now() - datetime.timedelta(seconds=seconds)
+
+@pytest.mark.parametrize("source", ["cube", "sales"])
+def test_incremental_runs_match_rebuild(db, source):
+    seed_regions(db)
+    ingest(db, make_sales(40, past(3600)))
+    region_summary.run_incremental(db, lag_seconds=0, source=source)
+    ingest(db, make_sales(25, past(600), products=("loan", "gold.loan", "$pecial")))
+    region_summary.run_incremental(db, lag_seconds=0, source=source)
+    incremental = summaries(db)
+
+    region_summary.run_rebuild(db, workers=2, lag_seconds=0, source=source)
+    assert summaries(db) == incremental
+    assert sum(region["total_demand"] for region in incremental.values()) == 65
+    assert region_summary.UNASSIGNED_REGION_ID in incremental
+
+def test_product_names_are_not_field_paths(db):
+    seed_regions(db)
+    ingest(db, make_sales(12, past(60), products=("gold.loan", "$pecial")))
+    region_summary.run_incremental(db, lag_seconds=0, source="sales")
+
+    region = db["demand_prediction"].find_one({"region_id": 1})
+    assert set(region["products"]["distribution"]) == {"gold.loan", "$pecial"}
+    assert all("." not in key and "$" not in key for key in region["counts"]["products"])
+
+def test_retried_sales_run_counts_once_without_unique_index(db):
+    seed_regions(db, unique_index=False)
+    ingest(db, make_sales(20, past(60)))
+    region_summary.run_incremental(db, lag_seconds=0, source="sales")
+    first = summaries(db)
+
+    # A crash after the region writes leaves the run's watermark pending
+    state_id = region_summary._state_id("sales")
+    high = db["demand_prediction"].find_one({"region_id": 1})["summary_watermark"]
+    low = db["summary_state"].find_one({"_id": state_id})["last_run"]["at"] - datetime.timedelta(days=1)
+    db["summary_state"].update_one({"_id": state_id}, {"$set": {"watermark": low, "pending_watermark": high}})
+    region_summary.run_incremental(db, lag_seconds=0, source="sales")
+
+    assert summaries(db) == first
+    assert db["demand_prediction"].count_documents({"region_id": region_summary.UNASSIGNED_REGION_ID}) == 1
+
+def total_demand(db):
+    return sum(region.get("total_demand", 0) for region in db["demand_prediction"].find())
+
+def test_switching_sources_counts_each_sale_once(db):
+    seed_regions(db)
+    ingest(db, make_sales(10, past(600)))
+    region_summary.run_incremental(db, lag_seconds=0, source="cube")
+    assert total_demand(db) == 10
+    region_summary.run_incremental(db, lag_seconds=0, source="sales")
+    assert total_demand(db) == 10
+
+    ingest(db, make_sales(6, past(60)))
+    region_summary.run_incremental(db, lag_seconds=0, source="sales")
+    assert total_demand(db) == 16
+    region_summary.run_incremental(db, lag_seconds=0, source="cube")
+    assert total_demand(db) == 16
+    # Repeat runs with nothing new leave the totals alone
+    region_summary.run_incremental(db, lag_seconds=0, source="cube")
+    region_summary.run_incremental(db, lag_seconds=0, source="sales")
+    assert total_demand(db) == 16
+
+    states = {state["_id"]: state for state in db["summary_state"].find()}
+    assert set(states) == {"region_summary:cube", "region_summary:sales"}
@@ -0,0 +1,72 @@
+import datetime
+
+import pytest
+
+from sales_cube import CUBE_COLLECTION, load_cube, rebuild_cube, update_cube
+
+def make_sales(count):
+    start = datetime.datetime(2024, 3, 1, 9, 30)
+    sales = []
+    for i in range(count):
+        sale = {
+            "pincode": ["400001", 110001, "560001"][i % 3],
+            "product": ["loan", "credit_card", "insurance"][i % 3 - (i % 2)],
+            "channel": "online" if i % 4 else "offline",
+            "customer_age": 25 + i % 30,
+            "customer_income": 40000.0 + 250 * i,
+            "inserted_at": start + datetime.timedelta(days=i % 7, hours=1)
+        }
+        if i % 5:
+            sale["date"] = start + datetime.timedelta(days=i % 6, hours=i % 12)
+        if i % 7 == 0:
+            sale["customer_income"] = "unknown"
+        if i % 11 == 0:
+            del sale["customer_age"]
+        sales.append(sale)
+    # Incomplete sales are left out of the cube
+    sales.append({"pincode": "400001", "product": "loan", "date": start})
+    return sales
+
+def cells(db):
+    rows = db[CUBE_COLLECTION].find({}, {"_id": 0, "updated_at": 0})
+    return sorted((row["pincode"], row["product"], row["channel"], row["day"],
+                   row["count"], pytest.approx(row["income_sum"]), row["income_count"],
+                   pytest.approx(row["age_sum"]), row["age_count"]) for row in rows)
+
+def test_update_cube_matches_rebuild(db):
+    sales = make_sales(60)
+    db["sales_data"].insert_many([dict(sale) for sale in sales])
+    for start in range(0, len(sales), 17):
+        update_cube(db, sales[start:start + 17])
+    incremental = cells(db)
+
+    rebuild_cube(db)
+    assert cells(db) == incremental
+    assert sum(cell[4] for cell in incremental) == 60
+
+def test_load_cube_derives_means(db):
+    day = datetime.datetime(2024, 3, 1, 12)
+    sale = {"pincode": "400001", "product": "loan", "channel": "online", "date": day}
+    update_cube(db, [dict(sale, customer_age=30, customer_income=50000.0),
+                     dict(sale, customer_age=40, customer_income="unknown"),
+                     dict(sale, customer_income=70000.0)])
+    row = load_cube(db).iloc[0]
+    assert row["count"] == 3
+    assert row["customer_income"] == 60000.0
+    assert row["customer_age"] == 35.0
+    assert row["date"] == datetime.datetime(2024, 3, 1)
+
+def test_features_of_an_empty_cube(db):
+    import Dp
+    df = Dp.cluster_pincodes(Dp.assign_coordinates(load_cube(db)))
+    features, sample_weight = Dp.preprocess_data(df)
+    assert features.empty and sample_weight.empty
+
+def test_features_carry_sale_counts(db):
+    import Dp
+    update_cube(db, make_sales(60))
+    df = Dp.cluster_pincodes(Dp.assign_coordinates(load_cube(db)), n_clusters=2)
+    features, sample_weight = Dp.preprocess_data(df)
+    assert len(features) == len(sample_weight) == len(df)
+    assert "count" not in features.columns
+    assert sample_weight.sum() == 60
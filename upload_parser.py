@@ -0,0 +1,290 @@
+# Parsing of uploaded data files, with expensive formats offloaded to a process pool
+
+# The process pool machinery and pandas are imported on first use to keep API startup fast
+import io
+import itertools
+import json
+import multiprocessing
+import threading
+import time
+
+try:
+    from config import (
+        UPLOAD_PARSE_WORKERS, UPLOAD_PARSE_MAX_PENDING, UPLOAD_PARSE_CHUNK_ROWS,
+        UPLOAD_PARSE_TIMEOUT, UPLOAD_POOL_FORMATS
+    )
+except ImportError:
+    UPLOAD_PARSE_WORKERS = 2
+    UPLOAD_PARSE_MAX_PENDING = 8
+    UPLOAD_PARSE_CHUNK_ROWS = 5000
+    UPLOAD_PARSE_TIMEOUT = 120
+    UPLOAD_POOL_FORMATS = ('.xls', '.xlsx')
+
+SUPPORTED_FORMATS = ('.csv', '.xls', '.xlsx', '.json')
+# Pool processes must not be forked from the threaded serving process: a lock
+# held by another thread at fork time stays locked forever in the child
+START_METHODS = ('forkserver', 'spawn')
+# How often the request thread checks on a worker while waiting for its next chunk
+RECEIVE_POLL_SECONDS = 0.5
+
+class ParserBusyError(Exception):
+    """Raised when the parse pool already has its maximum number of pending files"""
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(UPLOAD_PARSE_MAX_PENDING)
+_stats_lock = threading.Lock()
+_stats = {
+    "queue_depth": 0,
+    "parsed_files": 0,
+    "failed_files": 0,
+    "rejected_files": 0,
+    "parse_seconds_total": 0.0,
+    "last_parse_seconds": None,
+    "max_parse_seconds": 0.0
+}
+
+def is_supported_upload(filename):
+    """Check whether an uploaded file has a format the API can parse"""
+    return filename.lower().endswith(SUPPORTED_FORMATS)
+
+def _read_frame(filename, buffer):
+    """Read a whole file into a DataFrame based on its extension"""
+    import pandas as pd
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return pd.read_csv(buffer)
+    elif name.endswith(('.xls', '.xlsx')):
+        return pd.read_excel(buffer)
+    return pd.read_json(buffer)
+
+def _frame_records(df):
+    """Convert a DataFrame to JSON-compatible records (datetimes, NaN, numpy types)"""
+    return json.loads(df.to_json(orient='records'))
+
+def _iter_xlsx_chunks(data, chunk_rows):
+    """
+    Read the first sheet of an .xlsx workbook a chunk of rows at a time
+
+    openpyxl's read-only mode streams the sheet, so only one chunk of rows
+    is held at a time. Each chunk goes through the parser pd.read_excel
+    uses, so column names and types come out as they would from it, except
+    that types are inferred per chunk (as with CSV). Fully empty rows are
+    skipped.
+    """
+    from openpyxl import load_workbook
+    from pandas.io.parsers import TextParser
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    rows = workbook.worksheets[0].iter_rows(values_only=True)
+    # Blank header cells become "Unnamed: <i>" columns, as with pd.read_excel
+    header = ["" if name is None else name for name in next(rows, None) or ()]
+    width = len(header)
+
+    def frame(batch):
+        return TextParser([header] + batch, header=0).read()
+
+    def chunks():
+        batch = []
+        try:
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                batch.append((list(row) + [None] * width)[:width])
+                if len(batch) == chunk_rows:
+                    yield _frame_records(frame(batch))
+                    batch = []
+            if batch:
+                yield _frame_records(frame(batch))
+        finally:
+            workbook.close()
+    return [str(c) for c in frame([]).columns] if header else [], chunks()
+
+def _parse_in_worker(filename, data, chunk_rows, conn):
+    """
+    Parse a file inside a pool process, streaming it back through ``conn``
+
+    Sends the column names, then each chunk of records as soon as it is
+    parsed, then None. A full pipe blocks the worker until the request
+    thread has taken the previous chunks, so neither side holds the whole
+    file's records. Returns the seconds spent parsing, excluding those
+    waits.
+    """
+    start = time.perf_counter()
+    waited = 0.0
+    try:
+        if filename.lower().endswith('.xlsx'):
+            columns, chunks = _iter_xlsx_chunks(data, chunk_rows)
+        else:
+            # Other formats (.xls) have no streaming reader
+            df = _read_frame(filename, io.BytesIO(data))
+            columns = [str(c) for c in df.columns]
+            chunks = (_frame_records(df.iloc[i:i + chunk_rows]) for i in range(0, len(df), chunk_rows))
+        for message in itertools.chain([columns], chunks, [None]):
+            sent = time.perf_counter()
+            conn.send(message)
+            waited += time.perf_counter() - sent
+    finally:
+        conn.close()
+    return time.perf_counter() - start - waited
+
+def _pool_context():
+    """Multiprocessing context for the pool: a fork server if the platform has one, else spawn"""
+    method = next(m for m in START_METHODS if m in multiprocessing.get_all_start_methods())
+    context = multiprocessing.get_context(method)
+    if method == 'forkserver':
+        # Pool processes fork from the server with the main module (app.py or
+        # server.py), this module, pandas and openpyxl (if installed) already imported
+        context.set_forkserver_preload(['__main__', __name__, 'pandas', 'openpyxl'])
+    return context
+
+def _get_pool():
+    """Create the parse pool on first use, inside the serving process"""
+    from concurrent.futures import ProcessPoolExecutor
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=UPLOAD_PARSE_WORKERS, mp_context=_pool_context())
+        return _pool
+
+def _reset_pool():
+    """Discard a broken pool so the next upload creates a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _release_slot(future=None):
+    """Free a pending slot once its parse has really finished (or never started)"""
+    with _stats_lock:
+        _stats["queue_depth"] -= 1
+    _pending.release()
+
+def _record_parse(seconds, failed=False):
+    """Update the parse statistics once a file has been handled"""
+    with _stats_lock:
+        if failed:
+            _stats["failed_files"] += 1
+            return
+        _stats["parsed_files"] += 1
+        _stats["parse_seconds_total"] += seconds
+        _stats["last_parse_seconds"] = round(seconds, 4)
+        _stats["max_parse_seconds"] = max(_stats["max_parse_seconds"], seconds)
+
+def _receive(reader, future, filename):
+    """Next message from a pool worker, or the worker's error if it stopped without sending one"""
+    from concurrent.futures.process import BrokenProcessPool
+    deadline = time.monotonic() + UPLOAD_PARSE_TIMEOUT
+    while not reader.poll(RECEIVE_POLL_SECONDS):
+        if future.done():
+            # Anything sent just before the worker finished is still readable
+            if reader.poll(0):
+                break
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                # A worker died (e.g. out of memory); start a fresh pool for the next upload
+                _reset_pool()
+            raise error or RuntimeError(f"Parsing {filename} ended without a result")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Parsing {filename} sent nothing for {UPLOAD_PARSE_TIMEOUT} seconds")
+    return reader.recv()
+
+def _iter_pool_messages(reader, writer, future, filename):
+    """Yield the column names and then the chunks a pool worker sends, recording the parse once it has finished"""
+    finished = False
+    try:
+        while True:
+            message = _receive(reader, future, filename)
+            if message is None:
+                break
+            yield message
+        _record_parse(future.result())
+        finished = True
+    finally:
+        # Closing the pipe stops a worker whose chunks are no longer wanted
+        reader.close()
+        writer.close()
+        if not finished:
+            future.cancel()
+            _record_parse(0, failed=True)
+
+def _parse_in_pool(filename, data):
+    """Hand a file to the pool; return its columns and a generator of chunks as they are parsed"""
+    if not _pending.acquire(blocking=False):
+        with _stats_lock:
+            _stats["rejected_files"] += 1
+        raise ParserBusyError(f"Upload parser is busy ({UPLOAD_PARSE_MAX_PENDING} files pending)")
+    with _stats_lock:
+        _stats["queue_depth"] += 1
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    try:
+        future = _get_pool().submit(_parse_in_worker, filename, data, UPLOAD_PARSE_CHUNK_ROWS, writer)
+    except Exception:
+        reader.close()
+        writer.close()
+        _release_slot()
+        _record_parse(0, failed=True)
+        raise
+    # A parse that times out keeps running in its worker (cancel() only stops
+    # queued ones), so its slot is freed when it completes, not when we give up
+    future.add_done_callback(_release_slot)
+    # The writer stays open until the generator finishes, since the worker
+    # may not have received its copy yet
+    messages = _iter_pool_messages(reader, writer, future, filename)
+    columns = next(messages)
+    return columns, messages
+
+def _iter_inline_chunks(filename, file):
+    """Parse cheap formats on the request thread, a chunk at a time for CSV"""
+    if filename.lower().endswith('.csv'):
+        import pandas as pd
+        for chunk in pd.read_csv(file, chunksize=UPLOAD_PARSE_CHUNK_ROWS):
+            yield _frame_records(chunk)
+    else:
+        df = _read_frame(filename, file)
+        for i in range(0, len(df), UPLOAD_PARSE_CHUNK_ROWS):
+            yield _frame_records(df.iloc[i:i + UPLOAD_PARSE_CHUNK_ROWS])
+
+def parse_upload(filename, file):
+    """
+    Parse an uploaded file into chunks of JSON-compatible records
+
+    Formats listed in UPLOAD_POOL_FORMATS (Excel by default) are parsed in a
+    bounded process pool so the pure-Python parsing does not hold the GIL of
+    the serving process; the worker streams each chunk back as it is parsed.
+    Other formats are parsed on the request thread.
+
+    Parameters:
+    -----------
+    filename : str
+        Name of the uploaded file, used to pick the parser
+    file : file-like object
+        Uploaded file contents
+
+    Returns:
+    --------
+    columns : list of str or None
+        Column names, or None when the file is parsed on the request thread
+    chunks : iterable of list of dict
+        Records in chunks of at most UPLOAD_PARSE_CHUNK_ROWS rows
+
+    Raises:
+    -------
+    ParserBusyError
+        If the pool already has UPLOAD_PARSE_MAX_PENDING files pending
+    """
+    if filename.lower().endswith(tuple(UPLOAD_POOL_FORMATS)):
+        return _parse_in_pool(filename, file.read())
+    return None, _iter_inline_chunks(filename, file)
+
+def parser_stats():
+    """Return queue depth and parse time statistics for the pool"""
+    with _stats_lock:
+        stats = dict(_stats)
+    parsed = stats["parsed_files"]
+    stats["avg_parse_seconds"] = round(stats["parse_seconds_total"] / parsed, 4) if parsed else None
+    stats["parse_seconds_total"] = round(stats["parse_seconds_total"], 4)
+    stats["max_parse_seconds"] = round(stats["max_parse_seconds"], 4)
+    stats["workers"] = UPLOAD_PARSE_WORKERS
+    stats["max_pending"] = UPLOAD_PARSE_MAX_PENDING
+    return stats